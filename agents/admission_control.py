@@ -0,0 +1,365 @@
+"""
+Worker Load Reporting and Admission Control for VoiceFlow Pro
+
+This module decides whether a worker should take another room:
+- Load score from CPU, event-loop lag, active DSP streams and in-flight LLM calls
+- Load and turn latency reported by job processes to the worker process
+- Load reporting to the LiveKit dispatcher via WorkerOptions.load_fnc
+- Admission via WorkerOptions.request_fnc: accept, defer, or reject new rooms
+- Latency guard so existing calls are not pushed past their target
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Callable, List
+from dataclasses import dataclass, asdict
+import psutil
+
+from latency_sketch import LatencyHistogram, WindowedLatencySketches
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkerLoadSample:
+    """Snapshot of worker load inputs and the resulting score"""
+    cpu_percent: float
+    event_loop_lag_ms: float
+    active_dsp_streams: int
+    inflight_llm_calls: int
+    active_sessions: int
+    load_score: float
+    measured_at: float
+    # Worst end-to-end turn p95 among processes with enough turns, and its target
+    total_latency_p95: float = 0.0
+    latency_target_ms: Optional[float] = None
+    reporting_jobs: int = 0
+
+
+@dataclass
+class AdmissionDecision:
+    """Outcome of an admission check for a new room"""
+    accept: bool
+    defer: bool
+    reason: str
+    load_score: float
+    projected_load: float
+    total_latency_p95: float
+
+
+class WorkerLoadMonitor:
+    """
+    Tracks the resources a voice session consumes in this process.
+
+    Each component is normalised against its capacity and the load score is
+    the most saturated component (0.0 idle, 1.0 full), since a call degrades
+    as soon as any single resource runs out.
+
+    Jobs run in child processes, so counters only see sessions in this
+    process. With a ``report_dir``, each job process writes its counters,
+    event-loop lag and turn latency to ``load-<pid>.json`` there, and
+    ``sample`` in the worker process adds up every fresh report.
+    ``active_sessions`` passed to ``sample`` still covers jobs that have not
+    reported yet.
+    """
+
+    def __init__(self, max_dsp_streams: int = 32, max_inflight_llm_calls: int = 64,
+                 event_loop_lag_budget_ms: float = 50.0, lag_probe_interval: float = 0.25,
+                 lag_smoothing: float = 0.3, report_dir: Optional[str] = None,
+                 report_interval: float = 1.0, report_stale_seconds: float = 5.0,
+                 latency_window_seconds: int = 60, min_latency_samples: int = 20):
+        self.max_dsp_streams = max_dsp_streams
+        self.max_inflight_llm_calls = max_inflight_llm_calls
+        self.event_loop_lag_budget_ms = event_loop_lag_budget_ms
+        self.lag_probe_interval = lag_probe_interval
+        self.lag_smoothing = lag_smoothing
+        self.report_dir = report_dir
+        self.report_interval = report_interval
+        self.report_stale_seconds = report_stale_seconds
+        self.latency_window_seconds = latency_window_seconds
+        self.min_latency_samples = min_latency_samples
+
+        self.active_dsp_streams = 0
+        self.inflight_llm_calls = 0
+        self.active_sessions = 0
+        self.event_loop_lag_ms = 0.0
+        # End-to-end turn latency of sessions in this process
+        self.turn_latency = WindowedLatencySketches(window_seconds=10, retention_seconds=latency_window_seconds)
+
+        self._lag_task: Optional[asyncio.Task] = None
+        self._report_task: Optional[asyncio.Task] = None
+        self._latency_target_fnc: Optional[Callable[[], float]] = None
+        # Prime psutil so later non-blocking calls return a real interval
+        psutil.cpu_percent(interval=None)
+
+    def start(self):
+        """Start the event-loop lag probe on the running loop"""
+        if self._lag_task is None or self._lag_task.done():
+            self._lag_task = asyncio.get_running_loop().create_task(self._probe_event_loop_lag())
+
+    async def stop(self):
+        await self.stop_reporting()
+        if self._lag_task:
+            self._lag_task.cancel()
+            try:
+                await self._lag_task
+            except asyncio.CancelledError:
+                pass
+            self._lag_task = None
+
+    def start_reporting(self, latency_target_fnc: Optional[Callable[[], float]] = None):
+        """Write this process's load report to ``report_dir`` until ``stop_reporting``"""
+        self._latency_target_fnc = latency_target_fnc
+        if self.report_dir and (self._report_task is None or self._report_task.done()):
+            self._report_task = asyncio.get_running_loop().create_task(self._report_loop())
+
+    async def stop_reporting(self):
+        if self._report_task:
+            self._report_task.cancel()
+            try:
+                await self._report_task
+            except asyncio.CancelledError:
+                pass
+            self._report_task = None
+            try:
+                os.unlink(self._report_path(os.getpid()))
+            except OSError:
+                pass
+
+    def _report_path(self, pid: int) -> str:
+        return os.path.join(self.report_dir, f"load-{pid}.json")
+
+    async def _report_loop(self):
+        os.makedirs(self.report_dir, exist_ok=True)
+        path = self._report_path(os.getpid())
+        while True:
+            try:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(self._report(), f)
+                # Readers never see a half-written report
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Failed to write load report {path}: {e}")
+            await asyncio.sleep(self.report_interval)
+
+    def _report(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "reported_at": time.time(),
+            "active_sessions": self.active_sessions,
+            "active_dsp_streams": self.active_dsp_streams,
+            "inflight_llm_calls": self.inflight_llm_calls,
+            "event_loop_lag_ms": self.event_loop_lag_ms,
+            "total_latency": self._recent_turn_latency().to_dict(),
+            "latency_target_ms": self._latency_target_fnc() if self._latency_target_fnc else None
+        }
+
+    def _recent_turn_latency(self) -> LatencyHistogram:
+        return self.turn_latency.merged(since=time.time() - self.latency_window_seconds).get("total")
+
+    def record_turn_latency(self, latency_ms: float):
+        """Record one turn from the caller's last words to the first reply audio"""
+        self.turn_latency.record("total", latency_ms)
+
+    def job_reports(self) -> List[Dict[str, Any]]:
+        """Fresh load reports written by other processes"""
+        if not self.report_dir:
+            return []
+        try:
+            names = os.listdir(self.report_dir)
+        except OSError:
+            return []
+
+        reports = []
+        now = time.time()
+        for name in names:
+            if not (name.startswith("load-") and name.endswith(".json")) or name == f"load-{os.getpid()}.json":
+                continue
+            path = os.path.join(self.report_dir, name)
+            try:
+                with open(path) as f:
+                    report = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if now - report.get("reported_at", 0) > self.report_stale_seconds:
+                # Left behind by a job process that exited without cleaning up
+                if now - report.get("reported_at", 0) > self.latency_window_seconds:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                continue
+            reports.append(report)
+        return reports
+
+    async def _probe_event_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time()
+            await asyncio.sleep(self.lag_probe_interval)
+            lag_ms = max(0.0, (loop.time() - scheduled - self.lag_probe_interval) * 1000)
+            self.event_loop_lag_ms += self.lag_smoothing * (lag_ms - self.event_loop_lag_ms)
+
+    def dsp_stream_started(self):
+        self.active_dsp_streams += 1
+
+    def dsp_stream_ended(self):
+        self.active_dsp_streams = max(0, self.active_dsp_streams - 1)
+
+    @asynccontextmanager
+    async def track_llm_call(self):
+        """Count an in-flight LLM request"""
+        self.inflight_llm_calls += 1
+        try:
+            yield
+        finally:
+            self.inflight_llm_calls -= 1
+
+    def session_started(self):
+        self.active_sessions += 1
+
+    def session_ended(self):
+        self.active_sessions = max(0, self.active_sessions - 1)
+
+    def sample(self, active_sessions: Optional[int] = None) -> WorkerLoadSample:
+        """Measure current load of this process and every reporting job process"""
+        reports = self.job_reports()
+        sessions = self.active_sessions if active_sessions is None else active_sessions
+        # Every session owns one DSP chain even when it has not reported yet
+        dsp_streams = max(self.active_dsp_streams + sum(r["active_dsp_streams"] for r in reports), sessions)
+        inflight_llm_calls = self.inflight_llm_calls + sum(r["inflight_llm_calls"] for r in reports)
+        # A call stalls with the event loop of the process it runs in
+        event_loop_lag_ms = max([self.event_loop_lag_ms] + [r["event_loop_lag_ms"] for r in reports])
+        cpu_percent = psutil.cpu_percent(interval=None)
+
+        # The process whose turns are closest to their target decides the latency guard
+        total_latency_p95, latency_target_ms, worst_ratio = 0.0, None, -1.0
+        latencies = [(self._recent_turn_latency(),
+                      self._latency_target_fnc() if self._latency_target_fnc else None)]
+        latencies += [(LatencyHistogram.from_dict(r["total_latency"]), r.get("latency_target_ms")) for r in reports]
+        for histogram, target in latencies:
+            if histogram.count < self.min_latency_samples:
+                continue
+            p95 = histogram.percentile(95)
+            ratio = p95 / target if target else p95
+            if ratio > worst_ratio:
+                total_latency_p95, latency_target_ms, worst_ratio = p95, target, ratio
+
+        components = [
+            cpu_percent / 100.0,
+            event_loop_lag_ms / self.event_loop_lag_budget_ms,
+            dsp_streams / self.max_dsp_streams,
+            inflight_llm_calls / self.max_inflight_llm_calls
+        ]
+
+        return WorkerLoadSample(
+            cpu_percent=cpu_percent,
+            event_loop_lag_ms=event_loop_lag_ms,
+            active_dsp_streams=dsp_streams,
+            inflight_llm_calls=inflight_llm_calls,
+            active_sessions=sessions,
+            load_score=min(1.0, max(components)),
+            measured_at=time.time(),
+            total_latency_p95=total_latency_p95,
+            latency_target_ms=latency_target_ms,
+            reporting_jobs=len(reports)
+        )
+
+
+class AdmissionController:
+    """
+    Admission policy for new rooms based on projected load and latency headroom.
+
+    Turn latency comes from the monitor's samples; ``latency_target_ms`` only
+    applies to processes that did not report a target of their own.
+    """
+
+    def __init__(self, monitor: WorkerLoadMonitor,
+                 latency_target_ms: float = 500.0,
+                 load_threshold: float = 0.75,
+                 latency_headroom: float = 0.9,
+                 default_session_cost: float = 0.05,
+                 defer_seconds: float = 1.0,
+                 max_defer_attempts: int = 3):
+        self.monitor = monitor
+        self.latency_target_ms = latency_target_ms
+        self.load_threshold = load_threshold
+        self.latency_headroom = latency_headroom
+        self.default_session_cost = default_session_cost
+        self.defer_seconds = defer_seconds
+        self.max_defer_attempts = max_defer_attempts
+
+        self.last_sample: Optional[WorkerLoadSample] = None
+        # Job count last reported by the worker; jobs may run in child processes
+        self.active_jobs: Optional[int] = None
+        self.admission_stats = {
+            "accepted": 0,
+            "rejected": 0,
+            "deferred": 0
+        }
+
+    def _session_cost(self, sample: WorkerLoadSample) -> float:
+        """Estimated load added by one more session"""
+        if sample.active_sessions > 0:
+            return max(self.default_session_cost, sample.load_score / sample.active_sessions)
+        return self.default_session_cost
+
+    def evaluate(self, active_sessions: Optional[int] = None) -> AdmissionDecision:
+        """Decide whether admitting one more room keeps existing calls on target"""
+        sample = self.monitor.sample(active_sessions if active_sessions is not None else self.active_jobs)
+        self.last_sample = sample
+        projected = sample.load_score + self._session_cost(sample)
+        p95 = sample.total_latency_p95
+        target = sample.latency_target_ms or self.latency_target_ms
+
+        if p95 > target * self.latency_headroom:
+            return AdmissionDecision(False, True, f"total p95 {p95:.0f}ms near target {target:.0f}ms",
+                                     sample.load_score, projected, p95)
+
+        if projected > self.load_threshold:
+            # Transient spikes (GC, bursts of LLM calls) clear quickly, so defer first
+            return AdmissionDecision(False, True, f"projected load {projected:.2f} over {self.load_threshold:.2f}",
+                                     sample.load_score, projected, p95)
+
+        return AdmissionDecision(True, False, "capacity available", sample.load_score, projected, p95)
+
+    def load_fnc(self, worker: Any = None) -> float:
+        """Load score reported to the LiveKit dispatcher"""
+        if worker is not None and hasattr(worker, "active_jobs"):
+            self.active_jobs = len(worker.active_jobs)
+        self.last_sample = self.monitor.sample(self.active_jobs)
+        return self.last_sample.load_score
+
+    async def request_fnc(self, job_request: Any):
+        """LiveKit job request handler: accept, defer and re-check, or reject"""
+        self.monitor.start()
+        
+        for attempt in range(self.max_defer_attempts + 1):
+            decision = self.evaluate()
+
+            if decision.accept:
+                self.admission_stats["accepted"] += 1
+                await job_request.accept()
+                return
+
+            if attempt < self.max_defer_attempts:
+                self.admission_stats["deferred"] += 1
+                logger.info(f"Deferring room {job_request.room.name}: {decision.reason}")
+                await asyncio.sleep(self.defer_seconds)
+
+        self.admission_stats["rejected"] += 1
+        logger.warning(f"Rejecting room {job_request.room.name}: {decision.reason}")
+        await job_request.reject()
+
+    def get_admission_status(self) -> Dict[str, Any]:
+        return {
+            "stats": dict(self.admission_stats),
+            "load_threshold": self.load_threshold,
+            "latency_target_ms": self.latency_target_ms,
+            "last_sample": asdict(self.last_sample) if self.last_sample else None
+        }
@@ -11,20 +11,64 @@ This module provides sophisticated audio processing capabilities including:
 """
 
 import asyncio
+import functools
 import logging
 import numpy as np
-import scipy.signal
 from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 from enum import Enum
 import json
-import librosa
-import soundfile as sf
 from livekit import rtc
 
+from lazy_imports import lazy_import
+from cpu_executor import CPUExecutorManager
+from metrics_journal import MetricsJournal, JournalSchema
+
 logger = logging.getLogger(__name__)
 
+# Heavy DSP/audio libraries load on first use, not at worker spawn
+scipy_signal = lazy_import("scipy.signal")
+librosa = lazy_import("librosa")
+sf = lazy_import("soundfile")
+
+
+@functools.lru_cache(maxsize=8)
+def shared_filter_bank(sample_rate: int, fft_size: int = 512) -> Tuple[np.ndarray, np.ndarray, Dict[str, Tuple[np.ndarray, np.ndarray]]]:
+    """
+    Analysis window, FFT bin frequencies and EQ band filters for a sample rate.
+    
+    Designed once per process and shared read-only by every processor, so a
+    new session (or a sample-rate change) does not redesign the filters.
+    """
+    window = np.hanning(fft_size)
+    freq_bins = np.fft.fftfreq(fft_size, 1 / sample_rate)
+    
+    # Define frequency ranges
+    bands = {
+        "low": (80, 250),
+        "mid_low": (250, 800),
+        "mid": (800, 2500),
+        "mid_high": (2500, 8000),
+        "high": (8000, sample_rate // 2)
+    }
+    
+    filters = {}
+    for band_name, (low_freq, high_freq) in bands.items():
+        # Create bandpass filter
+        nyquist = sample_rate / 2
+        low_norm = low_freq / nyquist
+        high_norm = min(high_freq / nyquist, 0.99)
+        
+        if low_norm < 0.99 and high_norm > low_norm:
+            b, a = scipy_signal.butter(4, [low_norm, high_norm], btype='band')
+            filters[band_name] = (b, a)
+        # Bands at or above Nyquist have no content at this sample rate and get no filter
+    
+    for array in (window, freq_bins, *(coefficient for pair in filters.values() for coefficient in pair)):
+        array.flags.writeable = False
+    return window, freq_bins, filters
+
 
 class AudioProcessingMode(Enum):
     """Audio processing modes"""
@@ -79,6 +123,22 @@ class AudioMetrics:
     measured_at: datetime
 
 
+# Noise types are journaled as a bitmask in NoiseType declaration order
+NOISE_TYPE_BITS = {noise_type: 1 << index for index, noise_type in enumerate(NoiseType)}
+
+# On-disk layout for AudioMetrics in the metrics journal
+AUDIO_JOURNAL_SCHEMA = JournalSchema("audio", [
+    ("measured_at", "d"),
+    ("signal_to_noise_ratio", "f"), ("dynamic_range", "f"), ("peak_level", "f"), ("rms_level", "f"),
+    ("spectral_centroid", "f"), ("spectral_rolloff", "f"), ("zero_crossing_rate", "f"),
+    ("noise_floor", "f"), ("detected_noise_types", "H"), ("noise_reduction_applied", "f"),
+    ("clarity_score", "f"), ("naturalness_score", "f"), ("intelligibility_score", "f"),
+    ("latency_ms", "f"), ("cpu_usage_percent", "f"),
+], converters={
+    "detected_noise_types": lambda noise_types: sum(NOISE_TYPE_BITS[t] for t in set(noise_types))
+})
+
+
 @dataclass
 class AudioProcessingSettings:
     """Audio processing configuration"""
@@ -122,9 +182,13 @@ class AdvancedAudioProcessor:
     Advanced real-time audio processing engine
     """
     
-    def __init__(self, sample_rate: int = 16000, buffer_size: int = 1024):
+    def __init__(self, sample_rate: int = 16000, buffer_size: int = 1024,
+                 cpu_executors: Optional[CPUExecutorManager] = None,
+                 metrics_journal: Optional[MetricsJournal] = None):
         self.sample_rate = sample_rate
         self.buffer_size = buffer_size
+        self.cpu_executors = cpu_executors
+        self.metrics_journal = metrics_journal
         
         # Processing settings
         self.settings = AudioProcessingSettings(
@@ -158,7 +222,6 @@ class AdvancedAudioProcessor:
         
         # Audio analysis buffers
         self.audio_buffer = np.zeros(sample_rate * 2)  # 2 second buffer
-        self.noise_profile = np.zeros(512)  # Noise spectral profile
         self.echo_buffer = np.zeros(sample_rate)  # 1 second echo buffer
         
         # Processing state
@@ -191,47 +254,18 @@ class AdvancedAudioProcessor:
         # FFT parameters
         self.fft_size = 512
         self.hop_length = 256
-        self.window = np.hanning(self.fft_size)
         
-        # Frequency bands for EQ
-        self.freq_bins = np.fft.fftfreq(self.fft_size, 1/self.sample_rate)
-        self.eq_filters = self._design_eq_filters()
+        # Window and EQ filters are shared by all processors at this sample rate
+        self.window, self.freq_bins, self.eq_filters = shared_filter_bank(self.sample_rate, self.fft_size)
         
-        # Noise reduction filters
+        # Noise reduction filters; one value per one-sided STFT bin
+        self.noise_profile = np.zeros(self.fft_size // 2 + 1)  # Noise spectral profile
         self.wiener_filter = np.ones(self.fft_size // 2 + 1)
         
         # Voice activity detection
         self.vad_threshold = 0.01
         self.vad_history = np.zeros(10)
     
-    def _design_eq_filters(self) -> Dict[str, np.ndarray]:
-        """Design EQ filters for different frequency bands"""
-        filters = {}
-        
-        # Define frequency ranges
-        bands = {
-            "low": (80, 250),
-            "mid_low": (250, 800),
-            "mid": (800, 2500),
-            "mid_high": (2500, 8000),
-            "high": (8000, self.sample_rate // 2)
-        }
-        
-        for band_name, (low_freq, high_freq) in bands.items():
-            # Create bandpass filter
-            nyquist = self.sample_rate / 2
-            low_norm = low_freq / nyquist
-            high_norm = min(high_freq / nyquist, 0.99)
-            
-            if low_norm < 0.99 and high_norm > low_norm:
-                b, a = scipy.signal.butter(4, [low_norm, high_norm], btype='band')
-                filters[band_name] = (b, a)
-            else:
-                # Handle edge cases
-                filters[band_name] = (np.array([1.0]), np.array([1.0]))
-        
-        return filters
-    
     async def process_audio_stream(self, audio_data: np.ndarray,
                                  processing_mode: AudioProcessingMode = AudioProcessingMode.VOICE_CHAT) -> Tuple[np.ndarray, AudioMetrics]:
         """
@@ -337,7 +371,7 @@ class AdvancedAudioProcessor:
         # Spectral analysis
         if len(audio_data) >= self.fft_size:
             # Compute STFT
-            f, t, stft = scipy.signal.stft(
+            f, t, stft = scipy_signal.stft(
                 audio_data, fs=self.sample_rate, 
                 window=self.window, nperseg=self.fft_size,
                 noverlap=self.fft_size//2
@@ -392,11 +426,18 @@ class AdvancedAudioProcessor:
     async def _apply_noise_suppression(self, audio_data: np.ndarray) -> np.ndarray:
         """Apply spectral subtraction noise suppression"""
         
+        if self.cpu_executors:
+            return await self.cpu_executors.run("dsp", self._noise_suppression, audio_data)
+        return self._noise_suppression(audio_data)
+    
+    def _noise_suppression(self, audio_data: np.ndarray) -> np.ndarray:
+        """STFT Wiener filter (CPU-bound; safe to run in the DSP pool)"""
+        
         if len(audio_data) < self.fft_size:
             return audio_data
         
         # Compute STFT
-        f, t, stft = scipy.signal.stft(
+        f, t, stft = scipy_signal.stft(
             audio_data, fs=self.sample_rate,
             window=self.window, nperseg=self.fft_size,
             noverlap=self.fft_size//2
@@ -430,7 +471,7 @@ class AdvancedAudioProcessor:
         filtered_stft = filtered_magnitude * np.exp(1j * phase)
         
         # Inverse STFT
-        _, filtered_audio = scipy.signal.istft(
+        _, filtered_audio = scipy_signal.istft(
             filtered_stft, fs=self.sample_rate,
             window=self.window, nperseg=self.fft_size,
             noverlap=self.fft_size//2
@@ -447,7 +488,7 @@ class AdvancedAudioProcessor:
     def _detect_voice_activity(self, magnitude: np.ndarray) -> np.ndarray:
         """Simple voice activity detection"""
         energy = np.sum(magnitude ** 2, axis=0)
-        energy_smooth = scipy.signal.medfilt(energy, kernel_size=3)
+        energy_smooth = scipy_signal.medfilt(energy, kernel_size=3)
         
         # Adaptive threshold
         threshold = np.percentile(energy_smooth, 30) * 2
@@ -473,8 +514,8 @@ class AdvancedAudioProcessor:
             echo_cancelled = audio_data - echo_estimate
             
             # Apply gentle high-pass filter to remove low-frequency rumble
-            b, a = scipy.signal.butter(2, 80.0 / (self.sample_rate / 2), btype='high')
-            echo_cancelled = scipy.signal.filtfilt(b, a, echo_cancelled)
+            b, a = scipy_signal.butter(2, 80.0 / (self.sample_rate / 2), btype='high')
+            echo_cancelled = scipy_signal.filtfilt(b, a, echo_cancelled)
             
             self.processing_stats["echo_cancellations"] += 1
             
@@ -563,6 +604,13 @@ class AdvancedAudioProcessor:
     async def _apply_equalization(self, audio_data: np.ndarray) -> np.ndarray:
         """Apply multi-band equalization"""
         
+        if self.cpu_executors:
+            return await self.cpu_executors.run("dsp", self._equalization, audio_data)
+        return self._equalization(audio_data)
+    
+    def _equalization(self, audio_data: np.ndarray) -> np.ndarray:
+        """Zero-phase band filtering (CPU-bound; safe to run in the DSP pool)"""
+        
         eq_audio = audio_data.copy()
         
         # Apply each EQ band
@@ -572,7 +620,7 @@ class AdvancedAudioProcessor:
                 
                 # Apply filter
                 try:
-                    filtered = scipy.signal.filtfilt(b, a, eq_audio)
+                    filtered = scipy_signal.filtfilt(b, a, eq_audio)
                     
                     # Apply gain
                     gain_linear = 10 ** (gain_db / 20)
@@ -606,8 +654,8 @@ class AdvancedAudioProcessor:
         """Reduce breath sounds"""
         
         # High-pass filter to identify breath-like sounds
-        b, a = scipy.signal.butter(4, 150.0 / (self.sample_rate / 2), btype='high')
-        high_freq = scipy.signal.filtfilt(b, a, audio_data)
+        b, a = scipy_signal.butter(4, 150.0 / (self.sample_rate / 2), btype='high')
+        high_freq = scipy_signal.filtfilt(b, a, audio_data)
         
         # Detect breath sounds (high frequency, low amplitude)
         breath_threshold = np.percentile(np.abs(high_freq), 70)
@@ -622,10 +670,11 @@ class AdvancedAudioProcessor:
     async def _apply_de_essing(self, audio_data: np.ndarray) -> np.ndarray:
         """Apply de-essing to reduce harsh sibilants"""
         
-        # Detect sibilant frequencies (4-8 kHz)
-        b, a = scipy.signal.butter(4, [4000.0, 8000.0], 
+        # Detect sibilant frequencies (4-8 kHz, capped below Nyquist as in the EQ bands)
+        high_freq = min(8000.0, 0.99 * self.sample_rate / 2)
+        b, a = scipy_signal.butter(4, [4000.0, high_freq], 
                                  btype='band', fs=self.sample_rate)
-        sibilant_band = scipy.signal.filtfilt(b, a, audio_data)
+        sibilant_band = scipy_signal.filtfilt(b, a, audio_data)
         
         # Dynamic de-essing based on sibilant energy
         sibilant_energy = np.abs(sibilant_band)
@@ -637,7 +686,7 @@ class AdvancedAudioProcessor:
         de_ess_gain[sibilant_mask] = 0.6  # Reduce by 40%
         
         # Smooth the gain
-        de_ess_gain = scipy.signal.medfilt(de_ess_gain, kernel_size=5)
+        de_ess_gain = scipy_signal.medfilt(de_ess_gain, kernel_size=5)
         
         return (audio_data * de_ess_gain).astype(np.float32)
     
@@ -645,9 +694,9 @@ class AdvancedAudioProcessor:
         """Enhance voice clarity and presence"""
         
         # Enhance vocal formants (800-2500 Hz)
-        b, a = scipy.signal.butter(4, [800.0, 2500.0], 
+        b, a = scipy_signal.butter(4, [800.0, 2500.0], 
                                  btype='band', fs=self.sample_rate)
-        vocal_formants = scipy.signal.filtfilt(b, a, audio_data)
+        vocal_formants = scipy_signal.filtfilt(b, a, audio_data)
         
         # Gentle boost
         enhanced = audio_data + vocal_formants * 0.15
@@ -757,6 +806,8 @@ class AdvancedAudioProcessor:
         
         # Store metrics
         self.metrics_history.append(metrics)
+        if self.metrics_journal:
+            self.metrics_journal.append(metrics)
         if len(self.metrics_history) > 100:
             self.metrics_history = self.metrics_history[-100:]
         
@@ -766,8 +817,8 @@ class AdvancedAudioProcessor:
         """Assess voice clarity score"""
         
         # High-frequency content indicates clarity
-        b, a = scipy.signal.butter(4, 2000.0 / (self.sample_rate / 2), btype='high')
-        high_freq = scipy.signal.filtfilt(b, a, audio_data)
+        b, a = scipy_signal.butter(4, 2000.0 / (self.sample_rate / 2), btype='high')
+        high_freq = scipy_signal.filtfilt(b, a, audio_data)
         
         # Clarity based on high-frequency energy
         hf_energy = np.mean(high_freq ** 2)
@@ -785,8 +836,8 @@ class AdvancedAudioProcessor:
         # Calculate spectral similarity
         if len(original_audio) >= self.fft_size and len(processed_audio) >= self.fft_size:
             # Compute spectrograms
-            _, _, stft_orig = scipy.signal.stft(original_audio, fs=self.sample_rate, nperseg=self.fft_size)
-            _, _, stft_proc = scipy.signal.stft(processed_audio, fs=self.sample_rate, nperseg=self.fft_size)
+            _, _, stft_orig = scipy_signal.stft(original_audio, fs=self.sample_rate, nperseg=self.fft_size)
+            _, _, stft_proc = scipy_signal.stft(processed_audio, fs=self.sample_rate, nperseg=self.fft_size)
             
             # Spectral correlation
             mag_orig = np.abs(stft_orig).flatten()
@@ -811,9 +862,9 @@ class AdvancedAudioProcessor:
         """Assess speech intelligibility"""
         
         # Focus on speech critical bands (300-3000 Hz)
-        b, a = scipy.signal.butter(4, [300.0, 3000.0], 
+        b, a = scipy_signal.butter(4, [300.0, 3000.0], 
                                  btype='band', fs=self.sample_rate)
-        speech_band = scipy.signal.filtfilt(b, a, audio_data)
+        speech_band = scipy_signal.filtfilt(b, a, audio_data)
         
         # Calculate speech energy ratio
         speech_energy = np.mean(speech_band ** 2)
@@ -833,7 +884,7 @@ class AdvancedAudioProcessor:
             return detected_types
         
         # Spectral analysis
-        f, t, stft = scipy.signal.stft(audio_data, fs=self.sample_rate, nperseg=self.fft_size)
+        f, t, stft = scipy_signal.stft(audio_data, fs=self.sample_rate, nperseg=self.fft_size)
         magnitude = np.abs(stft)
         
         # Frequency-based noise detection
@@ -982,6 +1033,34 @@ class AdvancedAudioProcessor:
                 setattr(self.settings, key, value)
                 logger.info(f"Updated audio processing setting: {key} = {value}")
     
+    def apply_optimization_settings(self, settings: Any):
+        """Reconfigure the processor from optimizer OptimizationSettings"""
+        
+        if settings.sample_rate != self.sample_rate:
+            self.sample_rate = settings.sample_rate
+            self.audio_buffer = np.zeros(self.sample_rate * 2)
+            self.echo_buffer = np.zeros(self.sample_rate)
+            self._setup_frequency_analysis()
+        
+        self.buffer_size = settings.chunk_size
+        
+        # Noise suppression strength follows the optimizer's complexity knob
+        complexity_strength = {
+            "minimal": 0.0,
+            "low": 0.5,
+            "medium": 0.7,
+            "high": 0.9
+        }
+        complexity = getattr(settings, "noise_suppression_complexity", "medium")
+        
+        self.update_settings({
+            "noise_suppression_enabled": settings.noise_suppression and complexity != "minimal",
+            "noise_suppression_strength": complexity_strength.get(complexity, 0.7),
+            "adaptive_noise_suppression": complexity == "high",
+            "echo_cancellation_enabled": settings.echo_cancellation,
+            "auto_gain_control": settings.auto_gain_control
+        })
+    
     def reset_adaptation(self):
         """Reset adaptive learning models"""
         
@@ -0,0 +1,262 @@
+"""
+Pre-Synthesized Response Audio Cache for VoiceFlow Pro
+
+This module keeps synthesized audio for fixed agent responses ready to play:
+- Content-addressed keys over text, voice, voice settings and TTS model
+- Raw PCM16 files on local disk, shared by every worker on the host
+- In-memory LRU of frame-sliced audio bounded by bytes
+- Pre-population of all static responses at worker start
+- Hit, miss and lookup latency statistics
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Iterable, Tuple
+
+from livekit import rtc
+
+from latency_sketch import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAGIC = b"VFAC"
+CACHE_FORMAT_VERSION = 1
+# magic, version, sample rate, channels, samples per channel per frame
+_HEADER = struct.Struct("<4sHIHH")
+
+# Returns (PCM16 bytes, sample_rate, num_channels) for a text
+SynthesizeFnc = Callable[[str], Awaitable[Tuple[bytes, int, int]]]
+
+
+def audio_cache_key(text: str, voice_id: str, model: str, voice_settings: Optional[Dict[str, Any]] = None) -> str:
+    """Content address of one synthesized response"""
+    identity = json.dumps(
+        {"text": text, "voice_id": voice_id, "model": model, "settings": voice_settings or {}},
+        sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(identity.encode()).hexdigest()
+
+
+@dataclass
+class CachedAudio:
+    """Synthesized response sliced into publishable frames"""
+    key: str
+    pcm: bytes
+    sample_rate: int
+    num_channels: int
+    samples_per_frame: int
+    _frames: List[rtc.AudioFrame] = field(default_factory=list, repr=False)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.pcm)
+
+    @property
+    def duration_ms(self) -> float:
+        return len(self.pcm) / (2 * self.num_channels) / self.sample_rate * 1000
+
+    def frames(self) -> List[rtc.AudioFrame]:
+        """Audio frames ready for ``rtc.AudioSource.capture_frame``; built once"""
+        if not self._frames:
+            frame_bytes = self.samples_per_frame * self.num_channels * 2
+            view = memoryview(self.pcm)
+            for offset in range(0, len(self.pcm), frame_bytes):
+                chunk = view[offset:offset + frame_bytes]
+                if len(chunk) < frame_bytes:
+                    # Pad the tail so every frame has the same duration
+                    chunk = bytes(chunk) + bytes(frame_bytes - len(chunk))
+                self._frames.append(rtc.AudioFrame(
+                    data=chunk,
+                    sample_rate=self.sample_rate,
+                    num_channels=self.num_channels,
+                    samples_per_channel=self.samples_per_frame
+                ))
+        return self._frames
+
+
+class SynthesizedAudioCache:
+    """
+    Two-level cache of synthesized response audio.
+
+    Disk entries are written atomically (temporary file and rename) so
+    workers populating the same directory never see partial files. Memory
+    entries are kept in least-recently-used order and evicted once their
+    PCM exceeds ``max_memory_bytes``. Lookups never synthesize; a miss
+    falls through to live TTS.
+    """
+
+    def __init__(self, directory: str, max_memory_bytes: int = 32 * 1024 * 1024, frame_ms: int = 20):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.frame_ms = frame_ms
+
+        self._memory: "OrderedDict[str, CachedAudio]" = OrderedDict()
+        self._memory_bytes = 0
+        self._populating: Optional[asyncio.Task] = None
+
+        self.lookup_latency = LatencyHistogram()
+        self.cache_stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "synthesized": 0,
+            "synthesis_failures": 0
+        }
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.pcm")
+
+    def _remember(self, audio: CachedAudio):
+        previous = self._memory.pop(audio.key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.nbytes
+        self._memory[audio.key] = audio
+        self._memory_bytes += audio.nbytes
+
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+            self.cache_stats["evictions"] += 1
+
+    def _read(self, key: str) -> Optional[CachedAudio]:
+        try:
+            with open(self._path(key), "rb") as f:
+                header = f.read(_HEADER.size)
+                pcm = f.read()
+        except FileNotFoundError:
+            return None
+
+        if len(header) < _HEADER.size:
+            return None
+        magic, version, sample_rate, num_channels, samples_per_frame = _HEADER.unpack(header)
+        if magic != CACHE_MAGIC or version != CACHE_FORMAT_VERSION:
+            logger.warning(f"Ignoring audio cache entry {key} with unknown format")
+            return None
+        return CachedAudio(key, pcm, sample_rate, num_channels, samples_per_frame)
+
+    def get(self, key: str) -> Optional[CachedAudio]:
+        """Memory, then disk; returns None on a miss"""
+        start = time.perf_counter()
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.cache_stats["memory_hits"] += 1
+        else:
+            audio = self._read(key)
+            if audio is None:
+                self.cache_stats["misses"] += 1
+                return None
+            self._remember(audio)
+            self.cache_stats["disk_hits"] += 1
+
+        # Time to first publishable frame
+        audio.frames()
+        self.lookup_latency.record((time.perf_counter() - start) * 1000)
+        return audio
+
+    def contains(self, key: str) -> bool:
+        return key in self._memory or os.path.exists(self._path(key))
+
+    def put(self, key: str, pcm: bytes, sample_rate: int, num_channels: int = 1) -> CachedAudio:
+        samples_per_frame = sample_rate * self.frame_ms // 1000
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(CACHE_MAGIC, CACHE_FORMAT_VERSION, sample_rate, num_channels, samples_per_frame))
+                f.write(pcm)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        audio = CachedAudio(key, pcm, sample_rate, num_channels, samples_per_frame)
+        self._remember(audio)
+        return audio
+
+    def preload(self, keys: Iterable[str]) -> int:
+        """Load existing disk entries into memory (synchronous; for process start)"""
+        loaded = 0
+        for key in keys:
+            if key in self._memory:
+                continue
+            audio = self._read(key)
+            if audio is not None:
+                self._remember(audio)
+                loaded += 1
+        return loaded
+
+    async def prepopulate(self, entries: Dict[str, str], synthesize_fnc: SynthesizeFnc,
+                          concurrency: int = 4) -> int:
+        """
+        Synthesize every ``{key: text}`` entry not yet on disk.
+
+        Failures are logged and left as misses; they are retried on the next
+        call. Returns the number of entries synthesized.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        missing = {key: text for key, text in entries.items() if not self.contains(key)}
+
+        async def synthesize(key: str, text: str) -> bool:
+            async with semaphore:
+                try:
+                    pcm, sample_rate, num_channels = await synthesize_fnc(text)
+                except Exception as e:
+                    self.cache_stats["synthesis_failures"] += 1
+                    logger.warning(f"Could not pre-synthesize response audio: {e}")
+                    return False
+                self.put(key, pcm, sample_rate, num_channels)
+                self.cache_stats["synthesized"] += 1
+                return True
+
+        results = await asyncio.gather(*(synthesize(key, text) for key, text in missing.items()))
+        self.preload(key for key in entries if key not in missing)
+        if missing:
+            logger.info(f"Pre-synthesized {sum(results)}/{len(missing)} response clips "
+                        f"({len(entries) - len(missing)} already cached)")
+        return sum(results)
+
+    def start_prepopulate(self, entries: Dict[str, str], synthesize_fnc: SynthesizeFnc) -> asyncio.Task:
+        """Run ``prepopulate`` once per process in the background"""
+        if self._populating is None or (self._populating.done()
+                                        and not all(self.contains(key) for key in entries)):
+            self._populating = asyncio.ensure_future(self.prepopulate(entries, synthesize_fnc))
+        return self._populating
+
+    def get_statistics(self) -> Dict[str, Any]:
+        lookups = self.cache_stats["memory_hits"] + self.cache_stats["disk_hits"] + self.cache_stats["misses"]
+        hits = self.cache_stats["memory_hits"] + self.cache_stats["disk_hits"]
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "lookup_ms": self.lookup_latency.summary(),
+            **self.cache_stats
+        }
+
+
+def tts_synthesizer(tts: Any) -> SynthesizeFnc:
+    """Adapt a LiveKit TTS plugin to ``SynthesizeFnc``"""
+    async def synthesize(text: str) -> Tuple[bytes, int, int]:
+        chunks = []
+        sample_rate, num_channels = tts.sample_rate, tts.num_channels
+        async with tts.synthesize(text) as stream:
+            async for event in stream:
+                chunks.append(bytes(event.frame.data))
+                sample_rate, num_channels = event.frame.sample_rate, event.frame.num_channels
+        return b"".join(chunks), sample_rate, num_channels
+    return synthesize
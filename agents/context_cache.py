@@ -0,0 +1,125 @@
+"""
+Near Cache for Context Layers in VoiceFlow Pro
+
+This module keeps recently read Redis context layers in process memory:
+- Decoded objects, so a hit skips the round trip and JSON decoding
+- Per-entry TTL and least-recently-used eviction, bounded by entries and bytes
+- Absent keys are cached too (a missing global policy is not re-fetched every turn)
+- Explicit invalidation (local writes, Redis keyspace notifications), with
+  fill tokens so a read that raced an invalidation is not cached
+- Hit, miss, eviction, expiry and invalidation statistics
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Returned by ``get`` when the key is not cached (None is a cached absent key)
+MISSING = object()
+
+
+class ContextNearCache:
+    """
+    TTL + LRU cache of decoded context layers.
+
+    Cached objects are shared by every reader in the process and must be
+    treated as read-only. A fill uses the token taken before its fetch
+    started; if the key was invalidated in between, the fill is dropped.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        # key -> (value, size, expires_at)
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+
+        # Invalidation generations of recently invalidated keys; older ones are covered by _floor
+        self._generation = 0
+        self._invalidated: Dict[str, int] = {}
+        self._floor = 0
+
+        self.cache_stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "stale_fills": 0
+        }
+
+    def get(self, key: str) -> Any:
+        """The cached value (possibly None for an absent key), or ``MISSING``"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.cache_stats["misses"] += 1
+            return MISSING
+        if entry[2] <= time.monotonic():
+            self._drop(key)
+            self.cache_stats["expirations"] += 1
+            self.cache_stats["misses"] += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.cache_stats["hits"] += 1
+        return entry[0]
+
+    def token(self) -> int:
+        """Take before fetching a key from Redis; pass to ``put``"""
+        return self._generation
+
+    def put(self, key: str, value: Any, size: int, ttl_seconds: float, token: int):
+        if token < self._floor or self._invalidated.get(key, -1) >= token:
+            # Invalidated while the fetch was in flight
+            self.cache_stats["stale_fills"] += 1
+            return
+        if ttl_seconds <= 0 or size > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = (value, size, time.monotonic() + ttl_seconds)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.cache_stats["evictions"] += 1
+
+    def invalidate(self, key: str):
+        self._drop(key)
+        self._invalidated[key] = self._generation
+        self._generation += 1
+        self.cache_stats["invalidations"] += 1
+        if len(self._invalidated) > self.max_entries:
+            # Fills that started before now are dropped whatever their key
+            self._invalidated.clear()
+            self._floor = self._generation
+
+    def clear(self):
+        """Drop everything, e.g. when invalidation messages may have been lost"""
+        self._entries.clear()
+        self._bytes = 0
+        self._invalidated.clear()
+        self._generation += 1
+        self._floor = self._generation
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        lookups = self.cache_stats["hits"] + self.cache_stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hit_rate": self.cache_stats["hits"] / lookups if lookups else 0.0,
+            **self.cache_stats
+        }
@@ -6,24 +6,45 @@ This module implements sophisticated conversation context management that:
 - Provides intelligent conversation continuity
 - Manages long-term customer relationship memory
 - Handles context-aware response generation
+- One manager per worker process, shared by every session (see service_registry)
+- All context layers read in one MGET round trip; writes issued together
+  are coalesced into one pipelined round trip
+- Redis round-trip counts and latency per command and per call
+- Per-process near cache of decoded layers (global policies and customer
+  memory barely change during a call), invalidated by local writes and,
+  when enabled, Redis keyspace notifications
+- Short-term layer maintained by a background per-session summarizer
+  (see context_summarizer); replies never wait for summarization
 """
 
 import asyncio
+import contextlib
 import logging
 import json
 import pickle
 import hashlib
+import time
 from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 from enum import Enum
-import aioredis
-import openai
 
-from voice_agent import CustomerContext, Scenario, Priority
+from customer_context import CustomerContext, Scenario, Priority
+from model_router import ModelRouter
+from admission_control import WorkerLoadMonitor
+from cpu_executor import CPUExecutorManager
+from lazy_imports import lazy_import
+from service_registry import shared_openai_client
+from latency_sketch import LatencyHistogram
+from context_cache import ContextNearCache, MISSING
+from context_summarizer import (SessionSummarizer, DRIFT_TURNS, build_summary_messages, parse_summary,
+                                usage_tokens)
 
 logger = logging.getLogger(__name__)
 
+# Redis client loads when a context manager is first initialized
+aioredis = lazy_import("aioredis")
+
 
 class ContextType(Enum):
     """Types of conversation context"""
@@ -87,15 +108,35 @@ class ContextualMemory:
         return cls(**data)
 
 
+def _loads_many(values: List[Any]) -> List[Dict[str, Any]]:
+    return [json.loads(value) for value in values]
+
+
 class AdvancedContextManager:
     """
-    Advanced conversation context management with multi-layered memory
+    Advanced conversation context management with multi-layered memory.
+    
+    Keeps no per-session state beyond the summarizer's latest short-term
+    layers (everything else is keyed by customer and session in Redis), so
+    one instance and its Redis and OpenAI clients serve every session in
+    the process.
     """
     
-    def __init__(self, redis_url: str = "redis://localhost:6379"):
+    def __init__(self, redis_url: str = "redis://localhost:6379",
+                 model_router: Optional[ModelRouter] = None,
+                 load_monitor: Optional[WorkerLoadMonitor] = None,
+                 cpu_executors: Optional[CPUExecutorManager] = None,
+                 near_cache: Optional[ContextNearCache] = None,
+                 keyspace_invalidation: bool = False,
+                 summary_drift_turns: int = DRIFT_TURNS):
         self.redis_url = redis_url
         self.redis_client: Optional[aioredis.Redis] = None
-        self.openai_client = openai.AsyncOpenAI()
+        # Sessions sharing this manager must not each open a connection
+        self._initialize_lock = asyncio.Lock()
+        self.openai_client = shared_openai_client()
+        self.model_router = model_router
+        self.load_monitor = load_monitor
+        self.cpu_executors = cpu_executors
         
         # Context storage keys
         self.context_keys = {
@@ -120,15 +161,82 @@ class AdvancedContextManager:
             ContextType.LONG_TERM: 0.2,
             ContextType.GLOBAL: 0.1
         }
+        
+        # How long each layer may be served from process memory (0: always read Redis).
+        # The short-term layer is rewritten every turn by the session's own process,
+        # whose writes invalidate it, so only a short TTL guards against other writers.
+        self.near_cache = near_cache if near_cache is not None else ContextNearCache()
+        self.near_cache_ttls = {
+            ContextType.SHORT_TERM: 10,
+            ContextType.MEDIUM_TERM: 60,
+            ContextType.LONG_TERM: 300,
+            ContextType.GLOBAL: 300
+        }
+        # Writes by other processes reach the cache as keyspace notifications
+        # (the server needs notify-keyspace-events to include K$gx)
+        self.keyspace_invalidation = keyspace_invalidation
+        self._invalidation_task: Optional[asyncio.Task] = None
+        
+        # Writes waiting for the next pipeline, latest payload per key
+        self._pending_writes: Dict[str, Tuple[Any, Optional[int]]] = {}
+        self._write_waiters: List[asyncio.Future] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        
+        self.redis_stats = {
+            "round_trips": 0,
+            "keys_read": 0,
+            "keys_written": 0,
+            "coalesced_writes": 0,
+            "errors": 0
+        }
+        self.redis_latency: Dict[str, LatencyHistogram] = {}
+        self.call_latency: Dict[str, LatencyHistogram] = {}
+        
+        # Per-turn summarization runs behind the reply, one worker per session
+        self.summarizer = SessionSummarizer(
+            self._summarize_turns,
+            lambda customer_id, session_id: self.retrieve_context(customer_id, session_id, ContextType.SHORT_TERM),
+            lambda customer_id, session_id, layer: self.store_context(
+                customer_id, session_id, ContextType.SHORT_TERM, layer),
+            drift_turns=summary_drift_turns
+        )
     
-    async def initialize(self):
-        """Initialize Redis connection and context manager"""
+    async def initialize(self, redis_client: Optional[Any] = None):
+        """Initialize Redis connection (or adopt ``redis_client``) and context manager"""
+        async with self._initialize_lock:
+            if self.redis_client:
+                return
+            try:
+                self.redis_client = redis_client or await aioredis.from_url(self.redis_url)
+                if self.keyspace_invalidation:
+                    self._invalidation_task = asyncio.create_task(self._listen_for_invalidations())
+                logger.info("Context manager initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize context manager: {e}")
+                raise
+    
+    async def _listen_for_invalidations(self):
+        """Drop near-cached layers that any process writes, deletes or lets expire"""
+        pubsub = self.redis_client.pubsub()
         try:
-            self.redis_client = await aioredis.from_url(self.redis_url)
-            logger.info("Context manager initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize context manager: {e}")
+            await pubsub.psubscribe("__keyspace@*__:ctx:*")
+            async for message in pubsub.listen():
+                if message.get("type") != "pmessage":
+                    continue
+                channel = message["channel"]
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                # __keyspace@<db>__:<key>
+                self.near_cache.invalidate(channel.split("__:", 1)[1])
+        except asyncio.CancelledError:
             raise
+        except Exception as e:
+            # Notifications may have been missed; only TTLs bound staleness from here on
+            self.near_cache.clear()
+            logger.warning(f"Context keyspace notifications stopped: {e}")
+        finally:
+            with contextlib.suppress(Exception):
+                await pubsub.close()
     
     async def store_context(self, customer_id: str, session_id: str, 
                           context_type: ContextType, context_data: Dict[str, Any]):
@@ -149,22 +257,82 @@ class AdvancedContextManager:
             'session_id': session_id
         })
         
+        start = time.perf_counter()
         try:
+            payload = await self._serialize(context_data)
+            
             # Store with appropriate TTL
             retention = self.retention_periods[context_type]
-            if retention:
-                await self.redis_client.setex(
-                    key, 
-                    int(retention.total_seconds()), 
-                    json.dumps(context_data)
-                )
-            else:
-                await self.redis_client.set(key, json.dumps(context_data))
+            await self._queue_write(key, payload, int(retention.total_seconds()) if retention else None)
             
             logger.info(f"Stored {context_type.value} context for customer {customer_id}")
             
         except Exception as e:
             logger.error(f"Failed to store context: {e}")
+        self._record_call("store_context", start)
+    
+    async def _queue_write(self, key: str, payload: Any, ttl_seconds: Optional[int]):
+        """Write on the next pipeline flush and wait for it"""
+        if key in self._pending_writes:
+            # A newer payload for the same key supersedes the queued one
+            self.redis_stats["coalesced_writes"] += 1
+        self.near_cache.invalidate(key)
+        self._pending_writes[key] = (payload, ttl_seconds)
+        waiter = asyncio.get_running_loop().create_future()
+        self._write_waiters.append(waiter)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_writes())
+        await waiter
+    
+    async def _flush_writes(self):
+        """Send queued writes in one pipeline per round; writes queued meanwhile go in the next"""
+        try:
+            while self._pending_writes:
+                # Let every session writing in this loop iteration join the pipeline
+                await asyncio.sleep(0)
+                writes, self._pending_writes = self._pending_writes, {}
+                waiters, self._write_waiters = self._write_waiters, []
+                try:
+                    pipeline = self.redis_client.pipeline(transaction=False)
+                    for key, (payload, ttl_seconds) in writes.items():
+                        if ttl_seconds:
+                            pipeline.setex(key, ttl_seconds, payload)
+                        else:
+                            pipeline.set(key, payload)
+                    await self._round_trip("pipeline", pipeline.execute())
+                    self.redis_stats["keys_written"] += len(writes)
+                    # Reads that started while the pipeline was in flight must not cache the old value
+                    for key in writes:
+                        self.near_cache.invalidate(key)
+                except Exception as e:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(e)
+                else:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_result(None)
+        finally:
+            self._flush_task = None
+    
+    async def _round_trip(self, command: str, awaitable: Any) -> Any:
+        """Await one Redis round trip, recording its latency"""
+        start = time.perf_counter()
+        self.redis_stats["round_trips"] += 1
+        try:
+            return await awaitable
+        except Exception:
+            self.redis_stats["errors"] += 1
+            raise
+        finally:
+            if command not in self.redis_latency:
+                self.redis_latency[command] = LatencyHistogram()
+            self.redis_latency[command].record((time.perf_counter() - start) * 1000)
+    
+    def _record_call(self, name: str, start: float):
+        if name not in self.call_latency:
+            self.call_latency[name] = LatencyHistogram()
+        self.call_latency[name].record((time.perf_counter() - start) * 1000)
     
     async def retrieve_context(self, customer_id: str, session_id: str, 
                              context_type: ContextType) -> Optional[Dict[str, Any]]:
@@ -177,25 +345,87 @@ class AdvancedContextManager:
             session_id=session_id
         )
         
+        ttl_seconds = self.near_cache_ttls[context_type]
+        if ttl_seconds:
+            cached = self.near_cache.get(key)
+            if cached is not MISSING:
+                return cached
+        
         try:
-            data = await self.redis_client.get(key)
-            if data:
-                return json.loads(data)
-            return None
+            token = self.near_cache.token()
+            data = await self._round_trip("get", self.redis_client.get(key))
+            self.redis_stats["keys_read"] += 1
+            context = await self._deserialize(data) if data else None
+            if ttl_seconds:
+                self.near_cache.put(key, context, len(data) if data else 0, ttl_seconds, token)
+            return context
         except Exception as e:
             logger.error(f"Failed to retrieve context: {e}")
             return None
     
+    async def _serialize(self, context_data: Dict[str, Any]) -> str:
+        """Encode context JSON, in the serialization pool when available"""
+        if self.cpu_executors:
+            return await self.cpu_executors.run("serialization", json.dumps, context_data)
+        return json.dumps(context_data)
+    
+    async def _deserialize(self, data: Any) -> Dict[str, Any]:
+        """Decode context JSON, in the serialization pool when available"""
+        if self.cpu_executors:
+            return await self.cpu_executors.run("serialization", json.loads, data)
+        return json.loads(data)
+    
+    async def _deserialize_many(self, values: List[Any]) -> List[Dict[str, Any]]:
+        """Decode several context payloads in a single pool hop"""
+        if self.cpu_executors:
+            return await self.cpu_executors.run("serialization", _loads_many, values)
+        return _loads_many(values)
+    
     async def build_comprehensive_context(self, customer_id: str, 
                                         session_id: str) -> Dict[str, Any]:
         """Build comprehensive context from all layers"""
+        start = time.perf_counter()
         contexts = {}
         
-        # Retrieve all context types
+        # This process summarizes the session, so its latest short-term layer is in memory
+        short_term = self.summarizer.layer(customer_id, session_id)
+        if short_term is not None:
+            contexts[ContextType.SHORT_TERM.value] = short_term
+        
+        # Near-cached layers first, then every other layer in one round trip
+        missing = []
         for context_type in ContextType:
-            context = await self.retrieve_context(customer_id, session_id, context_type)
-            if context:
-                contexts[context_type.value] = context
+            if context_type.value in contexts:
+                continue
+            key = self.context_keys[context_type].format(customer_id=customer_id, session_id=session_id)
+            cached = self.near_cache.get(key) if self.near_cache_ttls[context_type] else MISSING
+            if cached is MISSING:
+                missing.append((context_type, key))
+            elif cached:
+                contexts[context_type.value] = cached
+        
+        if missing:
+            try:
+                if not self.redis_client:
+                    await self.initialize()
+                token = self.near_cache.token()
+                keys = [key for _, key in missing]
+                values = await self._round_trip("mget", self.redis_client.mget(keys))
+                self.redis_stats["keys_read"] += len(keys)
+                decoded = iter(await self._deserialize_many([value for value in values if value]))
+                for (context_type, key), value in zip(missing, values):
+                    context = next(decoded) if value else None
+                    if context:
+                        contexts[context_type.value] = context
+                    if self.near_cache_ttls[context_type]:
+                        self.near_cache.put(key, context, len(value) if value else 0,
+                                            self.near_cache_ttls[context_type], token)
+            except Exception as e:
+                logger.error(f"Failed to retrieve context layers: {e}")
+        
+        # Layers in the order of ContextType, whether cached or fetched
+        contexts = {context_type.value: contexts[context_type.value]
+                    for context_type in ContextType if context_type.value in contexts}
         
         # Build weighted context summary
         comprehensive_context = {
@@ -206,13 +436,20 @@ class AdvancedContextManager:
             'context_layers': contexts
         }
         
+        self._record_call("build_comprehensive_context", start)
         return comprehensive_context
     
     async def generate_context_aware_response(self, customer_context: CustomerContext, 
                                             current_message: str, 
-                                            scenario: Scenario) -> str:
+                                            scenario: Scenario,
+                                            turn_budget_ms: Optional[float] = None) -> str:
         """Generate response using full contextual awareness"""
         
+        # Pick the best LLM predicted to fit what is left of the turn budget
+        model = "gpt-4-turbo-preview"
+        if self.model_router:
+            model = self.model_router.select("llm", turn_budget_ms).model
+        
         # Get comprehensive context
         full_context = await self.build_comprehensive_context(
             customer_context.room_id, 
@@ -225,20 +462,23 @@ class AdvancedContextManager:
         )
         
         try:
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": context_prompt},
-                    {"role": "user", "content": current_message}
-                ],
-                temperature=0.3,
-                max_tokens=200
-            )
+            tracker = self.model_router.track("llm", model) if self.model_router else contextlib.nullcontext()
+            inflight = self.load_monitor.track_llm_call() if self.load_monitor else contextlib.nullcontext()
+            async with inflight, tracker:
+                response = await self.openai_client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": context_prompt},
+                        {"role": "user", "content": current_message}
+                    ],
+                    temperature=0.3,
+                    max_tokens=200
+                )
             
             generated_response = response.choices[0].message.content
             
-            # Update short-term context with this exchange
-            await self._update_short_term_context(
+            # Update short-term context with this exchange, behind the reply
+            self._update_short_term_context(
                 customer_context, current_message, generated_response, scenario
             )
             
@@ -289,11 +529,11 @@ class AdvancedContextManager:
         
         if 'short_term' in contexts:
             short_term = contexts['short_term']
-            if short_term.get('conversation_summary'):
+            if short_term.get('session_summary'):
                 prompt_sections.extend([
                     "",
                     "CURRENT SESSION CONTEXT:",
-                    f"- Session summary: {short_term['conversation_summary']}"
+                    f"- Session summary: {short_term['session_summary']}"
                 ])
         
         # Add current scenario context
@@ -331,125 +571,44 @@ class AdvancedContextManager:
         
         return "\n".join(prompt_sections)
     
-    async def _update_short_term_context(self, customer_context: CustomerContext, 
-                                       user_message: str, agent_response: str, 
-                                       scenario: Scenario):
-        """Update short-term context with new conversation turn"""
-        
-        # Get existing short-term context
-        existing_context = await self.retrieve_context(
-            customer_context.room_id, 
-            customer_context.participant_id, 
-            ContextType.SHORT_TERM
-        ) or {}
-        
-        # Extract key information from the exchange
-        exchange_summary = await self._summarize_exchange(
-            user_message, agent_response, scenario
-        )
-        
-        # Update context
-        conversation_turns = existing_context.get('conversation_turns', [])
-        conversation_turns.append({
-            'timestamp': datetime.now().isoformat(),
-            'user_message': user_message,
-            'agent_response': agent_response,
-            'scenario': scenario.value,
-            'summary': exchange_summary
-        })
-        
-        # Keep only last 10 turns for short-term context
-        conversation_turns = conversation_turns[-10:]
-        
-        # Generate overall session summary
-        session_summary = await self._generate_session_summary(conversation_turns)
-        
-        short_term_context = {
-            'conversation_turns': conversation_turns,
-            'session_summary': session_summary,
-            'last_scenario': scenario.value,
-            'key_topics': await self._extract_key_topics(conversation_turns),
-            'customer_sentiment': customer_context.sentiment_scores[-5:] if customer_context.sentiment_scores else [],
-            'lead_score_progression': [customer_context.lead_score]
-        }
-        
-        # Store updated context
-        await self.store_context(
+    def _update_short_term_context(self, customer_context: CustomerContext, 
+                                 user_message: str, agent_response: str, 
+                                 scenario: Scenario):
+        """Queue the conversation turn for the session's background summarizer"""
+        self.summarizer.submit(
             customer_context.room_id,
             customer_context.participant_id,
-            ContextType.SHORT_TERM,
-            short_term_context
+            {
+                'timestamp': datetime.now().isoformat(),
+                'user_message': user_message,
+                'agent_response': agent_response,
+                'scenario': scenario.value
+            },
+            {
+                'customer_sentiment': customer_context.sentiment_scores[-5:] if customer_context.sentiment_scores else [],
+                'lead_score_progression': [customer_context.lead_score]
+            }
         )
     
-    async def _summarize_exchange(self, user_message: str, agent_response: str, 
-                                scenario: Scenario) -> str:
-        """Generate concise summary of conversation exchange"""
-        try:
+    async def _summarize_turns(self, short_term: Dict[str, Any],
+                               turns: List[Dict[str, Any]], full: bool) -> Dict[str, Any]:
+        """Fold the new turns into the session summary (or rebuild it) in one structured request"""
+        inflight = self.load_monitor.track_llm_call() if self.load_monitor else contextlib.nullcontext()
+        async with inflight:
             response = await self.openai_client.chat.completions.create(
                 model="gpt-3.5-turbo",
-                messages=[{
-                    "role": "user",
-                    "content": f"Summarize this conversation exchange in one concise sentence:\n\nCustomer: {user_message}\nAgent: {agent_response}\nScenario: {scenario.value}"
-                }],
+                messages=build_summary_messages(short_term, turns, full),
+                response_format={"type": "json_object"},
                 temperature=0.2,
-                max_tokens=50
+                max_tokens=150 + 50 * len(turns)
             )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            logger.error(f"Failed to summarize exchange: {e}")
-            return f"Customer discussed {scenario.value} topics"
+        result = parse_summary(response.choices[0].message.content, len(turns))
+        result["tokens"] = usage_tokens(getattr(response, "usage", None))
+        return result
     
-    async def _generate_session_summary(self, conversation_turns: List[Dict]) -> str:
-        """Generate summary of entire session"""
-        if not conversation_turns:
-            return "New session started"
-        
-        try:
-            # Create a condensed version of the conversation
-            conversation_text = "\n".join([
-                f"Turn {i+1}: {turn.get('summary', 'No summary')}"
-                for i, turn in enumerate(conversation_turns)
-            ])
-            
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{
-                    "role": "user",
-                    "content": f"Create a concise summary of this conversation session:\n\n{conversation_text}"
-                }],
-                temperature=0.2,
-                max_tokens=100
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            logger.error(f"Failed to generate session summary: {e}")
-            return "Session with multiple conversation turns"
-    
-    async def _extract_key_topics(self, conversation_turns: List[Dict]) -> List[str]:
-        """Extract key topics from conversation"""
-        if not conversation_turns:
-            return []
-        
-        try:
-            summaries = [turn.get('summary', '') for turn in conversation_turns]
-            combined_text = " ".join(summaries)
-            
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{
-                    "role": "user",
-                    "content": f"Extract 3-5 key topics from this conversation as a comma-separated list:\n\n{combined_text}"
-                }],
-                temperature=0.2,
-                max_tokens=50
-            )
-            
-            topics = response.choices[0].message.content.strip()
-            return [topic.strip() for topic in topics.split(',')][:5]
-            
-        except Exception as e:
-            logger.error(f"Failed to extract key topics: {e}")
-            return ["general inquiry"]
+    async def end_session(self, customer_id: str, session_id: str):
+        """Store the session's queued turns and release its summarizer state"""
+        await self.summarizer.end_session(customer_id, session_id)
     
     async def prepare_session_handoff(self, customer_id: str, session_id: str, 
                                     handoff_type: str) -> Dict[str, Any]:
@@ -541,6 +700,27 @@ class AdvancedContextManager:
     
     async def close(self):
         """Clean up resources"""
+        # Summaries still being made are stored before the writes are flushed
+        await self.summarizer.close()
+        if self._flush_task:
+            # Queued context writes go out before the connection closes
+            await self._flush_task
+        if self._invalidation_task:
+            self._invalidation_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._invalidation_task
+            self._invalidation_task = None
         if self.redis_client:
             await self.redis_client.close()
-            logger.info("Context manager closed")
\ No newline at end of file
+            self.redis_client = None
+            logger.info("Context manager closed")
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            **self.redis_stats,
+            "pending_writes": len(self._pending_writes),
+            "redis_ms": {command: histogram.summary() for command, histogram in self.redis_latency.items()},
+            "call_ms": {name: histogram.summary() for name, histogram in self.call_latency.items()},
+            "near_cache": self.near_cache.get_statistics(),
+            "summarizer": self.summarizer.get_statistics()
+        }
@@ -0,0 +1,313 @@
+"""
+Background Session Summarization for VoiceFlow Pro
+
+This module keeps the short-term context layer up to date off the response path:
+- A reply only queues its turn; one worker per session does the summarizing
+- Turns queued while a summarization is in flight are coalesced into the
+  next one: a single LLM request with structured (JSON) output summarizes
+  every pending turn and updates the session summary and key topics
+- The session's last good layer stays in memory, so the next prompt sees
+  it before (and even if) the Redis write lands
+- Incremental: only the new turns are folded into the previous session
+  summary and topic set, so a request's size does not grow with the
+  conversation; a full re-summary of the turn window is forced after a
+  drift threshold of folded turns
+- A failed summarization keeps the previous session summary and topics
+- Queue, batch size, failure, staleness, and per-mode summarization
+  latency and tokens per turn statistics
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+
+from latency_sketch import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Turns kept in the short-term layer
+MAX_TURNS = 10
+
+# Idle sessions whose last layer stays in memory
+MAX_IDLE_SESSIONS = 1000
+
+# Turns folded into a session summary before it is rebuilt from the turn window
+DRIFT_TURNS = 8
+
+SUMMARY_MODES = ("incremental", "full")
+
+# (previous short-term layer, new turns, full re-summary) -> parsed structured summary
+SummarizeFnc = Callable[[Dict[str, Any], List[Dict[str, Any]], bool], Awaitable[Dict[str, Any]]]
+# (customer_id, session_id) -> stored short-term layer
+LoadFnc = Callable[[str, str], Awaitable[Optional[Dict[str, Any]]]]
+# (customer_id, session_id, layer)
+StoreFnc = Callable[[str, str, Dict[str, Any]], Awaitable[None]]
+
+
+def build_summary_messages(layer: Dict[str, Any], turns: List[Dict[str, Any]],
+                           full: bool = False) -> List[Dict[str, str]]:
+    """
+    One request for every pending turn, the session summary and the topics.
+
+    Incremental requests carry the previous summary and topics only; a full
+    re-summary carries the summaries of the earlier turns in the window
+    instead and rebuilds both from them.
+    """
+    sections = []
+    if full:
+        earlier = [turn.get("summary") for turn in layer.get("conversation_turns", []) if turn.get("summary")]
+        if earlier:
+            sections.append("Earlier turns:\n" + "\n".join(f"- {summary}" for summary in earlier))
+        instruction = "Summarize the whole session from the earlier and new turns."
+    else:
+        if layer.get("session_summary"):
+            sections.append(f"Session summary so far: {layer['session_summary']}")
+        if layer.get("key_topics"):
+            sections.append(f"Key topics so far: {', '.join(layer['key_topics'])}")
+        instruction = "Fold the new turns into the session summary and key topics so far."
+    sections.append("New turns:\n" + "\n\n".join(
+        f"Turn {i + 1} ({turn['scenario']}):\nCustomer: {turn['user_message']}\nAgent: {turn['agent_response']}"
+        for i, turn in enumerate(turns)
+    ))
+
+    return [
+        {
+            "role": "system",
+            "content": (
+                f"You maintain the running context of a customer conversation. {instruction} "
+                "Reply with a JSON object: "
+                '{"turn_summaries": [one concise sentence per new turn, in order], '
+                '"session_summary": "concise summary of the whole session", '
+                '"key_topics": [3 to 5 key topics of the session]}'
+            )
+        },
+        {"role": "user", "content": "\n\n".join(sections)}
+    ]
+
+
+def parse_summary(content: str, turns: int) -> Dict[str, Any]:
+    """Validate a structured summary; raises ValueError if it is unusable"""
+    data = json.loads(content)
+    if not isinstance(data, dict):
+        raise ValueError("summary is not a JSON object")
+    summaries = data.get("turn_summaries")
+    if not isinstance(summaries, list) or len(summaries) != turns:
+        raise ValueError(f"expected {turns} turn summaries")
+    session_summary = data.get("session_summary")
+    if not isinstance(session_summary, str) or not session_summary.strip():
+        raise ValueError("missing session summary")
+    topics = data.get("key_topics")
+    if not isinstance(topics, list):
+        raise ValueError("missing key topics")
+    return {
+        "turn_summaries": [str(summary).strip() for summary in summaries],
+        "session_summary": session_summary.strip(),
+        "key_topics": [str(topic).strip() for topic in topics if str(topic).strip()][:5]
+    }
+
+
+def usage_tokens(usage: Any) -> int:
+    """Total tokens of an OpenAI ``usage`` object (or dict); 0 when absent"""
+    if usage is None:
+        return 0
+    if isinstance(usage, dict):
+        return usage.get("total_tokens") or usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+    return getattr(usage, "total_tokens", 0) or 0
+
+
+@dataclass
+class _Session:
+    """One session's queued turns and its short-term layer as last summarized"""
+    # (turn, layer fields, queued_at)
+    pending: List[Tuple[Dict[str, Any], Dict[str, Any], float]] = field(default_factory=list)
+    layer: Optional[Dict[str, Any]] = None
+    loaded: bool = False
+    task: Optional[asyncio.Task] = None
+
+
+class SessionSummarizer:
+    """
+    Background maintenance of every session's short-term context layer.
+
+    ``submit`` never waits. Each session has at most one worker task; it
+    takes all of the session's queued turns at once, makes one summarization
+    request for them, merges the result into the layer and stores it. Turns
+    queued meanwhile wait for the next round, so a session never has more
+    than one request in flight and a backlog costs one request, not one per turn.
+
+    The layer's ``summary_folds`` counts turns folded in incrementally since
+    the session summary was last rebuilt in full. A request that would take
+    it past ``drift_turns`` is a full re-summary of the turn window instead
+    (``drift_turns`` of 1 rebuilds every time).
+    """
+
+    def __init__(self, summarize_fnc: SummarizeFnc, load_fnc: LoadFnc, store_fnc: StoreFnc,
+                 max_turns: int = MAX_TURNS, max_idle_sessions: int = MAX_IDLE_SESSIONS,
+                 drift_turns: int = DRIFT_TURNS):
+        self.summarize_fnc = summarize_fnc
+        self.load_fnc = load_fnc
+        self.store_fnc = store_fnc
+        self.max_turns = max_turns
+        self.max_idle_sessions = max_idle_sessions
+        self.drift_turns = max(1, drift_turns)
+
+        self._sessions: "OrderedDict[Tuple[str, str], _Session]" = OrderedDict()
+
+        self.summarizer_stats = {
+            "turns_queued": 0,
+            "turns_summarized": 0,
+            "batches": 0,
+            "failures": 0,
+            "store_failures": 0,
+            "sessions_evicted": 0,
+            "incremental_summaries": 0,
+            "full_summaries": 0,
+            "tokens": 0
+        }
+        self.summarize_latency = {mode: LatencyHistogram() for mode in SUMMARY_MODES}
+        # Summarization tokens divided over the turns of each request
+        self.tokens_per_turn = {mode: LatencyHistogram() for mode in SUMMARY_MODES}
+        # From a turn being queued to its layer being in memory
+        self.staleness = LatencyHistogram()
+
+    def submit(self, customer_id: str, session_id: str, turn: Dict[str, Any],
+               layer_fields: Optional[Dict[str, Any]] = None):
+        """Queue a finished turn; ``layer_fields`` replace the layer's fields of the same name"""
+        key = (customer_id, session_id)
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._sessions[key] = _Session()
+        self._sessions.move_to_end(key)
+
+        session.pending.append((turn, layer_fields or {}, time.perf_counter()))
+        self.summarizer_stats["turns_queued"] += 1
+        if session.task is None or session.task.done():
+            session.task = asyncio.get_running_loop().create_task(self._run(key, session))
+        self._evict_idle()
+
+    def layer(self, customer_id: str, session_id: str) -> Optional[Dict[str, Any]]:
+        """The session's short-term layer as last summarized, if this process has it"""
+        session = self._sessions.get((customer_id, session_id))
+        return session.layer if session else None
+
+    async def _run(self, key: Tuple[str, str], session: _Session):
+        customer_id, session_id = key
+        while session.pending:
+            batch, session.pending = session.pending, []
+
+            if not session.loaded:
+                try:
+                    session.layer = await self.load_fnc(customer_id, session_id)
+                except Exception as e:
+                    logger.error(f"Failed to load short-term context of {customer_id}/{session_id}: {e}")
+                session.loaded = True
+            previous = session.layer or {}
+
+            turns = [turn for turn, _, _ in batch]
+            # Nothing to rebuild until there is an earlier summary to drift
+            full = bool(previous.get("session_summary")) and (
+                previous.get("summary_folds", 0) + len(turns) > self.drift_turns)
+            mode = "full" if full else "incremental"
+            start = time.perf_counter()
+            try:
+                result = await self.summarize_fnc(previous, turns, full)
+            except Exception as e:
+                result = None
+                self.summarizer_stats["failures"] += 1
+                logger.error(f"Failed to summarize {len(turns)} turns of {customer_id}/{session_id}: {e}")
+            self.summarize_latency[mode].record((time.perf_counter() - start) * 1000)
+            self.summarizer_stats[f"{mode}_summaries"] += 1
+            if result:
+                tokens = result.get("tokens", 0)
+                self.summarizer_stats["tokens"] += tokens
+                if tokens:
+                    self.tokens_per_turn[mode].record(tokens / len(turns))
+
+            layer = self._merge(previous, batch, result, full)
+            session.layer = layer
+            now = time.perf_counter()
+            for _, _, queued_at in batch:
+                self.staleness.record((now - queued_at) * 1000)
+            self.summarizer_stats["batches"] += 1
+            self.summarizer_stats["turns_summarized"] += len(turns)
+
+            try:
+                await self.store_fnc(customer_id, session_id, layer)
+            except Exception as e:
+                self.summarizer_stats["store_failures"] += 1
+                logger.error(f"Failed to store short-term context of {customer_id}/{session_id}: {e}")
+
+    def _merge(self, previous: Dict[str, Any], batch: List[Tuple[Dict[str, Any], Dict[str, Any], float]],
+               result: Optional[Dict[str, Any]], full: bool) -> Dict[str, Any]:
+        """A new layer (the previous one may be shared with the near cache and is not modified)"""
+        turns = list(previous.get("conversation_turns", []))
+        for i, (turn, _, _) in enumerate(batch):
+            summary = result["turn_summaries"][i] if result else f"Customer discussed {turn['scenario']} topics"
+            turns.append({**turn, "summary": summary})
+
+        layer = {
+            "conversation_turns": turns[-self.max_turns:],
+            "session_summary": (result["session_summary"] if result
+                                else previous.get("session_summary", "Session with multiple conversation turns")),
+            "last_scenario": batch[-1][0]["scenario"],
+            "key_topics": (result["key_topics"] if result
+                           else previous.get("key_topics") or ["general inquiry"]),
+            # A failed request folded nothing in, but its turns still count towards a rebuild
+            "summary_folds": 0 if full and result else previous.get("summary_folds", 0) + len(batch)
+        }
+        for _, layer_fields, _ in batch:
+            layer.update(layer_fields)
+        return layer
+
+    def _evict_idle(self):
+        # Least recently submitted first; sessions with a worker running are kept
+        excess = len(self._sessions) - self.max_idle_sessions
+        if excess <= 0:
+            return
+        for key in list(self._sessions):
+            session = self._sessions[key]
+            if session.pending or (session.task and not session.task.done()):
+                continue
+            del self._sessions[key]
+            self.summarizer_stats["sessions_evicted"] += 1
+            excess -= 1
+            if excess <= 0:
+                break
+
+    async def end_session(self, customer_id: str, session_id: str):
+        """Wait for the session's queued turns to be stored, then forget it"""
+        session = self._sessions.get((customer_id, session_id))
+        if session is None:
+            return
+        while session.task and not session.task.done():
+            await session.task
+        self._sessions.pop((customer_id, session_id), None)
+
+    async def drain(self):
+        """Wait until every queued turn is summarized and stored"""
+        while True:
+            tasks = [session.task for session in self._sessions.values() if session.task and not session.task.done()]
+            if not tasks:
+                return
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self):
+        await self.drain()
+        self._sessions.clear()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        batches = self.summarizer_stats["batches"]
+        return {
+            "sessions": len(self._sessions),
+            "pending_turns": sum(len(session.pending) for session in self._sessions.values()),
+            "turns_per_batch": self.summarizer_stats["turns_summarized"] / batches if batches else 0.0,
+            "drift_turns": self.drift_turns,
+            "summarize_ms": {mode: histogram.summary() for mode, histogram in self.summarize_latency.items()},
+            "tokens_per_turn": {mode: histogram.summary() for mode, histogram in self.tokens_per_turn.items()},
+            "staleness_ms": self.staleness.summary(),
+            **self.summarizer_stats
+        }
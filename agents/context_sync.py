@@ -0,0 +1,202 @@
+"""
+Incremental CustomerContext Synchronisation for VoiceFlow Pro
+
+This module replaces full state re-posts with versioned deltas:
+- Only appended list items and changed scalar/entity fields are sent
+- Full snapshot on the first sync of a session, after truncation or unsent
+  history spilling out of memory, or on conflict
+- Consecutive queued updates coalesce into one
+- Per-turn build time statistics; payload sizes are measured where the
+  update is encoded (the HTTP client or the SQLite store)
+"""
+
+import logging
+import time
+import weakref
+from typing import Dict, Any, List, Optional
+
+from latency_sketch import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+UPDATE_SNAPSHOT = "snapshot"
+UPDATE_DELTA = "delta"
+
+# Fields that only ever grow during a session
+APPEND_ONLY_FIELDS = ("conversation_history", "business_actions", "sentiment_scores", "previous_scenarios")
+
+SCALAR_FIELDS = ("name", "email", "phone", "company", "title", "current_scenario", "lead_score",
+                 "priority", "participant_id", "session_start", "last_activity")
+
+# Live trackers by room so a backend conflict can force the next snapshot
+_trackers: "weakref.WeakValueDictionary[str, ContextDeltaTracker]" = weakref.WeakValueDictionary()
+
+
+def _scalar(value: Any) -> Any:
+    if hasattr(value, "value"):
+        return value.value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _list_items(field: str, items: List[Any]) -> List[Any]:
+    if field == "previous_scenarios":
+        return [_scalar(item) for item in items]
+    return items
+
+
+class ContextDeltaTracker:
+    """
+    Builds state updates for one session's CustomerContext.
+
+    Versions increase by one per update. A delta is relative to the previous
+    update handed to persistence; updates for a room are written in order, so
+    the backend applies them in sequence and rejects (409) any delta whose
+    ``base_version`` does not match what it holds. The store then replaces
+    the rejected delta with a full snapshot of the tracked context right
+    away (``conflict_snapshot``).
+    """
+
+    def __init__(self, room_id: str):
+        self.room_id = room_id
+        self.version = 0
+        self.needs_snapshot = True
+        # The context last built from, so a conflict can be resolved with a snapshot at once
+        self.context: Any = None
+
+        self._list_lengths: Dict[str, int] = {}
+        self._scalars: Dict[str, Any] = {}
+        self._entities: Dict[str, Any] = {}
+
+        self.build_times = LatencyHistogram()
+        self.sync_stats = {
+            "snapshots": 0,
+            "deltas": 0,
+            "empty_deltas": 0,
+            "conflicts": 0
+        }
+
+        _trackers[room_id] = self
+
+    def mark_conflict(self):
+        self.needs_snapshot = True
+        self.sync_stats["conflicts"] += 1
+
+    def _remember(self, context: Any, scalars: Dict[str, Any]):
+        self._list_lengths = {field: len(getattr(context, field)) for field in APPEND_ONLY_FIELDS}
+        self._scalars = scalars
+        self._entities = {
+            key: list(value) if isinstance(value, list) else value
+            for key, value in context.extracted_entities.items()
+        }
+
+    def build(self, context: Any) -> Dict[str, Any]:
+        """Return the next snapshot or delta for ``context``"""
+        start = time.perf_counter()
+        self.context = context
+        scalars = {field: _scalar(getattr(context, field)) for field in SCALAR_FIELDS}
+
+        # Entries spilled from the in-memory history before they were sent can only go out in a snapshot
+        truncated = any(len(getattr(context, field)) < self._list_lengths.get(field, 0) or
+                        getattr(getattr(context, field), "offset", 0) > self._list_lengths.get(field, 0)
+                        for field in APPEND_ONLY_FIELDS)
+        base_version = self.version
+        self.version += 1
+
+        if self.needs_snapshot or truncated:
+            update = {
+                "type": UPDATE_SNAPSHOT,
+                "room_id": self.room_id,
+                "version": self.version,
+                "state": context.to_dict()
+            }
+            self.needs_snapshot = False
+            self.sync_stats["snapshots"] += 1
+        else:
+            changed_entities = {
+                key: value for key, value in context.extracted_entities.items()
+                if self._entities.get(key) != value
+            }
+            update = {
+                "type": UPDATE_DELTA,
+                "room_id": self.room_id,
+                "base_version": base_version,
+                "version": self.version,
+                "scalars": {field: value for field, value in scalars.items() if self._scalars.get(field) != value},
+                "entities": changed_entities,
+                "append": {
+                    field: _list_items(field, getattr(context, field)[self._list_lengths.get(field, 0):])
+                    for field in APPEND_ONLY_FIELDS
+                    if len(getattr(context, field)) > self._list_lengths.get(field, 0)
+                }
+            }
+            self.sync_stats["deltas"] += 1
+            if not (update["append"] or update["entities"] or
+                    set(update["scalars"]) - {"last_activity"}):
+                self.sync_stats["empty_deltas"] += 1
+
+        self._remember(context, scalars)
+
+        self.build_times.record((time.perf_counter() - start) * 1000)
+        return update
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "build_ms": self.build_times.summary(),
+            **self.sync_stats
+        }
+
+
+def conflict_snapshot(room_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Build a full snapshot to replace a delta the store rejected as a conflict.
+
+    Returns None when no live session tracks the room (an update replayed
+    from a crashed worker's spool); the rejected delta can only be dropped.
+    """
+    tracker = _trackers.get(room_id)
+    if tracker is None or tracker.context is None:
+        logger.error(f"Context version conflict for room {room_id} with no live session; delta dropped")
+        return None
+    tracker.mark_conflict()
+    logger.warning(f"Context version conflict for room {room_id}; sending a full snapshot")
+    return tracker.build(tracker.context)
+
+
+def apply_delta(state: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a delta to a serialized state (same rules as the backend)"""
+    merged = dict(state)
+    merged.update(delta["scalars"])
+    merged["extracted_entities"] = {**state.get("extracted_entities", {}), **delta["entities"]}
+    for field, items in delta["append"].items():
+        merged[field] = list(state.get(field, [])) + list(items)
+    return merged
+
+
+def coalesce_state_updates(updates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge consecutive queued updates for one room into a single update.
+
+    A snapshot discards everything before it; deltas after a snapshot are
+    folded into it; consecutive deltas combine into one spanning delta.
+    """
+    result = updates[0]
+    for update in updates[1:]:
+        if update["type"] == UPDATE_SNAPSHOT:
+            result = update
+        elif result["type"] == UPDATE_SNAPSHOT:
+            result = {**result, "version": update["version"], "state": apply_delta(result["state"], update)}
+        else:
+            append = {field: list(items) for field, items in result["append"].items()}
+            for field, items in update["append"].items():
+                append[field] = append.get(field, []) + list(items)
+            result = {
+                **result,
+                "version": update["version"],
+                "scalars": {**result["scalars"], **update["scalars"]},
+                "entities": {**result["entities"], **update["entities"]},
+                "append": append
+            }
+    return result
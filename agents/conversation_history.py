@@ -0,0 +1,205 @@
+"""
+Tiered Conversation History for VoiceFlow Pro
+
+This module bounds the per-session conversation log kept in memory:
+- Fixed-size window of recent entries, capped by count and by estimated bytes
+- Older entries spill out of memory; they are already persisted as
+  conversation messages, so spilling is free
+- len() and indexes stay absolute over the whole log
+- Lazy paging of spilled entries back from storage for consumers that need
+  the full log (escalation hand-off)
+- Window size, spill and paging statistics
+"""
+
+import logging
+import sys
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Iterable, Iterator, Union
+
+from latency_sketch import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# 20 turns (customer + agent entry each)
+DEFAULT_WINDOW_ENTRIES = 40
+DEFAULT_WINDOW_BYTES = 256 * 1024
+
+# Entries requested from storage per round trip when paging
+PAGE_SIZE = 500
+
+# Loads ``limit`` entries of the full log starting at absolute index ``offset``
+PageFnc = Callable[[int, int], Awaitable[List[Dict[str, Any]]]]
+
+
+def entry_bytes(entry: Dict[str, Any]) -> int:
+    """Rough in-memory size of a history entry: the dict plus its values (keys are shared)"""
+    return sys.getsizeof(entry) + sum(map(sys.getsizeof, entry.values()))
+
+
+def history_entry_from_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """The history entry of a logged conversation message (same shape the backend rebuilds)"""
+    return {
+        "speaker": message["speaker"],
+        "message": message["message"],
+        "timestamp": message["timestamp"],
+        "scenario": (message.get("metadata") or {}).get("scenario", "unknown")
+    }
+
+
+class ConversationHistory:
+    """
+    Append-only conversation log with only the most recent entries in memory.
+
+    Absolute index ``i`` of the log is in memory when ``i >= offset``.
+    ``len()`` counts the whole log, integer indexes are absolute and raise
+    IndexError for spilled entries, while slices and iteration only cover
+    the in-memory window. Use ``page`` or ``load_all`` for older entries.
+    """
+
+    __slots__ = ("_entries", "_sizes", "_bytes", "offset", "max_entries", "max_bytes",
+                 "page_fnc", "history_stats", "page_latency")
+
+    def __init__(self, entries: Optional[Iterable[Dict[str, Any]]] = None, offset: int = 0,
+                 max_entries: int = DEFAULT_WINDOW_ENTRIES, max_bytes: int = DEFAULT_WINDOW_BYTES,
+                 page_fnc: Optional[PageFnc] = None):
+        self._entries: deque = deque()
+        self._sizes: deque = deque()
+        self._bytes = 0
+        self.offset = offset
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.page_fnc = page_fnc
+        self.history_stats = {"spilled": 0, "pages_loaded": 0, "entries_paged": 0, "page_failures": 0}
+        self.page_latency = LatencyHistogram()
+        if entries:
+            self.extend(entries)
+
+    def configure(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                  page_fnc: Optional[PageFnc] = None):
+        if max_entries is not None:
+            self.max_entries = max_entries
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        if page_fnc is not None:
+            self.page_fnc = page_fnc
+        self._spill()
+
+    # Appending
+
+    def append(self, entry: Dict[str, Any]):
+        size = entry_bytes(entry)
+        self._entries.append(entry)
+        self._sizes.append(size)
+        self._bytes += size
+        self._spill()
+
+    def extend(self, entries: Iterable[Dict[str, Any]]):
+        if not isinstance(entries, list):
+            entries = list(entries)
+        # Entries that would spill on count alone are never sized
+        skip = max(0, len(self._entries) + len(entries) - self.max_entries)
+        dropped = min(skip, len(self._entries))
+        for _ in range(dropped):
+            self._entries.popleft()
+            self._bytes -= self._sizes.popleft()
+        skip -= dropped
+        self.offset += dropped + skip
+        self.history_stats["spilled"] += dropped + skip
+        for entry in entries[skip:]:
+            size = entry_bytes(entry)
+            self._entries.append(entry)
+            self._sizes.append(size)
+            self._bytes += size
+        self._spill()
+
+    def _spill(self):
+        # The newest entry always stays, even if it alone is over the byte cap
+        while len(self._entries) > self.max_entries or (self._bytes > self.max_bytes and len(self._entries) > 1):
+            self._entries.popleft()
+            self._bytes -= self._sizes.popleft()
+            self.offset += 1
+            self.history_stats["spilled"] += 1
+
+    # In-memory access
+
+    @property
+    def window(self) -> List[Dict[str, Any]]:
+        return list(self._entries)
+
+    @property
+    def window_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return self.offset + len(self._entries)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._entries)
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            # Clamped to the in-memory window
+            start, stop, step = index.indices(len(self))
+            return [self._entries[i - self.offset] for i in range(start, stop, step) if i >= self.offset]
+        position = index + len(self) if index < 0 else index
+        if position < self.offset:
+            raise IndexError(f"history entry {index} was spilled from memory; use page()")
+        return self._entries[position - self.offset]
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ConversationHistory):
+            return self.offset == other.offset and list(self._entries) == list(other._entries)
+        if isinstance(other, list):
+            return self.offset == 0 and list(self._entries) == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ConversationHistory(total={len(self)}, in_memory={len(self._entries)}, offset={self.offset})"
+
+    # Paging
+
+    async def page(self, start: int = 0, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Entries ``[start, end)`` of the full log, loading spilled ones from storage"""
+        end = len(self) if end is None else min(end, len(self))
+        if start >= self.offset:
+            return self[start:end]
+
+        spilled: List[Dict[str, Any]] = []
+        wanted = min(end, self.offset) - start
+        if self.page_fnc is not None:
+            try:
+                while len(spilled) < wanted:
+                    began = time.perf_counter()
+                    limit = min(PAGE_SIZE, wanted - len(spilled))
+                    page = await self.page_fnc(start + len(spilled), limit)
+                    self.page_latency.record((time.perf_counter() - began) * 1000)
+                    self.history_stats["pages_loaded"] += 1
+                    self.history_stats["entries_paged"] += len(page)
+                    spilled.extend(page)
+                    if len(page) < limit:
+                        break
+            except Exception as e:
+                self.history_stats["page_failures"] += 1
+                logger.error(f"Failed to page in conversation history [{start}, {self.offset}): {e}")
+        else:
+            self.history_stats["page_failures"] += 1
+            logger.warning(f"{wanted} spilled history entries requested with no storage to page from")
+        return spilled + self[self.offset:end]
+
+    async def load_all(self) -> List[Dict[str, Any]]:
+        return await self.page(0)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "total": len(self),
+            "in_memory": len(self._entries),
+            "window_bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "page_ms": self.page_latency.summary(),
+            **self.history_stats
+        }
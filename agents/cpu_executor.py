@@ -0,0 +1,164 @@
+"""
+Managed CPU Executors for VoiceFlow Pro
+
+This module keeps CPU-bound work off the event loop:
+- Separate bounded thread pools for DSP, text analytics and serialization
+- Pool sizes driven by the optimizer's processing_threads setting
+- Live resizing when the optimization level changes
+- Per-pool queue depth and queue wait-time statistics
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable
+
+from latency_sketch import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Share of the thread budget given to each pool
+POOL_SHARES = {
+    "dsp": 0.5,
+    "text_analytics": 0.3,
+    "serialization": 0.2
+}
+
+
+class ManagedThreadPool:
+    """
+    Bounded thread pool with queueing instrumentation.
+
+    Resizing swaps in a new executor; work already submitted to the old one
+    finishes there, so no task is dropped.
+    """
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = max(1, size)
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix=f"voiceflow-{name}")
+        self._lock = threading.Lock()
+
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_times = LatencyHistogram()
+        self.run_times = LatencyHistogram()
+
+    async def run(self, fnc: Callable, *args, **kwargs) -> Any:
+        """Run a CPU-bound callable in this pool and await its result"""
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+        def task():
+            started_at = time.perf_counter()
+            with self._lock:
+                self.queue_depth -= 1
+                self.active += 1
+                self.wait_times.record((started_at - submitted_at) * 1000)
+            try:
+                return fnc(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+                    self.run_times.record((time.perf_counter() - started_at) * 1000)
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, task)
+
+    def resize(self, size: int):
+        size = max(1, size)
+        if size == self.size:
+            return
+
+        old_executor = self._executor
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"voiceflow-{self.name}")
+        old_executor.shutdown(wait=False)
+
+        logger.info(f"Resized {self.name} pool: {self.size} -> {size} threads")
+        self.size = size
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "active": self.active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "wait_ms": self.wait_times.summary(),
+                "run_ms": self.run_times.summary()
+            }
+
+
+class CPUExecutorManager:
+    """
+    Process-wide set of CPU pools sized from the optimizer's thread budget
+    """
+
+    def __init__(self, total_threads: int = 4):
+        self.total_threads = total_threads
+        self.pools: Dict[str, ManagedThreadPool] = {
+            name: ManagedThreadPool(name, size)
+            for name, size in self._allocate(total_threads).items()
+        }
+
+    @staticmethod
+    def _allocate(total_threads: int) -> Dict[str, int]:
+        """
+        Split the thread budget across pools in proportion to POOL_SHARES.
+
+        The sizes add up to exactly ``total_threads``, except that every pool
+        always gets at least one thread: a budget smaller than the number of
+        pools is raised to one thread per pool.
+        """
+        budget = max(total_threads, len(POOL_SHARES))
+        exact = {name: budget * share for name, share in POOL_SHARES.items()}
+        sizes = {name: max(1, int(value)) for name, value in exact.items()}
+        # Threads left over by rounding down go to the largest remainders
+        leftover = max(0, budget - sum(sizes.values()))
+        for name in sorted(exact, key=lambda name: exact[name] - int(exact[name]), reverse=True)[:leftover]:
+            sizes[name] += 1
+        return sizes
+
+    def pool(self, name: str) -> ManagedThreadPool:
+        return self.pools[name]
+
+    async def run(self, pool_name: str, fnc: Callable, *args, **kwargs) -> Any:
+        return await self.pools[pool_name].run(fnc, *args, **kwargs)
+
+    def resize(self, total_threads: int):
+        if total_threads == self.total_threads:
+            return
+
+        self.total_threads = total_threads
+        for name, size in self._allocate(total_threads).items():
+            self.pools[name].resize(size)
+
+    def apply_optimization_settings(self, settings: Any):
+        """Resize pools from OptimizationSettings.processing_threads"""
+        self.resize(settings.processing_threads)
+
+    def shutdown(self, wait: bool = True):
+        for pool in self.pools.values():
+            pool.shutdown(wait=wait)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "total_threads": self.total_threads,
+            "pools": {name: pool.get_statistics() for name, pool in self.pools.items()}
+        }
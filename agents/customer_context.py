@@ -0,0 +1,261 @@
+"""
+Customer Context for VoiceFlow Pro
+
+This module holds the per-session conversation state and its encodings:
+- Slotted CustomerContext (no per-instance __dict__)
+- to_dict / from_dict for the JSON wire format, restoring enums and datetimes
+- Schema-versioned binary encoding (msgpack) with positional fields
+- Conversation history kept encoded until first access, so loading and
+  re-saving a context does not decode or re-encode its history
+- Only the recent window of the history is held and serialized; the
+  absolute offset of its first entry travels with it
+"""
+
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Dict, Any, Optional, List, Iterable
+
+import msgpack
+
+from conversation_history import ConversationHistory
+
+
+class Scenario(Enum):
+    """Business scenarios the agent can handle"""
+    ONBOARDING = "onboarding"
+    SALES = "sales"
+    SUPPORT = "support"
+    SCHEDULING = "scheduling"
+    FOLLOW_UP = "follow_up"
+    ESCALATION = "escalation"
+
+
+class Priority(Enum):
+    """Priority levels for conversations"""
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+    CRITICAL = "critical"
+
+
+# Version of the binary layout; bump when fields are removed, reordered or change type.
+# Decoders ignore trailing fields they do not know, so fields may be appended without a bump.
+CONTEXT_SCHEMA_VERSION = 1
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _encode_datetime(value: Optional[datetime]) -> Optional[int]:
+    # Whole microseconds, so naive local datetimes round-trip exactly
+    return None if value is None else (value - _EPOCH) // _MICROSECOND
+
+
+def _decode_datetime(value: Optional[int]) -> Optional[datetime]:
+    return None if value is None else _EPOCH + timedelta(microseconds=value)
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+class CustomerContext:
+    """
+    Enhanced customer information and conversation state.
+
+    Constructed like the dataclass it replaces (keyword arguments with the
+    same defaults; ``last_activity`` is set to now). The history is a
+    ConversationHistory: append-only, bounded in memory, and its entries are
+    never mutated, so ``to_dict`` copies the containers but not the entries.
+    """
+
+    __slots__ = ("name", "email", "phone", "company", "title",
+                 "current_scenario", "previous_scenarios", "lead_score", "priority",
+                 "_conversation_history", "_history_blob", "_history_offset", "extracted_entities",
+                 "business_actions", "sentiment_scores", "room_id", "participant_id", "session_start",
+                 "last_activity")
+
+    FIELDS = ("name", "email", "phone", "company", "title",
+              "current_scenario", "previous_scenarios", "lead_score", "priority",
+              "conversation_history", "extracted_entities", "business_actions", "sentiment_scores",
+              "room_id", "participant_id", "session_start", "last_activity")
+
+    def __init__(self, name: Optional[str] = None, email: Optional[str] = None,
+                 phone: Optional[str] = None, company: Optional[str] = None, title: Optional[str] = None,
+                 current_scenario: Scenario = Scenario.ONBOARDING,
+                 previous_scenarios: Optional[List[Scenario]] = None,
+                 lead_score: int = 0, priority: Priority = Priority.MEDIUM,
+                 conversation_history: Optional[Iterable[Dict]] = None,
+                 extracted_entities: Optional[Dict[str, Any]] = None,
+                 business_actions: Optional[List[Dict]] = None,
+                 sentiment_scores: Optional[List[float]] = None,
+                 room_id: Optional[str] = None, participant_id: Optional[str] = None,
+                 session_start: Optional[datetime] = None, last_activity: Optional[datetime] = None):
+        # Basic information
+        self.name = name
+        self.email = email
+        self.phone = phone
+        self.company = company
+        self.title = title
+
+        # Business context
+        self.current_scenario = current_scenario
+        self.previous_scenarios = previous_scenarios if previous_scenarios is not None else []
+        self.lead_score = lead_score
+        self.priority = priority
+
+        # Conversation state
+        self.conversation_history = conversation_history
+        self.extracted_entities = extracted_entities if extracted_entities is not None else {}
+        self.business_actions = business_actions if business_actions is not None else []
+        self.sentiment_scores = sentiment_scores if sentiment_scores is not None else []
+
+        # Technical context
+        self.room_id = room_id
+        self.participant_id = participant_id
+        self.session_start = session_start if session_start is not None else datetime.now()
+        self.last_activity = datetime.now()
+
+    @property
+    def conversation_history(self) -> ConversationHistory:
+        if self._conversation_history is None:
+            self._conversation_history = ConversationHistory(msgpack.unpackb(self._history_blob, raw=False),
+                                                             offset=self._history_offset)
+            self._history_blob = None
+        return self._conversation_history
+
+    @conversation_history.setter
+    def conversation_history(self, value: Optional[Iterable[Dict]]):
+        if not isinstance(value, ConversationHistory):
+            value = ConversationHistory(value)
+        self._conversation_history = value
+        self._history_blob = None
+        self._history_offset = value.offset
+
+    @property
+    def history_decoded(self) -> bool:
+        return self._conversation_history is not None
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, CustomerContext):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.FIELDS)
+
+    def __repr__(self) -> str:
+        history = len(self.conversation_history) if self.history_decoded else "encoded"
+        return (f"CustomerContext(room_id={self.room_id!r}, participant_id={self.participant_id!r}, "
+                f"current_scenario={self.current_scenario}, lead_score={self.lead_score}, history={history})")
+
+    # JSON wire format
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for database storage"""
+        return {
+            "name": self.name,
+            "email": self.email,
+            "phone": self.phone,
+            "company": self.company,
+            "title": self.title,
+            "current_scenario": self.current_scenario.value,
+            "previous_scenarios": [scenario.value for scenario in self.previous_scenarios],
+            "lead_score": self.lead_score,
+            "priority": self.priority.value,
+            "conversation_history": self.conversation_history.window,
+            "history_offset": self.conversation_history.offset,
+            "extracted_entities": dict(self.extracted_entities),
+            "business_actions": list(self.business_actions),
+            "sentiment_scores": list(self.sentiment_scores),
+            "room_id": self.room_id,
+            "participant_id": self.participant_id,
+            "session_start": self.session_start.isoformat() if self.session_start else None,
+            "last_activity": self.last_activity.isoformat() if self.last_activity else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CustomerContext':
+        """Inverse of ``to_dict``; unknown keys (e.g. the backend's ``version``) are ignored"""
+        context = cls(
+            name=data.get("name"),
+            email=data.get("email"),
+            phone=data.get("phone"),
+            company=data.get("company"),
+            title=data.get("title"),
+            current_scenario=Scenario(data.get("current_scenario") or Scenario.ONBOARDING.value),
+            previous_scenarios=[Scenario(value) for value in data.get("previous_scenarios") or []],
+            lead_score=data.get("lead_score") or 0,
+            priority=Priority(data.get("priority") or Priority.MEDIUM.value),
+            conversation_history=ConversationHistory(data.get("conversation_history") or [],
+                                                     offset=data.get("history_offset") or 0),
+            extracted_entities=dict(data.get("extracted_entities") or {}),
+            business_actions=list(data.get("business_actions") or []),
+            sentiment_scores=list(data.get("sentiment_scores") or []),
+            room_id=data.get("room_id"),
+            participant_id=data.get("participant_id"),
+            session_start=_parse_datetime(data.get("session_start"))
+        )
+        context.last_activity = _parse_datetime(data.get("last_activity"))
+        return context
+
+    # Binary encoding
+
+    def to_bytes(self) -> bytes:
+        """Encode as ``[schema version, fields...]``; an undecoded history is copied through as is"""
+        if self._conversation_history is None:
+            history, offset = self._history_blob, self._history_offset
+        else:
+            history = msgpack.packb(self._conversation_history.window, use_bin_type=True)
+            offset = self._conversation_history.offset
+        return msgpack.packb([
+            CONTEXT_SCHEMA_VERSION,
+            self.name, self.email, self.phone, self.company, self.title,
+            self.current_scenario.value,
+            [scenario.value for scenario in self.previous_scenarios],
+            self.lead_score,
+            self.priority.value,
+            history,
+            self.extracted_entities,
+            self.business_actions,
+            self.sentiment_scores,
+            self.room_id, self.participant_id,
+            _encode_datetime(self.session_start),
+            _encode_datetime(self.last_activity),
+            offset
+        ], use_bin_type=True)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'CustomerContext':
+        """Decode ``to_bytes`` output; the history is decoded when first accessed"""
+        fields = msgpack.unpackb(data, raw=False)
+        version = fields[0]
+        if version != CONTEXT_SCHEMA_VERSION:
+            raise ValueError(f"Unsupported CustomerContext schema version {version} "
+                             f"(expected {CONTEXT_SCHEMA_VERSION})")
+        (name, email, phone, company, title, scenario, previous_scenarios, lead_score, priority,
+         history, entities, business_actions, sentiment_scores, room_id, participant_id,
+         session_start, last_activity) = fields[1:18]
+        # Appended to version 1
+        history_offset = fields[18] if len(fields) > 18 else 0
+
+        context = cls.__new__(cls)
+        context.name = name
+        context.email = email
+        context.phone = phone
+        context.company = company
+        context.title = title
+        context.current_scenario = Scenario(scenario)
+        context.previous_scenarios = [Scenario(value) for value in previous_scenarios]
+        context.lead_score = lead_score
+        context.priority = Priority(priority)
+        context._conversation_history = None
+        context._history_blob = history
+        context._history_offset = history_offset
+        context.extracted_entities = entities
+        context.business_actions = business_actions
+        context.sentiment_scores = sentiment_scores
+        context.room_id = room_id
+        context.participant_id = participant_id
+        context.session_start = _decode_datetime(session_start)
+        context.last_activity = _decode_datetime(last_activity)
+        return context
@@ -16,18 +16,21 @@ from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-import openai
-from elevenlabs import Voice, VoiceSettings, clone, generate, save
-from elevenlabs.client import ElevenLabs
 import aiohttp
 import tempfile
 
 from context_manager import AdvancedContextManager, ContextualMemory
 from sentiment_analyzer import AdvancedSentimentAnalyzer, SentimentAnalysis, EmotionalState
-from voice_agent import Scenario, Priority, CustomerContext
+from customer_context import Scenario, Priority, CustomerContext
+from lazy_imports import lazy_import
+from service_registry import services, shared_openai_client
 
 logger = logging.getLogger(__name__)
 
+# SDKs load when a generator is first built
+elevenlabs = lazy_import("elevenlabs")
+elevenlabs_client = lazy_import("elevenlabs.client")
+
 
 class VoiceProfile(Enum):
     """Voice profiles for different business scenarios"""
@@ -94,8 +97,8 @@ class DynamicResponseGenerator:
     """
     
     def __init__(self):
-        self.openai_client = openai.AsyncOpenAI()
-        self.elevenlabs_client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+        self.openai_client = shared_openai_client()
+        self.elevenlabs_client = elevenlabs_client.ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
         
         # Voice profiles mapping
         self.voice_profiles = {
@@ -165,9 +168,9 @@ class DynamicResponseGenerator:
             }
         }
         
-        # Context manager and sentiment analyzer
-        self.context_manager = AdvancedContextManager()
-        self.sentiment_analyzer = AdvancedSentimentAnalyzer()
+        # Context manager and sentiment analyzer, shared by every session in the process
+        self.context_manager = services.get("context_manager", AdvancedContextManager)
+        self.sentiment_analyzer = services.get("sentiment_analyzer", AdvancedSentimentAnalyzer)
         
         # Response adaptation rules
         self.adaptation_rules = {
@@ -476,7 +479,7 @@ class DynamicResponseGenerator:
             voice_id = voice_config["voice_id"]
             
             # Create voice settings from characteristics
-            voice_settings = VoiceSettings(
+            voice_settings = elevenlabs.VoiceSettings(
                 stability=voice_characteristics.stability,
                 similarity_boost=voice_characteristics.similarity_boost,
                 style=voice_characteristics.style,
@@ -484,16 +487,16 @@ class DynamicResponseGenerator:
             )
             
             # Generate audio
-            audio = generate(
+            audio = elevenlabs.generate(
                 text=text,
-                voice=Voice(voice_id=voice_id, settings=voice_settings),
+                voice=elevenlabs.Voice(voice_id=voice_id, settings=voice_settings),
                 model="eleven_turbo_v2",  # Fast, low-latency model
                 stream=False
             )
             
             # Save to temporary file and upload (in production, use cloud storage)
             with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_file:
-                save(audio, temp_file.name)
+                elevenlabs.save(audio, temp_file.name)
                 
                 # In production, upload to CDN and return URL
                 # For now, return local file path
@@ -569,7 +572,7 @@ class DynamicResponseGenerator:
         """Clone a voice from audio sample for personalized responses"""
         try:
             # Clone voice using ElevenLabs
-            voice = clone(
+            voice = elevenlabs.clone(
                 name=voice_name,
                 description=description,
                 files=[audio_file_path]
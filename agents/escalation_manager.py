@@ -21,11 +21,18 @@ from livekit.api import RoomServiceClient
 
 from context_manager import AdvancedContextManager
 from sentiment_analyzer import AdvancedSentimentAnalyzer, SentimentAnalysis, EmotionalState
-from voice_agent import CustomerContext, Scenario, Priority
+from customer_context import CustomerContext, Scenario, Priority
+from service_registry import services
 
 logger = logging.getLogger(__name__)
 
 
+def shared_room_service(livekit_url: str, api_key: str, api_secret: str) -> RoomServiceClient:
+    """This process's LiveKit room service client for a server and API key"""
+    return services.get(f"room_service:{livekit_url}:{api_key}",
+                        lambda: RoomServiceClient(livekit_url, api_key, api_secret))
+
+
 class EscalationType(Enum):
     """Types of escalation scenarios"""
     CUSTOMER_REQUEST = "customer_request"
@@ -114,11 +121,11 @@ class EscalationManager:
         self.api_secret = api_secret
         
         # LiveKit services
-        self.room_service = RoomServiceClient(livekit_url, api_key, api_secret)
+        self.room_service = shared_room_service(livekit_url, api_key, api_secret)
         
-        # Context and sentiment services
-        self.context_manager = AdvancedContextManager()
-        self.sentiment_analyzer = AdvancedSentimentAnalyzer()
+        # Context and sentiment services, shared by every session in the process
+        self.context_manager = services.get("context_manager", AdvancedContextManager)
+        self.sentiment_analyzer = services.get("sentiment_analyzer", AdvancedSentimentAnalyzer)
         
         # Escalation triggers and patterns
         self.escalation_patterns = {
@@ -468,6 +475,8 @@ class EscalationManager:
                 "priority": customer_context.priority.value
             },
             "conversation_context": full_context,
+            # Full log for the human agent; turns spilled out of memory are paged back in
+            "transcript": await customer_context.conversation_history.load_all(),
             "summary": summary,
             "recommended_actions": self._generate_recommended_actions(escalation_trigger),
             "escalation_time": datetime.now().isoformat(),
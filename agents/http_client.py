@@ -0,0 +1,224 @@
+"""
+Pooled HTTP Client for VoiceFlow Pro
+
+This module provides the long-lived HTTP client used for backend persistence:
+- One keep-alive connection pool per process and base URL
+- Bounded connections per host with connect and total timeouts
+- Retry with exponential backoff and full jitter
+- Per-endpoint latency and request body size, plus pool reuse and queueing
+  statistics
+"""
+
+import asyncio
+import json as jsonlib
+import logging
+import random
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import aiohttp
+
+from latency_sketch import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying for idempotent requests: the backend is shedding load or a proxy
+# lost the request (a 502/504 may come back after the backend already committed it)
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+# Statuses that guarantee the request was rejected before it was processed
+UNPROCESSED_STATUSES = {429}
+
+
+class PooledHTTPClient:
+    """
+    Keep-alive HTTP client with retries and pool instrumentation.
+
+    The underlying session is created lazily on the running loop and rebuilt
+    if it was closed, so a client can outlive individual jobs. Requests that
+    are not idempotent are only retried when the backend cannot have
+    processed them: the connection could not be established, or it answered
+    with a status in ``UNPROCESSED_STATUSES``.
+    """
+
+    def __init__(self, base_url: str,
+                 limit: int = 64,
+                 limit_per_host: int = 16,
+                 keepalive_timeout: float = 30.0,
+                 connect_timeout: float = 2.0,
+                 total_timeout: float = 5.0,
+                 max_retries: int = 2,
+                 retry_base_delay: float = 0.05,
+                 retry_max_delay: float = 1.0):
+        self.base_url = base_url.rstrip("/")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.inflight = 0
+        self.endpoint_latency: Dict[str, LatencyHistogram] = {}
+        self.endpoint_request_bytes: Dict[str, LatencyHistogram] = {}
+        self.pool_wait = LatencyHistogram()
+        self.client_stats = {
+            "requests": 0,
+            "bytes_sent": 0,
+            "failures": 0,
+            "retries": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "pool_queued": 0
+        }
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_queued_start(session, context, params):
+            context.queued_at = time.perf_counter()
+            self.client_stats["pool_queued"] += 1
+
+        async def on_queued_end(session, context, params):
+            self.pool_wait.record((time.perf_counter() - context.queued_at) * 1000)
+
+        async def on_create_end(session, context, params):
+            self.client_stats["connections_created"] += 1
+
+        async def on_reuse(session, context, params):
+            self.client_stats["connections_reused"] += 1
+
+        trace_config.on_connection_queued_start.append(on_queued_start)
+        trace_config.on_connection_queued_end.append(on_queued_end)
+        trace_config.on_connection_create_end.append(on_create_end)
+        trace_config.on_connection_reuseconn.append(on_reuse)
+        return trace_config
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                trace_configs=[self._trace_config()]
+            )
+            self._loop = loop
+        return self._session
+
+    def _retry_delay(self, attempt: int) -> float:
+        # Full jitter keeps retries from many sessions from synchronising
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+
+    async def request(self, method: str, path: str, json: Any = None,
+                      idempotent: bool = True, endpoint: Optional[str] = None) -> Tuple[int, Any]:
+        """
+        Send a request and return (status, decoded JSON body or None).
+
+        The JSON body is encoded once here, as aiohttp would, so its size is
+        known without a second serialization. The response is read before
+        returning so the connection goes straight back to the pool. Raises
+        the last error once retries are exhausted.
+        """
+        endpoint = endpoint or path
+        retry_statuses = RETRYABLE_STATUSES if idempotent else UNPROCESSED_STATUSES
+        histogram = self.endpoint_latency.setdefault(endpoint, LatencyHistogram())
+        self.client_stats["requests"] += 1
+
+        body, headers = None, None
+        if json is not None:
+            body = jsonlib.dumps(json).encode()
+            headers = {"Content-Type": "application/json"}
+            self.endpoint_request_bytes.setdefault(endpoint, LatencyHistogram(resolution_ms=1.0)).record(len(body))
+            self.client_stats["bytes_sent"] += len(body)
+        self.inflight += 1
+
+        try:
+            for attempt in range(self.max_retries + 1):
+                start = time.perf_counter()
+                try:
+                    async with self._get_session().request(method, f"{self.base_url}{path}",
+                                                           data=body, headers=headers) as response:
+                        data = None
+                        if response.content_type == "application/json":
+                            data = await response.json()
+                        else:
+                            await response.read()
+                    histogram.record((time.perf_counter() - start) * 1000)
+
+                    if response.status in retry_statuses and attempt < self.max_retries:
+                        self.client_stats["retries"] += 1
+                        await asyncio.sleep(self._retry_delay(attempt))
+                        continue
+                    return response.status, data
+
+                except (aiohttp.ClientConnectorError, aiohttp.ServerDisconnectedError,
+                        aiohttp.ClientOSError, asyncio.TimeoutError) as e:
+                    # Only a failed connect guarantees the backend never saw the request
+                    retryable = idempotent or isinstance(e, aiohttp.ClientConnectorError)
+                    if not retryable or attempt >= self.max_retries:
+                        self.client_stats["failures"] += 1
+                        raise
+                    self.client_stats["retries"] += 1
+                    logger.debug(f"Retrying {method} {endpoint} after {type(e).__name__}")
+                    await asyncio.sleep(self._retry_delay(attempt))
+        finally:
+            self.inflight -= 1
+
+    async def warm(self, path: str = "/health", connections: int = 2):
+        """Open keep-alive connections before the first real request; errors are ignored"""
+        if self._session is not None and not self._session.closed and self._loop is asyncio.get_running_loop():
+            return
+
+        async def probe():
+            try:
+                await self.request("GET", path, endpoint="warmup")
+            except Exception as e:
+                logger.debug(f"Connection warm-up to {self.base_url} failed: {e}")
+
+        await asyncio.gather(*(probe() for _ in range(connections)))
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "inflight": self.inflight,
+            "pool_limit": self.limit,
+            "pool_limit_per_host": self.limit_per_host,
+            "pool_saturation": self.inflight / self.limit_per_host,
+            "open": self._session is not None and not self._session.closed,
+            "pool_wait_ms": self.pool_wait.summary(),
+            "endpoints": {name: histogram.summary() for name, histogram in self.endpoint_latency.items()},
+            "request_bytes": {name: histogram.summary() for name, histogram in self.endpoint_request_bytes.items()},
+            **self.client_stats
+        }
+
+
+# Process-wide clients keyed by base URL
+_shared_clients: Dict[str, PooledHTTPClient] = {}
+
+
+def shared_http_client(base_url: str, **kwargs) -> PooledHTTPClient:
+    """Return this process's pooled client for a base URL, creating it on first use"""
+    client = _shared_clients.get(base_url)
+    if client is None:
+        client = _shared_clients[base_url] = PooledHTTPClient(base_url, **kwargs)
+    return client
+
+
+async def close_shared_http_clients():
+    """Close every process-wide client; safe to call more than once"""
+    for client in list(_shared_clients.values()):
+        await client.close()
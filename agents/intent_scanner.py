@@ -0,0 +1,134 @@
+"""
+Single-Pass Keyword and Entity Scanner for VoiceFlow Pro
+
+This module compiles the intent and entity vocabularies once into a scanner:
+- One tokenizer pass over the transcript yields per-scenario keyword counts
+- Vocabulary index maps each word to the patterns it can start
+- Entity patterns skipped when a cheap gate shows they cannot match
+- Results identical to running every pattern with re.findall
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Any, List, Hashable, Optional, Sequence, Tuple
+
+_TOKEN = re.compile(r"\w+")
+_KEYWORD_GROUP = re.compile(r"^\\b\((.*)\)\\b$")
+_LEADING_LETTERS = re.compile(r"[a-z]+")
+
+
+@dataclass
+class ScanResult:
+    """Everything IntentClassifier needs from one transcript"""
+    intent_counts: Dict[Hashable, int]
+    escalation: bool
+    entities: Dict[str, List[Any]]
+
+
+class KeywordScanner:
+    """
+    Compiled scanner over the intent and entity vocabularies.
+
+    Intent patterns of the form ``\\b(word|word|...)\\b`` are indexed by the
+    words their alternatives start with. A single pass over the word tokens
+    of the lowercased text looks each token up in that index and confirms
+    candidates with the pattern's own compiled regex at that position, so
+    every count equals ``len(re.findall(pattern, text_lower, re.IGNORECASE))``.
+    Per-pattern end offsets keep matches non-overlapping, as findall does.
+
+    Each entity pattern may have a gate: a cheap regex searched in the
+    lowercased text that must match whenever the entity pattern can (a
+    necessary condition), so skipping on a failed gate never loses entities. Non-ASCII text bypasses the index and gates, because case-
+    insensitive matching can then relate characters that lowercasing does
+    not, and is scanned pattern by pattern.
+    """
+
+    def __init__(self, intent_patterns: Dict[Hashable, List[str]],
+                 entity_patterns: Dict[str, str],
+                 escalation_keywords: Sequence[str],
+                 entity_gates: Optional[Dict[str, str]] = None):
+        self.intent_keys = list(intent_patterns)
+        self._intent_regexes: List[Tuple[Hashable, re.Pattern]] = [
+            (key, re.compile(pattern, re.IGNORECASE))
+            for key, patterns in intent_patterns.items() for pattern in patterns
+        ]
+
+        # word -> pattern indices whose alternatives are exactly that word;
+        # prefix -> pattern indices whose alternatives merely start with it
+        self._exact: Dict[str, List[int]] = {}
+        self._prefixes: List[Tuple[str, int]] = []
+        # Patterns the index cannot describe are tried at every word
+        self._unindexed: List[int] = []
+
+        for index, (_, compiled) in enumerate(self._intent_regexes):
+            group = _KEYWORD_GROUP.match(compiled.pattern)
+            alternatives = group.group(1).split("|") if group else []
+            leading = [_LEADING_LETTERS.match(alternative) for alternative in alternatives]
+            if not alternatives or not all(leading):
+                self._unindexed.append(index)
+                continue
+
+            for alternative, letters in zip(alternatives, leading):
+                if letters.group() == alternative:
+                    self._exact.setdefault(alternative, []).append(index)
+                else:
+                    self._prefixes.append((letters.group(), index))
+
+        self._escalation = re.compile("|".join(re.escape(keyword) for keyword in escalation_keywords))
+
+        entity_gates = entity_gates or {}
+        self._entities: List[Tuple[str, re.Pattern, Optional[re.Pattern]]] = [
+            (entity_type, re.compile(pattern, re.IGNORECASE),
+             re.compile(entity_gates[entity_type]) if entity_type in entity_gates else None)
+            for entity_type, pattern in entity_patterns.items()
+        ]
+
+    def _intent_counts_indexed(self, text_lower: str) -> List[int]:
+        counts = [0] * len(self._intent_regexes)
+        last_end = [0] * len(self._intent_regexes)
+
+        for token in _TOKEN.finditer(text_lower):
+            word = token.group()
+            candidates = self._exact.get(word, [])
+            if self._prefixes:
+                candidates = candidates + [index for prefix, index in self._prefixes if word.startswith(prefix)]
+            if self._unindexed:
+                candidates = candidates + self._unindexed
+
+            start = token.start()
+            for index in candidates:
+                if start < last_end[index]:
+                    continue
+                match = self._intent_regexes[index][1].match(text_lower, start)
+                if match:
+                    counts[index] += 1
+                    last_end[index] = match.end()
+
+        return counts
+
+    def scan(self, text: str) -> ScanResult:
+        text_lower = text.lower()
+        ascii_text = text.isascii()
+
+        if ascii_text:
+            pattern_counts = self._intent_counts_indexed(text_lower)
+        else:
+            pattern_counts = [len(compiled.findall(text_lower)) for _, compiled in self._intent_regexes]
+
+        intent_counts = dict.fromkeys(self.intent_keys, 0)
+        for (key, _), count in zip(self._intent_regexes, pattern_counts):
+            intent_counts[key] += count
+
+        entities = {}
+        for entity_type, compiled, gate in self._entities:
+            if ascii_text and gate is not None and not gate.search(text_lower):
+                continue
+            matches = compiled.findall(text)
+            if matches:
+                entities[entity_type] = matches
+
+        return ScanResult(
+            intent_counts=intent_counts,
+            escalation=self._escalation.search(text_lower) is not None,
+            entities=entities
+        )
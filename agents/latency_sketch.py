@@ -0,0 +1,315 @@
+"""
+Mergeable Latency Sketches for VoiceFlow Pro
+
+This module provides HDR-histogram style latency tracking including:
+- O(1) recording into log-linear buckets with bounded relative error
+- Lossless merging across worker processes and time windows
+- Compact serialization so fleet-wide percentiles never need raw samples
+- Per-stage (stt/llm/tts/total) sketches with windowed retention
+"""
+
+import math
+import time
+from typing import Dict, Any, List, Optional, Iterable
+
+PIPELINE_STAGES = ("stt", "llm", "tts", "total")
+
+SKETCH_FORMAT_VERSION = 1
+
+
+class LatencyHistogram:
+    """
+    Log-linear latency histogram (HDR style).
+
+    Values are quantized to integer units of ``resolution_ms``. Values below
+    ``2 ** sub_bucket_bits`` units are stored exactly; larger values share a
+    bucket with neighbours within a relative error of ``2 ** -(sub_bucket_bits - 1)``
+    (under 1% with the default of 8 bits). Buckets are kept sparse, so an
+    empty or narrow distribution costs only a handful of dict entries.
+    """
+
+    def __init__(self, resolution_ms: float = 0.01, sub_bucket_bits: int = 8):
+        if resolution_ms <= 0:
+            raise ValueError("resolution_ms must be positive")
+        if sub_bucket_bits < 2:
+            raise ValueError("sub_bucket_bits must be at least 2")
+
+        self.resolution_ms = resolution_ms
+        self.sub_bucket_bits = sub_bucket_bits
+        self._sub_bucket_count = 1 << sub_bucket_bits
+        self._half_count = self._sub_bucket_count >> 1
+
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min_value = math.inf
+        self.max_value = 0.0
+
+    def _bucket_index(self, units: int) -> int:
+        """Map an integer unit value to its bucket index"""
+        if units < self._sub_bucket_count:
+            return units
+
+        shift = units.bit_length() - self.sub_bucket_bits
+        mantissa = units >> shift
+        return self._sub_bucket_count + (shift - 1) * self._half_count + (mantissa - self._half_count)
+
+    def _bucket_bounds(self, index: int) -> tuple:
+        """Return the (lowest, highest) unit value covered by a bucket"""
+        if index < self._sub_bucket_count:
+            return index, index
+
+        offset = index - self._sub_bucket_count
+        shift = offset // self._half_count + 1
+        mantissa = offset % self._half_count + self._half_count
+        return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+    def record(self, value_ms: float, count: int = 1):
+        """Record a latency observation in milliseconds"""
+        if value_ms < 0 or value_ms != value_ms:
+            return
+
+        units = int(value_ms / self.resolution_ms)
+        index = self._bucket_index(units)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+
+        self.count += count
+        self.total += value_ms * count
+        if value_ms < self.min_value:
+            self.min_value = value_ms
+        if value_ms > self.max_value:
+            self.max_value = value_ms
+
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """Merge another histogram into this one (in place)"""
+        if (other.sub_bucket_bits != self.sub_bucket_bits or
+                other.resolution_ms != self.resolution_ms):
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+
+        for index, bucket_count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + bucket_count
+
+        self.count += other.count
+        self.total += other.total
+        self.min_value = min(self.min_value, other.min_value)
+        self.max_value = max(self.max_value, other.max_value)
+        return self
+
+    def percentile(self, percentile: float) -> float:
+        """Estimate the latency at the given percentile (0-100)"""
+        if self.count == 0:
+            return 0.0
+
+        rank = max(1, math.ceil(self.count * min(max(percentile, 0.0), 100.0) / 100.0))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                low, high = self._bucket_bounds(index)
+                value = (low + high + 1) / 2 * self.resolution_ms
+                return min(max(value, self.min_value), self.max_value)
+
+        return self.max_value
+
+    def fraction_below(self, threshold_ms: float) -> float:
+        """Fraction of observations strictly below a threshold"""
+        if self.count == 0:
+            return 0.0
+
+        threshold_units = int(threshold_ms / self.resolution_ms)
+        below = 0
+        for index, bucket_count in self.buckets.items():
+            _, high = self._bucket_bounds(index)
+            if high < threshold_units:
+                below += bucket_count
+        return below / self.count
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        """Summary statistics suitable for reports"""
+        return {
+            "count": self.count,
+            "average": self.average,
+            "minimum": self.min_value if self.count else 0.0,
+            "maximum": self.max_value,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99)
+        }
+
+    def copy(self) -> 'LatencyHistogram':
+        clone = LatencyHistogram(self.resolution_ms, self.sub_bucket_bits)
+        return clone.merge(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to a JSON-safe dictionary"""
+        return {
+            "version": SKETCH_FORMAT_VERSION,
+            "resolution_ms": self.resolution_ms,
+            "sub_bucket_bits": self.sub_bucket_bits,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min_value if self.count else None,
+            "max": self.max_value,
+            # Flat [index, count, index, count, ...] keeps the payload small
+            "buckets": [item for pair in sorted(self.buckets.items()) for item in pair]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencyHistogram':
+        """Create from a dictionary produced by ``to_dict``"""
+        if data.get("version", SKETCH_FORMAT_VERSION) != SKETCH_FORMAT_VERSION:
+            raise ValueError(f"Unsupported sketch version: {data.get('version')}")
+
+        histogram = cls(data["resolution_ms"], data["sub_bucket_bits"])
+        flat = data.get("buckets", [])
+        histogram.buckets = {int(flat[i]): int(flat[i + 1]) for i in range(0, len(flat), 2)}
+        histogram.count = int(data.get("count", 0))
+        histogram.total = float(data.get("total", 0.0))
+        histogram.min_value = data["min"] if data.get("min") is not None else math.inf
+        histogram.max_value = float(data.get("max", 0.0))
+        return histogram
+
+
+class StageLatencySketches:
+    """Latency histograms for each voice pipeline stage"""
+
+    def __init__(self, stages: Iterable[str] = PIPELINE_STAGES):
+        self.stages: Dict[str, LatencyHistogram] = {stage: LatencyHistogram() for stage in stages}
+
+    def record(self, stage: str, value_ms: float):
+        """Record a latency for a single stage"""
+        if stage not in self.stages:
+            self.stages[stage] = LatencyHistogram()
+        self.stages[stage].record(value_ms)
+
+    def record_turn(self, stt_latency: float, llm_latency: float,
+                    tts_latency: float, total_latency: float):
+        """Record the per-stage latencies of one conversation turn"""
+        self.record("stt", stt_latency)
+        self.record("llm", llm_latency)
+        self.record("tts", tts_latency)
+        self.record("total", total_latency)
+
+    def merge(self, other: 'StageLatencySketches') -> 'StageLatencySketches':
+        for stage, histogram in other.stages.items():
+            if stage not in self.stages:
+                self.stages[stage] = LatencyHistogram(histogram.resolution_ms, histogram.sub_bucket_bits)
+            self.stages[stage].merge(histogram)
+        return self
+
+    def get(self, stage: str) -> LatencyHistogram:
+        return self.stages.get(stage) or LatencyHistogram()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: histogram.summary() for stage, histogram in self.stages.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {stage: histogram.to_dict() for stage, histogram in self.stages.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StageLatencySketches':
+        sketches = cls(stages=())
+        for stage, histogram_data in data.items():
+            sketches.stages[stage] = LatencyHistogram.from_dict(histogram_data)
+        return sketches
+
+
+class WindowedLatencySketches:
+    """
+    Per-stage sketches bucketed into fixed time windows.
+
+    Windows are keyed by their start time, so sketches exported by different
+    workers line up and can be merged window-by-window or over any range.
+    """
+
+    def __init__(self, window_seconds: int = 60, retention_seconds: int = 24 * 3600):
+        self.window_seconds = window_seconds
+        self.retention_seconds = retention_seconds
+        self.windows: Dict[int, StageLatencySketches] = {}
+        self._current_key: Optional[int] = None
+
+    def _window_key(self, timestamp: float) -> int:
+        return int(timestamp // self.window_seconds) * self.window_seconds
+
+    def _window_for(self, timestamp: Optional[float]) -> StageLatencySketches:
+        key = self._window_key(timestamp if timestamp is not None else time.time())
+        window = self.windows.get(key)
+        if window is None:
+            window = self.windows[key] = StageLatencySketches()
+            if self._current_key is None or key > self._current_key:
+                self._current_key = key
+                self._prune(key)
+        return window
+
+    def _prune(self, newest_key: int):
+        cutoff = newest_key - self.retention_seconds
+        for key in [k for k in self.windows if k < cutoff]:
+            del self.windows[key]
+
+    def record(self, stage: str, value_ms: float, timestamp: Optional[float] = None):
+        self._window_for(timestamp).record(stage, value_ms)
+
+    def record_turn(self, stt_latency: float, llm_latency: float, tts_latency: float,
+                    total_latency: float, timestamp: Optional[float] = None):
+        self._window_for(timestamp).record_turn(stt_latency, llm_latency, tts_latency, total_latency)
+
+    def merged(self, since: Optional[float] = None, until: Optional[float] = None) -> StageLatencySketches:
+        """Merge every window overlapping the [since, until) range"""
+        result = StageLatencySketches()
+        for key, window in self.windows.items():
+            if since is not None and key + self.window_seconds <= since:
+                continue
+            if until is not None and key >= until:
+                continue
+            result.merge(window)
+        return result
+
+    def merge(self, other: 'WindowedLatencySketches') -> 'WindowedLatencySketches':
+        if other.window_seconds != self.window_seconds:
+            raise ValueError("Cannot merge sketches with different window sizes")
+
+        for key, window in other.windows.items():
+            self.windows.setdefault(key, StageLatencySketches()).merge(window)
+        if self.windows:
+            self._current_key = max(self.windows)
+            self._prune(self._current_key)
+        return self
+
+    def to_dict(self, since: Optional[float] = None) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.window_seconds,
+            "windows": {
+                str(key): window.to_dict()
+                for key, window in sorted(self.windows.items())
+                if since is None or key + self.window_seconds > since
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'WindowedLatencySketches':
+        sketches = cls(window_seconds=data["window_seconds"])
+        for key, window_data in data.get("windows", {}).items():
+            sketches.windows[int(key)] = StageLatencySketches.from_dict(window_data)
+        if sketches.windows:
+            sketches._current_key = max(sketches.windows)
+        return sketches
+
+
+def merge_serialized_sketches(payloads: List[Dict[str, Any]]) -> StageLatencySketches:
+    """
+    Combine per-stage sketches exported by several workers.
+
+    Accepts both ``StageLatencySketches.to_dict`` and
+    ``WindowedLatencySketches.to_dict`` payloads.
+    """
+    combined = StageLatencySketches()
+    for payload in payloads:
+        if "windows" in payload:
+            combined.merge(WindowedLatencySketches.from_dict(payload).merged())
+        else:
+            combined.merge(StageLatencySketches.from_dict(payload))
+    return combined
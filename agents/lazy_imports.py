@@ -0,0 +1,87 @@
+"""
+Deferred Imports for VoiceFlow Pro
+
+This module keeps heavy optional dependencies out of worker start-up:
+- Module proxies that import on first attribute access
+- Import time recorded per deferred module, with what triggered it
+- Process RSS sampling for start-up budgets
+"""
+
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+import types
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_import_lock = threading.RLock()
+_import_profile: Dict[str, Dict[str, Any]] = {}
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Once loaded, the real module's namespace is copied onto the proxy, so
+    later attribute lookups are ordinary dictionary hits with no extra cost.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self, trigger: str) -> types.ModuleType:
+        with _import_lock:
+            module = self.__dict__["_lazy_module"]
+            if module is None:
+                already_imported = self.__name__ in sys.modules
+                start = time.perf_counter()
+                module = importlib.import_module(self.__name__)
+                _import_profile[self.__name__] = {
+                    "import_ms": (time.perf_counter() - start) * 1000,
+                    "trigger": trigger,
+                    "already_imported": already_imported
+                }
+                if not already_imported:
+                    logger.debug(f"Deferred import of {self.__name__} took "
+                                 f"{_import_profile[self.__name__]['import_ms']:.1f}ms (first use: {trigger})")
+                self.__dict__.update(module.__dict__)
+                self.__dict__["_lazy_module"] = module
+            return module
+
+    def __getattr__(self, attribute: str) -> Any:
+        if attribute.startswith("__") and attribute.endswith("__"):
+            raise AttributeError(attribute)
+        return getattr(self._load(attribute), attribute)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Return a proxy for ``name`` that imports it when first used"""
+    return LazyModule(name)
+
+
+def is_loaded(module: Any) -> bool:
+    """False only for a lazy module that has not been imported yet"""
+    return not isinstance(module, LazyModule) or module.__dict__["_lazy_module"] is not None
+
+
+def import_profile() -> Dict[str, Dict[str, Any]]:
+    """Deferred modules imported so far, with their import time"""
+    return {name: dict(entry) for name, entry in _import_profile.items()}
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Current resident set size of this process (Linux), or None if unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
@@ -3,32 +3,106 @@
 import asyncio
 import logging
 import os
+import time
 from dotenv import load_dotenv
 
-from livekit.agents import AutoSubscribe, JobContext, WorkerOptions, cli, llm
-from livekit.plugins import assemblyai, openai, elevenlabs
+from livekit.agents import AutoSubscribe, JobContext, JobProcess, WorkerOptions, cli, llm
+from livekit.plugins import assemblyai, elevenlabs
 
-from voice_agent import VoiceFlowAgent, BusinessLLM
+from voice_agent import (VoiceFlowAgent, BusinessLLM, DatabaseManager, IntentClassifier,
+                         scenario_response_audio_entries)
+from performance_optimizer import PerformanceOptimizer, PERFORMANCE_JOURNAL_SCHEMA
+from advanced_audio_processor import AdvancedAudioProcessor, AUDIO_JOURNAL_SCHEMA, shared_filter_bank
+from metrics_journal import MetricsJournal
+from http_client import close_shared_http_clients
+from persistence_queue import WriteBehindQueue
+from admission_control import WorkerLoadMonitor, AdmissionController
+from audio_cache import SynthesizedAudioCache, tts_synthesizer
+from worker_resources import WorkerResources
+from speech_loop import SpeechLoop
+from storage_backend import StorageBackend, HTTPStorageBackend, SQLiteStorageBackend
+from service_registry import services
+from lazy_imports import lazy_import
 
 load_dotenv()
 
 logger = logging.getLogger("voiceflow-agent")
 
+# Context layers and LLM sentiment load only when a session first needs them
+context_manager = lazy_import("context_manager")
+context_cache = lazy_import("context_cache")
+sentiment_analyzer = lazy_import("sentiment_analyzer")
 
-async def entrypoint(ctx: JobContext):
-    """
-    Main entrypoint for the VoiceFlow Pro agent with real AssemblyAI Universal-Streaming.
-    This function is called when a participant joins a LiveKit room.
-    """
-    logger.info(f"Connecting to room {ctx.room.name}")
-    await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
+# Optional append-only metrics journals for post-mortem analysis
+journal_dir = os.getenv("METRICS_JOURNAL_DIR")
+performance_journal = MetricsJournal(journal_dir, PERFORMANCE_JOURNAL_SCHEMA) if journal_dir else None
+audio_journal = MetricsJournal(journal_dir, AUDIO_JOURNAL_SCHEMA) if journal_dir else None
 
-    # Wait for the first participant to connect
-    participant = await ctx.wait_for_participant()
-    logger.info(f"Starting VoiceFlow Pro agent for participant {participant.identity}")
+# Process-wide optimizer; its settings bus reconfigures every session in this worker
+performance_optimizer = PerformanceOptimizer(metrics_journal=performance_journal)
+
+
+def build_storage_backend() -> StorageBackend:
+    """The backend over HTTP, or an embedded SQLite database synced up to it"""
+    if os.getenv("STORAGE_BACKEND", "http") != "sqlite":
+        return HTTPStorageBackend()
+    upstream = HTTPStorageBackend() if os.getenv("STORAGE_UPSTREAM_SYNC", "true").lower() == "true" else None
+    return SQLiteStorageBackend(os.getenv("STORAGE_SQLITE_PATH", "/tmp/voiceflow-agent.db"), upstream=upstream)
+
+
+# Where conversation state and messages are written, shared by every session in this process
+storage_backend = build_storage_backend()
 
-    # Initialize AssemblyAI Universal-Streaming with optimized settings
-    stt = assemblyai.STT(
+# One manager for every session and the write-behind queue
+services.register("database_manager", lambda: DatabaseManager(storage=storage_backend))
+
+# Backend writes happen behind the reply; the spool keeps queued writes across crashes
+persistence_queue = WriteBehindQueue(
+    services.get("database_manager"),
+    spool_dir=os.getenv("PERSISTENCE_SPOOL_DIR", "/tmp/voiceflow-spool"),
+)
+
+# Voice identity of the TTS; part of the cache key of pre-synthesized responses
+TTS_VOICE = {
+    "voice_id": "21m00Tcm4TlvDq8ikWAM",  # Professional voice
+    "model": "eleven_turbo_v2",  # Low latency model for real-time
+    "settings": {"stability": 0.5, "similarity_boost": 0.75},
+}
+
+# Load reporting and admission of new rooms; job processes report their load and turn
+# latency through the report directory to the worker process that admits rooms
+load_monitor = WorkerLoadMonitor(report_dir=os.getenv("WORKER_LOAD_REPORT_DIR", "/tmp/voiceflow-load"))
+admission_controller = AdmissionController(
+    load_monitor,
+    latency_target_ms=performance_optimizer.performance_targets[
+        performance_optimizer.optimization_level]["total_latency"],
+)
+
+
+def current_latency_target_ms() -> float:
+    """End-to-end target of the optimization level this process currently runs at"""
+    return performance_optimizer.performance_targets[performance_optimizer.optimization_level]["total_latency"]
+
+
+# Shared analyzers hold patterns and clients only; per-session state stays with each session
+services.register("context_manager", lambda: context_manager.AdvancedContextManager(
+    redis_url=os.getenv("REDIS_URL", "redis://localhost:6379"),
+    model_router=performance_optimizer.model_router,
+    load_monitor=load_monitor,
+    cpu_executors=performance_optimizer.cpu_executors,
+    near_cache=context_cache.ContextNearCache(
+        max_bytes=int(os.getenv("CONTEXT_NEAR_CACHE_MB", "32")) * 1024 * 1024),
+    keyspace_invalidation=os.getenv("REDIS_KEYSPACE_NOTIFICATIONS", "false").lower() == "true",
+    summary_drift_turns=int(os.getenv("CONTEXT_SUMMARY_DRIFT_TURNS", "8")),
+))
+services.register("sentiment_analyzer", lambda: sentiment_analyzer.AdvancedSentimentAnalyzer(
+    cpu_executors=performance_optimizer.cpu_executors,
+))
+
+
+def build_stt() -> assemblyai.STT:
+    """AssemblyAI Universal-Streaming with optimized settings"""
+    return assemblyai.STT(
         api_key=os.getenv("ASSEMBLYAI_API_KEY"),
         sample_rate=16000,
         language="en",
@@ -42,51 +116,168 @@ async def entrypoint(ctx: JobContext):
         disfluencies=False,  # Remove "uh", "um" for cleaner transcripts
     )
 
-    # Initialize Voice Activity Detection
-    vad = assemblyai.VAD(
+
+def build_vad():
+    """Voice Activity Detection"""
+    return assemblyai.VAD(
         min_speaking_duration=0.1,  # 100ms minimum speech
         min_silence_duration=0.5,   # 500ms silence before stopping
         max_buffered_speech=30.0,   # Max 30 seconds of buffered speech
     )
 
-    # Initialize business-optimized LLM
-    business_llm = BusinessLLM(
+
+def build_llm() -> BusinessLLM:
+    """Business-optimized LLM"""
+    return BusinessLLM(
         model="gpt-4-turbo-preview",
         api_key=os.getenv("OPENAI_API_KEY"),
         temperature=0.3,  # Lower temperature for more consistent business responses
     )
 
-    # Initialize high-quality TTS
-    tts = elevenlabs.TTS(
+
+def build_tts() -> elevenlabs.TTS:
+    """High-quality, low-latency TTS"""
+    return elevenlabs.TTS(
         api_key=os.getenv("ELEVENLABS_API_KEY"),
-        voice_id="21m00Tcm4TlvDq8ikWAM",  # Professional voice
-        model="eleven_turbo_v2",  # Low latency model for real-time
+        voice_id=TTS_VOICE["voice_id"],
+        model=TTS_VOICE["model"],
         optimize_streaming_latency=3,  # Optimize for streaming
-        stability=0.5,
-        similarity_boost=0.75,
+        **TTS_VOICE["settings"],
+    )
+
+
+def build_audio_cache() -> SynthesizedAudioCache:
+    """Fixed scenario responses play from disk/memory instead of live TTS"""
+    cache = SynthesizedAudioCache(os.getenv("TTS_AUDIO_CACHE_DIR", "/tmp/voiceflow-tts-cache"))
+    # Pull already synthesized responses into memory before the first call
+    cache.preload(scenario_response_audio_entries(TTS_VOICE))
+    return cache
+
+
+# Built once per worker process in prewarm and reused by every job it runs
+worker_resources = WorkerResources(
+    first_job_budget_ms=float(os.getenv("WORKER_FIRST_JOB_BUDGET_MS", "5000")),
+    rss_budget_mb=float(os.getenv("WORKER_RSS_BUDGET_MB", "500")),
+)
+worker_resources.register("stt", build_stt)
+worker_resources.register("vad", build_vad)
+worker_resources.register("llm", build_llm)
+worker_resources.register("tts", build_tts)
+worker_resources.register("intent_classifier", lambda: services.get("intent_classifier", IntentClassifier))
+worker_resources.register("filter_bank", lambda: shared_filter_bank(16000))
+worker_resources.register("storage", lambda: storage_backend)
+worker_resources.register("audio_cache", build_audio_cache)
+
+
+async def entrypoint(ctx: JobContext):
+    """
+    Main entrypoint for the VoiceFlow Pro agent with real AssemblyAI Universal-Streaming.
+    This function is called when a participant joins a LiveKit room.
+    """
+    logger.info(f"Connecting to room {ctx.room.name}")
+    await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
+
+    # Wait for the first participant to connect
+    participant = await ctx.wait_for_participant()
+    logger.info(f"Starting VoiceFlow Pro agent for participant {participant.identity}")
+
+    # Setup latency from here on is what prewarm removes
+    setup_start = time.perf_counter()
+    cold_builds_before = worker_resources.cold_builds
+    userdata = ctx.proc.userdata
+
+    stt = worker_resources.get(userdata, "stt")
+    business_llm = worker_resources.get(userdata, "llm")
+    tts = worker_resources.get(userdata, "tts")
+    worker_resources.get(userdata, "intent_classifier")
+    worker_resources.get(userdata, "filter_bank")
+    audio_cache = worker_resources.get(userdata, "audio_cache")
+
+    # Open backend connections (or the local database) before the first turn needs them
+    storage = worker_resources.get(userdata, "storage")
+    asyncio.create_task(storage.warm())
+
+    # Synthesize any fixed response missing from the cache, once per process
+    audio_cache.start_prepopulate(scenario_response_audio_entries(TTS_VOICE), tts_synthesizer(tts))
+
+    # Per-session audio processing chain
+    audio_processor = AdvancedAudioProcessor(
+        sample_rate=16000,
+        buffer_size=performance_optimizer.current_settings.chunk_size,
+        cpu_executors=performance_optimizer.cpu_executors,
+        metrics_journal=audio_journal,
     )
 
+    load_monitor.start()
+    load_monitor.start_reporting(current_latency_target_ms)
+    load_monitor.session_started()
+    load_monitor.dsp_stream_started()
+    # Turns measured by the speech loop drive the SLO controller, which publishes
+    # settings to this process's sessions through the settings bus
+    performance_optimizer.start_adaptive_loop()
+
+    async def _release_session_load():
+        load_monitor.dsp_stream_ended()
+        load_monitor.session_ended()
+        if load_monitor.active_sessions == 0:
+            await load_monitor.stop_reporting()
+            await performance_optimizer.stop_adaptive_loop()
+        for journal in (performance_journal, audio_journal):
+            if journal:
+                journal.sync()
+        logger.info(f"Worker resources: {worker_resources.get_statistics()}")
+        logger.info(f"Shared services: {services.get_statistics()}")
+
+    ctx.add_shutdown_callback(_release_session_load)
+
     # Create our business agent wrapper
-    voiceflow_agent = VoiceFlowAgent(ctx, participant)
+    voiceflow_agent = VoiceFlowAgent(
+        ctx,
+        participant,
+        settings_bus=performance_optimizer.settings_bus,
+        audio_processor=audio_processor,
+        business_llm=business_llm,
+        stt=stt,
+        tts=tts,
+        model_router=performance_optimizer.model_router,
+        persistence_queue=persistence_queue,
+        audio_cache=audio_cache,
+        tts_voice=TTS_VOICE,
+        # Matches speech_model in build_stt
+        stt_model="universal",
+        history_window_entries=int(os.getenv("CONVERSATION_HISTORY_WINDOW", "40")),
+        history_window_bytes=int(os.getenv("CONVERSATION_HISTORY_MAX_KB", "256")) * 1024,
+    )
 
     # Set up agent event handlers
     await voiceflow_agent.setup_event_handlers()
 
+    # Caller audio into STT, interim and final transcripts into the agent, replies out through TTS
+    speech_loop = SpeechLoop(voiceflow_agent, stt, tts, load_monitor=load_monitor,
+                             performance_optimizer=performance_optimizer)
+    await speech_loop.start()
+
+    # Job processes are torn down with the job: stop taking turns, drain queued writes and
+    # local storage, then close pooled connections
+    ctx.add_shutdown_callback(speech_loop.close)
+    ctx.add_shutdown_callback(persistence_queue.close)
+    ctx.add_shutdown_callback(storage.close)
+    ctx.add_shutdown_callback(services.close)
+    ctx.add_shutdown_callback(close_shared_http_clients)
+
+    worker_resources.record_job_setup((time.perf_counter() - setup_start) * 1000, cold_builds_before)
     logger.info("VoiceFlow Pro agent fully initialized and running")
 
     # Keep the connection alive
     await ctx.wait_for_participant()
 
 
-def prewarm(proc: JobContext):
+def prewarm(proc: JobProcess):
     """
     Prewarm function to initialize models and services.
     This is called when the worker starts to reduce cold start latency.
     """
-    proc.userdata["vad"] = assemblyai.VAD()
-    proc.userdata["stt"] = assemblyai.STT()
-    proc.userdata["llm"] = openai.LLM()
-    proc.userdata["tts"] = elevenlabs.TTS()
+    worker_resources.prewarm(proc.userdata)
 
 
 if __name__ == "__main__":
@@ -102,5 +293,8 @@ if __name__ == "__main__":
         WorkerOptions(
             entrypoint_fnc=entrypoint,
             prewarm_fnc=prewarm,
+            request_fnc=admission_controller.request_fnc,
+            load_fnc=admission_controller.load_fnc,
+            load_threshold=admission_controller.load_threshold,
         ),
     )
\ No newline at end of file
@@ -0,0 +1,293 @@
+"""
+Append-Only Binary Metrics Journal for VoiceFlow Pro
+
+This module persists per-turn metrics for post-mortem analysis:
+- Fixed-width little-endian records packed with struct (no JSON on the hot path)
+- Self-describing file header so readers need no schema import
+- Buffered appends with periodic fsync off the event loop
+- Size- and day-based rotation with retention pruning
+- Memory-mapped reader returning numpy structured arrays
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import struct
+import time
+from datetime import datetime, date, timedelta
+from operator import attrgetter
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_MAGIC = b"VFMJ"
+JOURNAL_FORMAT_VERSION = 1
+JOURNAL_SUFFIX = ".vfj"
+
+# magic, format version, total header length (preamble + JSON layout, padded)
+_PREAMBLE = struct.Struct("<4sHI")
+
+# struct format codes -> numpy little-endian dtypes
+_NUMPY_CODES = {
+    "d": "<f8", "f": "<f4",
+    "q": "<i8", "Q": "<u8", "i": "<i4", "I": "<u4",
+    "h": "<i2", "H": "<u2", "b": "i1", "B": "u1",
+}
+
+
+def _to_timestamp(value: Any) -> float:
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+class JournalSchema:
+    """
+    Fixed-width record layout for one metrics type.
+
+    ``fields`` lists (attribute, struct code) pairs; records are read with a
+    single attrgetter call, so any object exposing the attributes (normally a
+    metrics dataclass) can be appended. ``converters`` turn non-numeric
+    attributes such as enum lists into numbers. ``measured_at`` datetimes
+    are stored as epoch seconds.
+    """
+
+    def __init__(self, name: str, fields: List[Tuple[str, str]],
+                 converters: Optional[Dict[str, Callable[[Any], Any]]] = None):
+        self.name = name
+        self.fields = list(fields)
+        self.names = [field for field, _ in self.fields]
+        self.converters = dict(converters or {})
+        self.converters.setdefault("measured_at", _to_timestamp)
+
+        self._struct = struct.Struct("<" + "".join(code for _, code in self.fields))
+        self._getter = attrgetter(*self.names)
+        self._converted = [
+            (index, self.converters[field]) for index, field in enumerate(self.names)
+            if field in self.converters
+        ]
+
+    @property
+    def record_size(self) -> int:
+        return self._struct.size
+
+    @property
+    def dtype(self) -> np.dtype:
+        return schema_dtype(self.fields)
+
+    def pack(self, record: Any) -> bytes:
+        values = self._getter(record)
+        if self._converted:
+            values = list(values)
+            for index, converter in self._converted:
+                values[index] = converter(values[index])
+        return self._struct.pack(*values)
+
+    def header(self) -> bytes:
+        layout = json.dumps({"schema": self.name, "fields": self.fields}).encode()
+        length = _PREAMBLE.size + len(layout)
+        padding = -length % 8
+        return _PREAMBLE.pack(JOURNAL_MAGIC, JOURNAL_FORMAT_VERSION, length + padding) + layout + b" " * padding
+
+
+def schema_dtype(fields: List[Tuple[str, str]]) -> np.dtype:
+    """Packed numpy dtype matching a struct layout"""
+    return np.dtype([(name, _NUMPY_CODES[code]) for name, code in fields])
+
+
+class MetricsJournal:
+    """
+    Append-only writer for one schema.
+
+    ``append`` only packs the record into the file buffer; data reaches the
+    disk when the buffer fills, and an fsync runs every ``fsync_interval``
+    seconds on a worker thread. Each process writes its own files (the pid is
+    part of the file name), so jobs running in child processes never share
+    a file.
+    """
+
+    def __init__(self, directory: str, schema: JournalSchema,
+                 max_file_bytes: int = 64 * 1024 * 1024,
+                 fsync_interval: float = 5.0,
+                 retention_days: int = 7,
+                 buffer_size: int = 64 * 1024):
+        self.directory = directory
+        self.schema = schema
+        self.max_file_bytes = max_file_bytes
+        self.fsync_interval = fsync_interval
+        self.retention_days = retention_days
+        self.buffer_size = buffer_size
+
+        self._file = None
+        self._path: Optional[str] = None
+        self._pid: Optional[int] = None
+        self._day: Optional[date] = None
+        self._file_bytes = 0
+        self._last_sync = time.monotonic()
+
+        self.journal_stats = {
+            "records_written": 0,
+            "bytes_written": 0,
+            "files_rotated": 0,
+            "fsyncs": 0,
+            "write_errors": 0
+        }
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _next_path(self, day: date) -> str:
+        prefix = os.path.join(self.directory, f"{self.schema.name}-{day:%Y%m%d}-{os.getpid()}-")
+        sequence = len(glob.glob(prefix + "*" + JOURNAL_SUFFIX))
+        return f"{prefix}{sequence:04d}{JOURNAL_SUFFIX}"
+
+    def _open(self, day: date):
+        self._path = self._next_path(day)
+        self._file = open(self._path, "ab", buffering=self.buffer_size)
+        self._pid = os.getpid()
+        self._day = day
+
+        header = self.schema.header()
+        self._file.write(header)
+        self._file_bytes = len(header)
+
+    def _rotate(self, day: date):
+        if self._file is not None and self._pid == os.getpid():
+            self.sync(background=False)
+            self._file.close()
+            self.journal_stats["files_rotated"] += 1
+        self._file = None
+        self._open(day)
+        self._prune()
+
+    def _prune(self):
+        """Drop files older than the retention window"""
+        cutoff = (date.today() - timedelta(days=self.retention_days)).strftime("%Y%m%d")
+        for path in glob.glob(os.path.join(self.directory, f"{self.schema.name}-*{JOURNAL_SUFFIX}")):
+            file_day = os.path.basename(path).split("-")[1]
+            if file_day < cutoff:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def append(self, record: Any):
+        """Append one metrics record; never raises into the caller"""
+        try:
+            data = self.schema.pack(record)
+            today = date.today()
+
+            # A forked child inherits the parent's handle; give it its own file
+            if (self._file is None or self._pid != os.getpid() or today != self._day or
+                    self._file_bytes + len(data) > self.max_file_bytes):
+                self._rotate(today)
+
+            self._file.write(data)
+            self._file_bytes += len(data)
+            self.journal_stats["records_written"] += 1
+            self.journal_stats["bytes_written"] += len(data)
+
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                self.sync()
+        except Exception as e:
+            self.journal_stats["write_errors"] += 1
+            logger.error(f"Failed to append {self.schema.name} metrics to journal: {e}")
+
+    def sync(self, background: bool = True):
+        """Flush buffered records and fsync, on a worker thread when a loop is running"""
+        if self._file is None:
+            return
+
+        self._file.flush()
+        self._last_sync = time.monotonic()
+        self.journal_stats["fsyncs"] += 1
+        fd = self._file.fileno()
+
+        try:
+            loop = asyncio.get_running_loop() if background else None
+        except RuntimeError:
+            loop = None
+
+        if loop is not None:
+            loop.run_in_executor(None, self._fsync, fd)
+        else:
+            self._fsync(fd)
+
+    @staticmethod
+    def _fsync(fd: int):
+        try:
+            os.fsync(fd)
+        except OSError:
+            # File was rotated and closed before the background fsync ran
+            pass
+
+    def close(self):
+        if self._file is not None and self._pid == os.getpid():
+            self.sync(background=False)
+            self._file.close()
+        self._file = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "schema": self.schema.name,
+            "current_file": self._path,
+            "current_file_bytes": self._file_bytes,
+            **self.journal_stats
+        }
+
+
+def read_journal_header(path: str) -> Tuple[str, np.dtype, int]:
+    """Return (schema name, record dtype, header length) for a journal file"""
+    with open(path, "rb") as f:
+        magic, version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != JOURNAL_MAGIC:
+            raise ValueError(f"{path} is not a metrics journal")
+        if version != JOURNAL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported journal format version {version} in {path}")
+        layout = json.loads(f.read(header_length - _PREAMBLE.size))
+
+    fields = [tuple(field) for field in layout["fields"]]
+    return layout["schema"], schema_dtype(fields), header_length
+
+
+def map_journal_file(path: str) -> np.ndarray:
+    """
+    Memory-map a journal file as a structured array.
+
+    A record torn by a crash mid-write is ignored.
+    """
+    _, dtype, header_length = read_journal_header(path)
+    count = (os.path.getsize(path) - header_length) // dtype.itemsize
+    if count <= 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=header_length, shape=(count,))
+
+
+def journal_files(directory: str, schema_name: str, day: Optional[date] = None) -> List[str]:
+    day_pattern = f"{day:%Y%m%d}" if day else "*"
+    return sorted(glob.glob(os.path.join(directory, f"{schema_name}-{day_pattern}-*{JOURNAL_SUFFIX}")))
+
+
+def load_journal(directory: str, schema_name: str, day: Optional[date] = None,
+                 since: Optional[float] = None, until: Optional[float] = None) -> np.ndarray:
+    """
+    Load journal records (optionally one day, optionally a time range) into
+    a single structured array sorted by ``measured_at``.
+    """
+    arrays = [array for array in (map_journal_file(path) for path in journal_files(directory, schema_name, day))
+              if len(array)]
+    if not arrays:
+        return np.zeros(0)
+
+    dtype = arrays[0].dtype
+    records = np.concatenate([np.asarray(array) for array in arrays if array.dtype == dtype])
+
+    if "measured_at" in dtype.names:
+        if since is not None:
+            records = records[records["measured_at"] >= since]
+        if until is not None:
+            records = records[records["measured_at"] < until]
+        records = records[np.argsort(records["measured_at"], kind="stable")]
+
+    return records
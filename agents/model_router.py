@@ -0,0 +1,280 @@
+"""
+Latency-Aware Model Routing for VoiceFlow Pro
+
+This module selects STT/LLM/TTS models per turn based on observed behaviour:
+- Per-model EWMA and tail (p95) latency from real calls
+- Error-rate tracking with automatic degradation and recovery probing
+- Highest-quality selection that fits the remaining turn budget
+- Injectable clock so routing can be exercised offline with simulated latencies
+"""
+
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional, Callable, Iterable
+from dataclasses import dataclass
+
+from latency_sketch import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelOption:
+    """A routable model for one pipeline stage"""
+    name: str
+    stage: str
+    quality_rank: int         # Higher is better
+    prior_latency_ms: float   # Assumed latency until real samples arrive
+
+
+@dataclass
+class RoutingDecision:
+    """Outcome of a routing request"""
+    stage: str
+    model: str
+    predicted_latency_ms: float
+    budget_ms: Optional[float]
+    fits_budget: bool
+    fallback: bool
+    reason: str
+
+
+DEFAULT_MODEL_CATALOG: Dict[str, List[ModelOption]] = {
+    "stt": [
+        ModelOption("universal_streaming", "stt", 1, 100.0),
+        ModelOption("universal", "stt", 2, 200.0),
+        ModelOption("universal_enhanced", "stt", 3, 300.0),
+    ],
+    "llm": [
+        ModelOption("gpt-3.5-turbo", "llm", 1, 250.0),
+        ModelOption("gpt-4-turbo-preview", "llm", 2, 600.0),
+    ],
+    "tts": [
+        ModelOption("eleven_turbo_v2", "tts", 1, 75.0),
+        ModelOption("eleven_multilingual_v2", "tts", 2, 200.0),
+        ModelOption("eleven_monolingual_v1", "tts", 3, 250.0),
+    ],
+}
+
+
+class ModelLatencyStats:
+    """
+    Rolling latency and reliability statistics for one model.
+
+    Tail latency uses two generations of histograms that rotate every
+    ``window_samples`` observations, so the p95 reflects recent behaviour
+    while recording stays O(1).
+    """
+
+    def __init__(self, option: ModelOption, ewma_alpha: float = 0.2,
+                 window_samples: int = 200, min_samples: int = 5):
+        self.option = option
+        self.ewma_alpha = ewma_alpha
+        self.window_samples = window_samples
+        self.min_samples = min_samples
+
+        self.ewma_latency_ms = option.prior_latency_ms
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.total_calls = 0
+        self.total_errors = 0
+        self.degraded_until = 0.0
+
+        self._current = LatencyHistogram()
+        self._previous = LatencyHistogram()
+
+    def record(self, latency_ms: Optional[float], success: bool):
+        self.total_calls += 1
+        self.error_rate += self.ewma_alpha * ((0.0 if success else 1.0) - self.error_rate)
+
+        if not success:
+            self.total_errors += 1
+            self.consecutive_failures += 1
+            return
+
+        self.consecutive_failures = 0
+        if latency_ms is None:
+            return
+
+        self.ewma_latency_ms += self.ewma_alpha * (latency_ms - self.ewma_latency_ms)
+        self._current.record(latency_ms)
+        if self._current.count >= self.window_samples:
+            self._previous, self._current = self._current, LatencyHistogram()
+
+    @property
+    def sample_count(self) -> int:
+        return self._current.count + self._previous.count
+
+    def tail_latency_ms(self, percentile: float = 95) -> float:
+        if self.sample_count < self.min_samples:
+            return self.option.prior_latency_ms
+        return self._current.copy().merge(self._previous).percentile(percentile)
+
+    def predicted_latency_ms(self, percentile: float = 95) -> float:
+        """Conservative latency prediction: the larger of EWMA and tail latency"""
+        return max(self.ewma_latency_ms, self.tail_latency_ms(percentile))
+
+    def to_dict(self, now: float, percentile: float = 95) -> Dict[str, Any]:
+        return {
+            "model": self.option.name,
+            "quality_rank": self.option.quality_rank,
+            "ewma_latency_ms": self.ewma_latency_ms,
+            "tail_latency_ms": self.tail_latency_ms(percentile),
+            "error_rate": self.error_rate,
+            "consecutive_failures": self.consecutive_failures,
+            "samples": self.sample_count,
+            "total_calls": self.total_calls,
+            "total_errors": self.total_errors,
+            "degraded": self.degraded_until > now
+        }
+
+
+class ModelRouter:
+    """
+    Routes each turn to the best model that fits the latency budget
+    """
+
+    def __init__(self, catalog: Optional[Dict[str, List[ModelOption]]] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 tail_percentile: float = 95,
+                 error_rate_threshold: float = 0.5,
+                 failure_threshold: int = 3,
+                 degrade_seconds: float = 30.0,
+                 min_samples: int = 5):
+        self.catalog = catalog or DEFAULT_MODEL_CATALOG
+        self.clock = clock
+        self.tail_percentile = tail_percentile
+        self.error_rate_threshold = error_rate_threshold
+        self.failure_threshold = failure_threshold
+        self.degrade_seconds = degrade_seconds
+
+        self.stats: Dict[str, Dict[str, ModelLatencyStats]] = {
+            stage: {option.name: ModelLatencyStats(option, min_samples=min_samples) for option in options}
+            for stage, options in self.catalog.items()
+        }
+
+    def _stats(self, stage: str, model: str) -> Optional[ModelLatencyStats]:
+        return self.stats.get(stage, {}).get(model)
+
+    def record(self, stage: str, model: str, latency_ms: Optional[float], success: bool = True):
+        """Record the outcome of a real (or simulated) provider call"""
+        stats = self._stats(stage, model)
+        if stats is None:
+            return
+
+        stats.record(latency_ms, success)
+
+        if not success and (stats.consecutive_failures >= self.failure_threshold or
+                            stats.error_rate >= self.error_rate_threshold):
+            if stats.degraded_until <= self.clock():
+                logger.warning(f"Model {model} ({stage}) degraded: error rate {stats.error_rate:.2f}, "
+                               f"{stats.consecutive_failures} consecutive failures")
+            stats.degraded_until = self.clock() + self.degrade_seconds
+        elif success and stats.degraded_until and stats.degraded_until <= self.clock():
+            # Successful probe after the degradation window: fully healthy again
+            stats.degraded_until = 0.0
+
+    def has_samples(self, stage: str, model: str) -> bool:
+        """Whether the model's prediction rests on real calls rather than its prior"""
+        stats = self._stats(stage, model)
+        return stats is not None and stats.sample_count >= stats.min_samples
+
+    def is_degraded(self, stage: str, model: str) -> bool:
+        stats = self._stats(stage, model)
+        return stats is not None and stats.degraded_until > self.clock()
+
+    def predicted_latency_ms(self, stage: str, model: str) -> float:
+        stats = self._stats(stage, model)
+        return stats.predicted_latency_ms(self.tail_percentile) if stats else float("inf")
+
+    def select(self, stage: str, budget_ms: Optional[float] = None,
+               max_quality_rank: Optional[int] = None) -> RoutingDecision:
+        """Pick the highest-quality healthy model predicted to fit the budget"""
+        candidates = [
+            stats for stats in self.stats[stage].values()
+            if max_quality_rank is None or stats.option.quality_rank <= max_quality_rank
+        ] or list(self.stats[stage].values())
+
+        healthy = [stats for stats in candidates if stats.degraded_until <= self.clock()]
+        pool = healthy or candidates
+
+        def displaced_by_degradation(rank: int) -> bool:
+            # A better model exists but is currently degraded
+            return any(stats.option.quality_rank > rank and stats.degraded_until > self.clock()
+                       for stats in candidates)
+
+        ranked = sorted(pool, key=lambda s: s.option.quality_rank, reverse=True)
+        for stats in ranked:
+            predicted = stats.predicted_latency_ms(self.tail_percentile)
+            if budget_ms is None or predicted <= budget_ms:
+                return RoutingDecision(
+                    stage=stage,
+                    model=stats.option.name,
+                    predicted_latency_ms=predicted,
+                    budget_ms=budget_ms,
+                    fits_budget=True,
+                    fallback=not healthy or displaced_by_degradation(stats.option.quality_rank),
+                    reason="highest quality within budget" if healthy else "all models degraded"
+                )
+
+        # Nothing fits: take the fastest model we have
+        fastest = min(pool, key=lambda s: s.predicted_latency_ms(self.tail_percentile))
+        return RoutingDecision(
+            stage=stage,
+            model=fastest.option.name,
+            predicted_latency_ms=fastest.predicted_latency_ms(self.tail_percentile),
+            budget_ms=budget_ms,
+            fits_budget=False,
+            fallback=True,
+            reason="no model fits budget; using fastest"
+        )
+
+    def select_turn(self, budget_ms: float, stages: Iterable[str] = ("stt", "llm", "tts"),
+                    max_quality_ranks: Optional[Dict[str, int]] = None,
+                    upgrade_order: Iterable[str] = ("llm", "tts", "stt")) -> Dict[str, RoutingDecision]:
+        """
+        Split a turn budget across stages.
+
+        Every stage starts on its fastest healthy model; the remaining slack is
+        then spent upgrading stages in ``upgrade_order``.
+        """
+        stages = list(stages)
+        max_quality_ranks = max_quality_ranks or {}
+
+        decisions = {
+            stage: self.select(stage, 0.0, max_quality_ranks.get(stage))
+            for stage in stages
+        }
+        slack = budget_ms - sum(d.predicted_latency_ms for d in decisions.values())
+
+        for stage in [s for s in upgrade_order if s in decisions]:
+            baseline = decisions[stage].predicted_latency_ms
+            upgraded = self.select(stage, baseline + max(slack, 0.0), max_quality_ranks.get(stage))
+            if upgraded.fits_budget:
+                slack -= upgraded.predicted_latency_ms - baseline
+                decisions[stage] = upgraded
+
+        return decisions
+
+    def quality_rank(self, stage: str, model: str) -> Optional[int]:
+        stats = self._stats(stage, model)
+        return stats.option.quality_rank if stats else None
+
+    @asynccontextmanager
+    async def track(self, stage: str, model: str):
+        """Measure a provider call and feed the result back into routing"""
+        start = self.clock()
+        try:
+            yield
+        except Exception:
+            self.record(stage, model, None, success=False)
+            raise
+        self.record(stage, model, (self.clock() - start) * 1000)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        now = self.clock()
+        return {
+            stage: [stats.to_dict(now, self.tail_percentile) for stats in models.values()]
+            for stage, models in self.stats.items()
+        }
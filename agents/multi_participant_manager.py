@@ -18,11 +18,12 @@ from datetime import datetime, timedelta
 from enum import Enum
 import uuid
 from livekit import rtc, api
-from livekit.api import RoomServiceClient, ParticipantInfo
+from livekit.api import ParticipantInfo
 
-from escalation_manager import HumanAgent, HumanAgentType
+from escalation_manager import HumanAgent, HumanAgentType, shared_room_service
 from context_manager import AdvancedContextManager
-from voice_agent import CustomerContext, Scenario
+from customer_context import CustomerContext, Scenario
+from service_registry import services
 
 logger = logging.getLogger(__name__)
 
@@ -104,10 +105,10 @@ class MultiParticipantManager:
         self.api_secret = api_secret
         
         # LiveKit services
-        self.room_service = RoomServiceClient(livekit_url, api_key, api_secret)
+        self.room_service = shared_room_service(livekit_url, api_key, api_secret)
         
-        # Context manager
-        self.context_manager = AdvancedContextManager()
+        # Context manager, shared by every session in the process
+        self.context_manager = services.get("context_manager", AdvancedContextManager)
         
         # Active calls
         self.active_calls: Dict[str, MultiParticipantCall] = {}
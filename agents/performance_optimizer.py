@@ -15,13 +15,22 @@ import time
 import psutil
 import numpy as np
 from typing import Dict, Any, List, Optional, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, replace
 from datetime import datetime, timedelta
 from enum import Enum
 import json
 from livekit import rtc
 from livekit.agents import llm
 
+from latency_sketch import (
+    StageLatencySketches, WindowedLatencySketches, merge_serialized_sketches
+)
+from settings_bus import SettingsBus
+from slo_controller import SLOController
+from model_router import ModelRouter
+from cpu_executor import CPUExecutorManager
+from metrics_journal import MetricsJournal, JournalSchema
+
 logger = logging.getLogger(__name__)
 
 
@@ -74,6 +83,17 @@ class PerformanceMetrics:
     measured_at: datetime
 
 
+# On-disk layout for PerformanceMetrics in the metrics journal
+PERFORMANCE_JOURNAL_SCHEMA = JournalSchema("performance", [
+    ("measured_at", "d"),
+    ("stt_latency", "f"), ("llm_latency", "f"), ("tts_latency", "f"), ("total_latency", "f"),
+    ("audio_quality_score", "f"), ("noise_level", "f"), ("signal_strength", "f"), ("packet_loss", "f"),
+    ("cpu_usage", "f"), ("memory_usage", "f"), ("network_latency", "f"),
+    ("processing_queue_size", "I"), ("concurrent_sessions", "I"),
+    ("transcription_accuracy", "f"), ("response_relevance", "f"), ("voice_clarity", "f"),
+])
+
+
 @dataclass
 class OptimizationSettings:
     """Optimization configuration settings"""
@@ -97,10 +117,14 @@ class OptimizationSettings:
     partial_results: bool
     interrupt_threshold: float
     
-    # Model settings
+    # Model settings (running sessions adopt the LLM and TTS models; the STT
+    # model is fixed when a worker builds its STT plugin)
     stt_model: str
     llm_model: str
     tts_model: str
+    
+    # Noise suppression processing complexity (minimal/low/medium/high)
+    noise_suppression_complexity: str = "low"
 
 
 class PerformanceOptimizer:
@@ -108,7 +132,7 @@ class PerformanceOptimizer:
     Advanced performance optimization and audio quality tuning
     """
     
-    def __init__(self):
+    def __init__(self, metrics_journal: Optional[MetricsJournal] = None):
         # Current optimization settings
         self.current_settings = OptimizationSettings(
             sample_rate=16000,
@@ -180,13 +204,25 @@ class PerformanceOptimizer:
         
         # Performance monitoring
         self.metrics_history: List[PerformanceMetrics] = []
+        self.latency_sketches = WindowedLatencySketches()
+        # Optional on-disk journal so metrics survive worker restarts
+        self.metrics_journal = metrics_journal
         self.optimization_level = OptimizationLevel.LOW_LATENCY
         self.audio_quality = AudioQuality.STANDARD
         
+        # Settings propagation to running sessions
+        self.settings_bus = SettingsBus()
+        
+        # Per-turn model routing from observed provider latency
+        self.model_router = ModelRouter()
+        
+        # CPU pools (DSP, text analytics, serialization) sized by processing_threads
+        self.cpu_executors = CPUExecutorManager(self.current_settings.processing_threads)
+        
         # Adaptive optimization state
         self.adaptive_enabled = True
         self.last_optimization = datetime.now()
-        self.optimization_cooldown = timedelta(seconds=30)
+        self._adaptive_task: Optional[asyncio.Task] = None
         
         # Performance thresholds for adaptive optimization
         self.performance_thresholds = {
@@ -196,6 +232,13 @@ class PerformanceOptimizer:
             "memory_warning": 85,       # %
             "quality_minimum": 0.7      # quality score
         }
+        
+        # Windowed p95 feedback controller driving individual knobs
+        self.slo_controller = SLOController(
+            self._targets_for_level(self.optimization_level),
+            cpu_limit=self.performance_thresholds["cpu_warning"],
+            quality_minimum=self.performance_thresholds["quality_minimum"]
+        )
     
     async def measure_performance_metrics(self, room: rtc.Room,
                                         session_context: Dict[str, Any]) -> PerformanceMetrics:
@@ -252,6 +295,12 @@ class PerformanceOptimizer:
         
         # Store metrics history
         self.metrics_history.append(metrics)
+        self.latency_sketches.record_turn(
+            stt_latency, llm_latency, tts_latency, total_latency,
+            timestamp=metrics.measured_at.timestamp()
+        )
+        if self.metrics_journal:
+            self.metrics_journal.append(metrics)
         
         # Keep only last 100 measurements
         if len(self.metrics_history) > 100:
@@ -291,8 +340,12 @@ class PerformanceOptimizer:
     def _get_processing_metrics(self, session_context: Dict[str, Any]) -> Dict[str, int]:
         """Get processing queue and session metrics"""
         
+        executor_queue_depth = sum(
+            pool.queue_depth for pool in self.cpu_executors.pools.values()
+        )
+        
         return {
-            "queue_size": session_context.get("queue_size", 0),
+            "queue_size": session_context.get("queue_size", executor_queue_depth),
             "concurrent_sessions": session_context.get("concurrent_sessions", 1)
         }
     
@@ -304,7 +357,7 @@ class PerformanceOptimizer:
         logger.info(f"Optimizing for {target_level.value} performance")
         
         # Get target metrics
-        targets = self.performance_targets[target_level]
+        targets = self._targets_for_level(target_level)
         
         # Update optimization level
         self.optimization_level = target_level
@@ -320,6 +373,7 @@ class PerformanceOptimizer:
             buffer_size=self._calculate_optimal_buffer_size(target_level),
             processing_threads=self._calculate_optimal_threads(target_level),
             noise_suppression=self.audio_presets[self.audio_quality]["noise_suppression"],
+            noise_suppression_complexity=self.audio_presets[self.audio_quality]["processing_complexity"],
             echo_cancellation=True,
             auto_gain_control=True,
             streaming_enabled=target_level in [OptimizationLevel.ULTRA_LOW_LATENCY, OptimizationLevel.LOW_LATENCY],
@@ -330,12 +384,40 @@ class PerformanceOptimizer:
             tts_model=self._select_tts_model(target_level)
         )
         
+        # Keep the feedback controller aligned with the explicitly chosen target
+        self.slo_controller.set_targets(targets)
+        self.slo_controller.sync_knobs(
+            optimized_settings.chunk_size,
+            target_level.value,
+            optimized_settings.noise_suppression_complexity
+        )
+        
         # Apply settings
         self.current_settings = optimized_settings
         await self._apply_optimization_settings(optimized_settings)
         
         return optimized_settings
     
+    def _targets_for_level(self, level: OptimizationLevel) -> Dict[str, float]:
+        """Latency targets for a level (HIGH_QUALITY shares the BALANCED budget)"""
+        return self.performance_targets.get(level, self.performance_targets[OptimizationLevel.BALANCED])
+    
+    def _settings_from_knobs(self) -> OptimizationSettings:
+        """Derive settings from the controller's current knob positions"""
+        knobs = self.slo_controller.knobs
+        model_level = OptimizationLevel(knobs.model_tier_value)
+        
+        return replace(
+            self.current_settings,
+            chunk_size=knobs.chunk_size_value,
+            buffer_size=knobs.chunk_size_value * 4,
+            noise_suppression=knobs.ns_complexity_value != "minimal",
+            noise_suppression_complexity=knobs.ns_complexity_value,
+            stt_model=self._select_stt_model(model_level),
+            llm_model=self._select_llm_model(model_level),
+            tts_model=self._select_tts_model(model_level)
+        )
+    
     def _calculate_optimal_chunk_size(self, target_level: OptimizationLevel) -> int:
         """Calculate optimal audio chunk size for latency target"""
         
@@ -386,6 +468,23 @@ class PerformanceOptimizer:
         
         return thresholds[target_level]
     
+    def select_models_for_turn(self, remaining_budget_ms: Optional[float] = None) -> Dict[str, str]:
+        """
+        Route STT/LLM/TTS for the next turn within the remaining latency budget.
+        The level's static model choice acts as the quality ceiling.
+        """
+        if remaining_budget_ms is None:
+            remaining_budget_ms = self._targets_for_level(self.optimization_level)["total_latency"]
+        
+        ceilings = {
+            "stt": self.model_router.quality_rank("stt", self.current_settings.stt_model),
+            "llm": self.model_router.quality_rank("llm", self.current_settings.llm_model),
+            "tts": self.model_router.quality_rank("tts", self.current_settings.tts_model)
+        }
+        decisions = self.model_router.select_turn(remaining_budget_ms, max_quality_ranks=ceilings)
+        
+        return {stage: decision.model for stage, decision in decisions.items()}
+    
     def _select_stt_model(self, target_level: OptimizationLevel) -> str:
         """Select optimal STT model for target"""
         
@@ -425,73 +524,94 @@ class PerformanceOptimizer:
     async def _apply_optimization_settings(self, settings: OptimizationSettings):
         """Apply optimization settings to the system"""
         
-        # In production, this would configure:
-        # - Audio processing parameters
-        # - Model selection
-        # - Buffer sizes
-        # - Threading configuration
+        # Shared CPU pools resize immediately; running sessions pick the new
+        # settings up at their next turn boundary
+        self.cpu_executors.apply_optimization_settings(settings)
+        update = self.settings_bus.publish(settings, self.optimization_level.value)
         
-        logger.info(f"Applied optimization settings:")
+        logger.info(f"Applied optimization settings (v{update.version}):")
         logger.info(f"  Sample rate: {settings.sample_rate}Hz")
         logger.info(f"  Chunk size: {settings.chunk_size}")
         logger.info(f"  Processing threads: {settings.processing_threads}")
-        logger.info(f"  STT model: {settings.stt_model}")
+        logger.info(f"  STT model: {settings.stt_model} (not swapped in running sessions)")
         logger.info(f"  LLM model: {settings.llm_model}")
         logger.info(f"  TTS model: {settings.tts_model}")
     
     async def adaptive_optimization(self, current_metrics: PerformanceMetrics) -> bool:
         """
-        Perform adaptive optimization based on current performance
+        Perform adaptive optimization based on windowed performance against SLO targets
         """
         if not self.adaptive_enabled:
             return False
         
-        # Check if enough time has passed since last optimization
-        if datetime.now() - self.last_optimization < self.optimization_cooldown:
+        # Feed the sliding window; single slow turns only move the p95 slightly
+        self.slo_controller.observe(current_metrics, now=current_metrics.measured_at.timestamp())
+        return await self._apply_controller_decisions(now=current_metrics.measured_at.timestamp())
+    
+    def record_turn(self, stt_latency: Optional[float] = None, llm_latency: Optional[float] = None,
+                    tts_latency: Optional[float] = None, total_latency: Optional[float] = None):
+        """
+        Record the stage latencies measured for one live conversation turn.
+        
+        Stages that were not measured (e.g. TTS for a reply played from the
+        audio cache) are left out rather than recorded as zero.
+        """
+        now = time.time()
+        latencies = {stage: value for stage, value in (
+            ("stt", stt_latency), ("llm", llm_latency), ("tts", tts_latency), ("total", total_latency)
+        ) if value is not None}
+        for stage, value in latencies.items():
+            self.latency_sketches.record(stage, value, timestamp=now)
+        self.slo_controller.observe_turn(latencies, now=now)
+    
+    def start_adaptive_loop(self, interval_seconds: float = 5.0):
+        """Evaluate recorded turns against the SLO targets periodically on the running loop"""
+        if self._adaptive_task is None or self._adaptive_task.done():
+            self._adaptive_task = asyncio.get_running_loop().create_task(self._adaptive_loop(interval_seconds))
+    
+    async def stop_adaptive_loop(self):
+        if self._adaptive_task:
+            self._adaptive_task.cancel()
+            try:
+                await self._adaptive_task
+            except asyncio.CancelledError:
+                pass
+            self._adaptive_task = None
+    
+    async def _adaptive_loop(self, interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            if not self.adaptive_enabled:
+                continue
+            try:
+                self.slo_controller.observe_system(psutil.cpu_percent(interval=None))
+                await self._apply_controller_decisions()
+            except Exception as e:
+                logger.error(f"Adaptive optimization failed: {e}")
+    
+    async def _apply_controller_decisions(self, now: Optional[float] = None) -> bool:
+        """Evaluate the controller window and publish settings for any knob it moved"""
+        decisions = self.slo_controller.evaluate(now=now)
+        
+        if not decisions:
             return False
         
-        optimization_needed = False
-        new_level = self.optimization_level
+        new_settings = self._settings_from_knobs()
+        self.current_settings = new_settings
+        await self._apply_optimization_settings(new_settings)
+        self.last_optimization = datetime.now()
         
-        # Check latency performance
-        if current_metrics.total_latency > self.performance_thresholds["latency_critical"]:
-            # Critical latency - optimize aggressively
-            new_level = OptimizationLevel.ULTRA_LOW_LATENCY
-            optimization_needed = True
-            logger.warning(f"Critical latency detected: {current_metrics.total_latency}ms")
-            
-        elif current_metrics.total_latency > self.performance_thresholds["latency_warning"]:
-            # Warning latency - moderate optimization
-            if self.optimization_level not in [OptimizationLevel.ULTRA_LOW_LATENCY, OptimizationLevel.LOW_LATENCY]:
-                new_level = OptimizationLevel.LOW_LATENCY
-                optimization_needed = True
-                logger.warning(f"High latency detected: {current_metrics.total_latency}ms")
-        
-        # Check system resources
-        if (current_metrics.cpu_usage > self.performance_thresholds["cpu_warning"] or
-            current_metrics.memory_usage > self.performance_thresholds["memory_warning"]):
-            # High resource usage - reduce processing load
-            if self.optimization_level == OptimizationLevel.HIGH_QUALITY:
-                new_level = OptimizationLevel.BALANCED
-                optimization_needed = True
-                logger.warning(f"High resource usage: CPU {current_metrics.cpu_usage}%, Memory {current_metrics.memory_usage}%")
-        
-        # Check audio quality
-        if current_metrics.audio_quality_score < self.performance_thresholds["quality_minimum"]:
-            # Poor quality - try to improve
-            if self.optimization_level == OptimizationLevel.ULTRA_LOW_LATENCY:
-                new_level = OptimizationLevel.LOW_LATENCY
-                optimization_needed = True
-                logger.warning(f"Poor audio quality: {current_metrics.audio_quality_score:.2f}")
-        
-        # Apply optimization if needed
-        if optimization_needed and new_level != self.optimization_level:
-            await self.optimize_for_target(new_level)
-            self.last_optimization = datetime.now()
-            logger.info(f"Adaptive optimization applied: {self.optimization_level.value} -> {new_level.value}")
-            return True
-        
-        return False
+        for decision in decisions:
+            logger.info(f"Adaptive optimization applied: {decision.knob} "
+                        f"{decision.old_value} -> {decision.new_value} ({decision.reason})")
+        
+        return True
+    
+    def get_controller_decisions(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Get the audit log of adaptive optimization decisions
+        """
+        return self.slo_controller.get_decision_log(limit)
     
     def analyze_performance_trends(self, window_minutes: int = 10) -> Dict[str, Any]:
         """
@@ -598,17 +718,21 @@ class PerformanceOptimizer:
         
         benchmark_start = datetime.now()
         test_metrics = []
+        test_sketches = StageLatencySketches()
         
         # Run benchmark for specified duration
         while (datetime.now() - benchmark_start).total_seconds() < test_duration_seconds:
             # Simulate performance measurement
             metrics = await self.measure_performance_metrics(None, {"benchmark": True})
             test_metrics.append(metrics)
+            test_sketches.record_turn(
+                metrics.stt_latency, metrics.llm_latency, metrics.tts_latency, metrics.total_latency
+            )
             
             await asyncio.sleep(1)  # Measure every second
         
         # Analyze benchmark results
-        latencies = [m.total_latency for m in test_metrics]
+        total_latency = test_sketches.get("total")
         cpu_usages = [m.cpu_usage for m in test_metrics]
         quality_scores = [m.audio_quality_score for m in test_metrics]
         
@@ -616,13 +740,11 @@ class PerformanceOptimizer:
             "test_duration": test_duration_seconds,
             "measurements": len(test_metrics),
             "latency": {
-                "average": np.mean(latencies),
-                "minimum": min(latencies),
-                "maximum": max(latencies),
-                "p95": np.percentile(latencies, 95),
-                "p99": np.percentile(latencies, 99),
-                "target_met": np.mean(latencies) < self.performance_targets[self.optimization_level]["total_latency"]
+                **total_latency.summary(),
+                "target_met": total_latency.average < self.performance_targets[self.optimization_level]["total_latency"]
             },
+            "latency_breakdown": test_sketches.summary(),
+            "latency_sketches": test_sketches.to_dict(),
             "cpu_usage": {
                 "average": np.mean(cpu_usages),
                 "peak": max(cpu_usages),
@@ -651,11 +773,10 @@ class PerformanceOptimizer:
         if not recent_metrics:
             return {"error": "No data available for specified time period"}
         
-        # Calculate comprehensive statistics
-        latencies = [m.total_latency for m in recent_metrics]
-        stt_latencies = [m.stt_latency for m in recent_metrics]
-        llm_latencies = [m.llm_latency for m in recent_metrics]
-        tts_latencies = [m.tts_latency for m in recent_metrics]
+        # Calculate comprehensive statistics from the mergeable sketches
+        sketches = self.latency_sketches.merged(since=cutoff_time.timestamp())
+        total_sketch = sketches.get("total")
+        target_latency = self.performance_targets[self.optimization_level]["total_latency"]
         
         report = {
             "report_period": f"{hours} hours",
@@ -665,16 +786,18 @@ class PerformanceOptimizer:
             
             "latency_breakdown": {
                 "total": {
-                    "average": np.mean(latencies),
-                    "p95": np.percentile(latencies, 95),
-                    "target": self.performance_targets[self.optimization_level]["total_latency"],
-                    "target_met_percentage": sum(1 for l in latencies if l < self.performance_targets[self.optimization_level]["total_latency"]) / len(latencies) * 100
+                    **total_sketch.summary(),
+                    "target": target_latency,
+                    "target_met_percentage": total_sketch.fraction_below(target_latency) * 100
                 },
-                "stt": {"average": np.mean(stt_latencies), "p95": np.percentile(stt_latencies, 95)},
-                "llm": {"average": np.mean(llm_latencies), "p95": np.percentile(llm_latencies, 95)},
-                "tts": {"average": np.mean(tts_latencies), "p95": np.percentile(tts_latencies, 95)}
+                "stt": sketches.get("stt").summary(),
+                "llm": sketches.get("llm").summary(),
+                "tts": sketches.get("tts").summary()
             },
             
+            # Serialized sketches so reports from several workers can be merged
+            "latency_sketches": self.latency_sketches.to_dict(since=cutoff_time.timestamp()),
+            
             "quality_metrics": {
                 "audio_quality": {
                     "average": np.mean([m.audio_quality_score for m in recent_metrics]),
@@ -696,10 +819,33 @@ class PerformanceOptimizer:
                 "memory_usage": {
                     "average": np.mean([m.memory_usage for m in recent_metrics]),
                     "peak": max([m.memory_usage for m in recent_metrics])
-                }
+                },
+                "cpu_executors": self.cpu_executors.get_statistics()
             },
             
+            "metrics_journal": self.metrics_journal.get_statistics() if self.metrics_journal else None,
+            
             "generated_at": datetime.now().isoformat()
         }
         
-        return report
\ No newline at end of file
+        return report
+    
+    def export_latency_sketches(self, hours: int = 24) -> Dict[str, Any]:
+        """
+        Export windowed latency sketches for fleet-wide aggregation
+        """
+        cutoff_time = datetime.now() - timedelta(hours=hours)
+        return self.latency_sketches.to_dict(since=cutoff_time.timestamp())
+    
+    @staticmethod
+    def aggregate_worker_sketches(payloads: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Compute fleet-wide latency percentiles from sketches exported by each worker
+        """
+        combined = merge_serialized_sketches(payloads)
+        
+        return {
+            "workers": len(payloads),
+            "latency_breakdown": combined.summary(),
+            "generated_at": datetime.now().isoformat()
+        }
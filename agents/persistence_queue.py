@@ -0,0 +1,368 @@
+"""
+Write-Behind Persistence Queue for VoiceFlow Pro
+
+This module takes backend persistence off the response critical path:
+- Conversation messages and state snapshots are enqueued, not awaited
+- Background flusher batches messages per room into bulk writes
+- Per-room ordering; queued state updates coalesce into one write
+- Bounded queue with backpressure on producers
+- Local JSONL spool so queued events survive a worker crash
+- Dead-lettering of events the backend rejects outright
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional, Deque, List
+
+from latency_sketch import LatencyHistogram
+from context_sync import coalesce_state_updates
+from storage_backend import WriteRejected
+
+logger = logging.getLogger(__name__)
+
+EVENT_MESSAGE = "message"
+EVENT_STATE = "state"
+
+
+@dataclass
+class PersistenceEvent:
+    """One queued write"""
+    sequence: int
+    kind: str
+    room_id: str
+    payload: Dict[str, Any]
+    enqueued_at: float
+
+
+class WriteBehindQueue:
+    """
+    Background persistence for conversation messages and state.
+
+    Each room's events are flushed in order by one writer at a time. A flush
+    first sends the room's queued state updates coalesced into one (this also
+    makes sure the conversation row exists), then all queued messages as one
+    bulk write. Failed writes stay at the head of the room's queue and are retried
+    with backoff, so later events never overtake them. Events the backend
+    rejects outright (``WriteRejected``) are dead-lettered instead: logged,
+    appended to ``dead-letter.jsonl`` in the spool directory and dropped, so
+    they cannot block the room or fill the queue.
+
+    Every event is appended to a per-process spool file before it is queued
+    and acknowledged there once written; ``recover`` replays unacknowledged
+    events left by processes that are no longer running.
+    """
+
+    def __init__(self, db_manager: Any, spool_dir: Optional[str] = None,
+                 max_pending: int = 2000, batch_size: int = 100,
+                 flush_interval: float = 0.25, retry_base_delay: float = 0.5,
+                 retry_max_delay: float = 10.0, max_spool_bytes: int = 8 * 1024 * 1024):
+        self.db_manager = db_manager
+        self.spool_dir = spool_dir
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.max_spool_bytes = max_spool_bytes
+
+        self._pending: Dict[str, Deque[PersistenceEvent]] = {}
+        self._pending_count = 0
+        self._room_locks: Dict[str, asyncio.Lock] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._failures: Dict[str, int] = {}
+        self._sequence = 0
+
+        self._space_available = asyncio.Condition()
+        self._wake = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._spool = None
+        self._spool_path: Optional[str] = None
+
+        self.flush_latency = LatencyHistogram()
+        self.queue_stats = {
+            "enqueued": 0,
+            "messages_written": 0,
+            "states_written": 0,
+            "states_coalesced": 0,
+            "batches": 0,
+            "write_failures": 0,
+            "dead_lettered": 0,
+            "backpressure_waits": 0,
+            "recovered": 0,
+            "max_pending": 0
+        }
+
+    # Spool
+
+    def _open_spool(self):
+        if not self.spool_dir:
+            return
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._spool_path = os.path.join(self.spool_dir, f"persistence-{os.getpid()}.jsonl")
+        self._spool = open(self._spool_path, "a", buffering=1)
+
+    def _spool_write(self, record: Dict[str, Any]):
+        if self._spool is not None:
+            self._spool.write(json.dumps(record, default=str) + "\n")
+
+    def _spool_compact(self):
+        """Truncate the spool when drained, or rewrite it with only pending events when large"""
+        if self._spool is None:
+            return
+        if self._pending_count == 0:
+            self._spool.seek(0)
+            self._spool.truncate()
+        elif self._spool.tell() > self.max_spool_bytes:
+            self._spool.seek(0)
+            self._spool.truncate()
+            for events in self._pending.values():
+                for event in events:
+                    self._spool_write(asdict(event))
+
+    def _remove(self, room_id: str, done: List[PersistenceEvent]):
+        """Drop written or dead-lettered events from the room's queue and acknowledge them"""
+        sequences = {event.sequence for event in done}
+        remaining = deque(event for event in self._pending[room_id] if event.sequence not in sequences)
+        if remaining:
+            self._pending[room_id] = remaining
+        else:
+            del self._pending[room_id]
+        self._pending_count -= len(done)
+        self._spool_write({"ack": sorted(sequences)})
+        self._spool_compact()
+
+    def _dead_letter(self, room_id: str, events: List[PersistenceEvent], error: WriteRejected):
+        self.queue_stats["dead_lettered"] += len(events)
+        logger.error(f"Dropping {len(events)} persistence events for room {room_id}: {error}")
+        if not self.spool_dir:
+            return
+        try:
+            with open(os.path.join(self.spool_dir, "dead-letter.jsonl"), "a") as f:
+                for event in events:
+                    f.write(json.dumps({**asdict(event), "status": error.status}, default=str) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write dead-letter file: {e}")
+
+    @staticmethod
+    def _process_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def recover(self) -> int:
+        """Re-queue unacknowledged events from spools of dead processes"""
+        if not self.spool_dir:
+            return 0
+
+        recovered = 0
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "persistence-*.jsonl"))):
+            try:
+                pid = int(os.path.basename(path)[len("persistence-"):-len(".jsonl")])
+            except ValueError:
+                continue
+            if pid == os.getpid() or self._process_alive(pid):
+                continue
+
+            # Job processes starting together race for the same spool; the rename decides
+            # which one replays it, since batch message writes are not idempotent
+            claimed_path = f"{path}.claimed-{os.getpid()}"
+            try:
+                os.rename(path, claimed_path)
+            except OSError:
+                continue
+
+            events: Dict[int, Dict[str, Any]] = {}
+            with open(claimed_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line
+                    if "ack" in record:
+                        for sequence in record["ack"]:
+                            events.pop(sequence, None)
+                    else:
+                        events[record["sequence"]] = record
+
+            for record in events.values():
+                self._enqueue_nowait(record["kind"], record["room_id"], record["payload"])
+                recovered += 1
+            os.remove(claimed_path)
+
+        if recovered:
+            self.queue_stats["recovered"] += recovered
+            logger.info(f"Recovered {recovered} unwritten persistence events from spool")
+        return recovered
+
+    # Producers
+
+    def start(self):
+        """Open the spool, replay crashed spools and start the flusher on the running loop"""
+        if self._flusher is not None and not self._flusher.done():
+            return
+        if self._spool is None:
+            self._open_spool()
+            self.recover()
+        self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    def _enqueue_nowait(self, kind: str, room_id: str, payload: Dict[str, Any]):
+        self._sequence += 1
+        event = PersistenceEvent(self._sequence, kind, room_id, payload, time.time())
+        if self._spool is not None:
+            self._spool_write(asdict(event))
+
+        self._pending.setdefault(room_id, deque()).append(event)
+        self._pending_count += 1
+        self.queue_stats["enqueued"] += 1
+        self.queue_stats["max_pending"] = max(self.queue_stats["max_pending"], self._pending_count)
+
+        if self._pending_count >= self.batch_size:
+            self._wake.set()
+
+    async def enqueue(self, kind: str, room_id: str, payload: Dict[str, Any]):
+        """Queue a write; waits only when the queue is full"""
+        self.start()
+        if self._pending_count >= self.max_pending:
+            self.queue_stats["backpressure_waits"] += 1
+            self._wake.set()
+            async with self._space_available:
+                await self._space_available.wait_for(lambda: self._pending_count < self.max_pending)
+        self._enqueue_nowait(kind, room_id, payload)
+
+    async def enqueue_message(self, message: Dict[str, Any]):
+        await self.enqueue(EVENT_MESSAGE, message["room_id"], message)
+
+    async def enqueue_state(self, update: Dict[str, Any]):
+        """Queue a context_sync snapshot or delta"""
+        await self.enqueue(EVENT_STATE, update["room_id"], update)
+
+    # Flushing
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            now = time.monotonic()
+            rooms = [room for room, events in self._pending.items()
+                     if events and self._retry_at.get(room, 0.0) <= now]
+            if rooms:
+                await asyncio.gather(*(self._flush_room(room) for room in rooms))
+
+    async def _flush_room(self, room_id: str) -> bool:
+        """Write one batch of a room's events; returns False if the write failed"""
+        lock = self._room_locks.setdefault(room_id, asyncio.Lock())
+        async with lock:
+            events = self._pending.get(room_id)
+            if not events:
+                return True
+
+            batch = list(events)[:self.batch_size]
+            states = [event for event in batch if event.kind == EVENT_STATE]
+            messages = [event.payload for event in batch if event.kind == EVENT_MESSAGE]
+
+            start = time.perf_counter()
+            try:
+                if states:
+                    try:
+                        if not await self.db_manager.save_conversation_update(
+                                coalesce_state_updates([event.payload for event in states])):
+                            raise RuntimeError("state write failed")
+                        self.queue_stats["states_written"] += 1
+                        self.queue_stats["states_coalesced"] += len(states) - 1
+                    except WriteRejected as e:
+                        self._dead_letter(room_id, states, e)
+                    # Written or dead-lettered: a retry of the messages must not resend them
+                    self._remove(room_id, states)
+                if messages:
+                    message_events = [event for event in batch if event.kind == EVENT_MESSAGE]
+                    try:
+                        if not await self.db_manager.log_conversation_messages(room_id, messages):
+                            raise RuntimeError("message batch failed")
+                        self.queue_stats["messages_written"] += len(messages)
+                    except WriteRejected as e:
+                        self._dead_letter(room_id, message_events, e)
+                    self._remove(room_id, message_events)
+            except Exception as e:
+                failures = self._failures.get(room_id, 0) + 1
+                self._failures[room_id] = failures
+                delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** (failures - 1)))
+                self._retry_at[room_id] = time.monotonic() + delay
+                self.queue_stats["write_failures"] += 1
+                logger.warning(f"Persistence for room {room_id} failed ({e}); retrying in {delay:.1f}s")
+                return False
+
+            self.flush_latency.record((time.perf_counter() - start) * 1000)
+            self._failures.pop(room_id, None)
+            self._retry_at.pop(room_id, None)
+            self.queue_stats["batches"] += 1
+
+        async with self._space_available:
+            self._space_available.notify_all()
+        return True
+
+    async def flush(self, room_id: Optional[str] = None, max_attempts: int = 3) -> bool:
+        """
+        Write everything queued (for one room or all rooms) now, ignoring backoff.
+
+        A room that keeps failing does not stop the others from being
+        flushed; returns False if any room still has events queued.
+        """
+        rooms = [room_id] if room_id else list(self._pending)
+        flushed = True
+        for room in rooms:
+            attempts = 0
+            while self._pending.get(room):
+                if await self._flush_room(room):
+                    continue
+                attempts += 1
+                if attempts >= max_attempts:
+                    # Left in the queue and spool; the flusher keeps retrying
+                    flushed = False
+                    break
+                await asyncio.sleep(self.retry_base_delay)
+        return flushed
+
+    async def close(self):
+        """Flush what can be written and stop the flusher; the spool keeps the rest"""
+        await self.flush()
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+            if self._pending_count == 0 and self._spool_path and os.path.exists(self._spool_path):
+                os.remove(self._spool_path)
+
+    def pending(self, room_id: Optional[str] = None) -> int:
+        if room_id:
+            return len(self._pending.get(room_id, ()))
+        return self._pending_count
+
+    def get_statistics(self) -> Dict[str, Any]:
+        oldest = min((events[0].enqueued_at for events in self._pending.values() if events), default=None)
+        return {
+            "pending": self._pending_count,
+            "rooms_pending": sum(1 for events in self._pending.values() if events),
+            "oldest_pending_age_s": time.time() - oldest if oldest else 0.0,
+            "flush_ms": self.flush_latency.summary(),
+            **self.queue_stats
+        }
@@ -6,6 +6,7 @@ This module provides sophisticated sentiment analysis that:
 - Analyzes emotional undertones beyond basic positive/negative
 - Provides actionable insights for conversation management
 - Triggers appropriate response adjustments
+- One analyzer per worker process; per-session history lives in SentimentHistory
 """
 
 import asyncio
@@ -17,12 +18,18 @@ from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
 import re
-from textblob import TextBlob
-import openai
+from collections import deque
 from livekit import rtc
 
+from cpu_executor import CPUExecutorManager
+from lazy_imports import lazy_import
+from service_registry import shared_openai_client
+
 logger = logging.getLogger(__name__)
 
+# NLP library loads on first use, not at worker spawn
+textblob = lazy_import("textblob")
+
 
 class EmotionalState(Enum):
     """Detailed emotional states beyond simple sentiment"""
@@ -78,13 +85,42 @@ class SentimentAnalysis:
     processing_time_ms: float
 
 
+class SentimentHistory:
+    """Recent analyses per speaker of one session, for trend analysis"""
+    
+    def __init__(self, max_per_speaker: int = 20):
+        self.max_per_speaker = max_per_speaker
+        self._by_speaker: Dict[str, deque] = {}
+    
+    def record(self, speaker_id: str, analysis: SentimentAnalysis):
+        if speaker_id not in self._by_speaker:
+            self._by_speaker[speaker_id] = deque(maxlen=self.max_per_speaker)
+        self._by_speaker[speaker_id].append(analysis)
+    
+    def get(self, speaker_id: str) -> List[SentimentAnalysis]:
+        return list(self._by_speaker.get(speaker_id, ()))
+    
+    def __contains__(self, speaker_id: str) -> bool:
+        return speaker_id in self._by_speaker
+    
+    def clear(self, speaker_id: Optional[str] = None):
+        if speaker_id is None:
+            self._by_speaker.clear()
+        else:
+            self._by_speaker.pop(speaker_id, None)
+
+
 class AdvancedSentimentAnalyzer:
     """
-    Advanced sentiment analysis with LiveKit integration
+    Advanced sentiment analysis with LiveKit integration.
+    
+    Holds only patterns and clients, so one instance serves every session in
+    the process; callers keep a SentimentHistory per session and pass it in.
     """
     
-    def __init__(self):
-        self.openai_client = openai.AsyncOpenAI()
+    def __init__(self, cpu_executors: Optional[CPUExecutorManager] = None):
+        self.openai_client = shared_openai_client()
+        self.cpu_executors = cpu_executors
         
         # Sentiment analysis patterns
         self.emotion_patterns = {
@@ -145,35 +181,31 @@ class AdvancedSentimentAnalyzer:
             r'\b(let\'s|we should|we could)\b'
         ]
         
-        # Conversation history for trend analysis
-        self.sentiment_history: Dict[str, List[SentimentAnalysis]] = {}
-        
     async def analyze_comprehensive_sentiment(self, text: str, 
                                             speaker_id: str = None,
-                                            context: Dict[str, Any] = None) -> SentimentAnalysis:
+                                            context: Dict[str, Any] = None,
+                                            history: Optional[SentimentHistory] = None) -> SentimentAnalysis:
         """
-        Perform comprehensive sentiment analysis
+        Perform comprehensive sentiment analysis; recorded in ``history`` under ``speaker_id`` if given
         """
         start_time = datetime.now()
         
-        # Basic sentiment analysis
-        blob = TextBlob(text)
-        basic_polarity = blob.sentiment.polarity
-        basic_subjectivity = blob.sentiment.subjectivity
-        
-        # Emotional state detection
-        emotional_state = self._detect_emotional_state(text)
-        intensity = self._calculate_intensity(text, emotional_state)
-        
-        # Contextual analysis
-        urgency_level = self._calculate_urgency(text)
-        satisfaction_score = self._calculate_satisfaction(text)
-        engagement_level = self._calculate_engagement(text)
-        
-        # Conversation dynamics
-        question_ratio = self._calculate_question_ratio(text)
-        complexity_score = self._calculate_complexity(text)
-        assertiveness = self._calculate_assertiveness(text)
+        # TextBlob and regex scoring are CPU-bound; keep them off the event loop
+        if self.cpu_executors:
+            features = await self.cpu_executors.run("text_analytics", self._analyze_text_features, text)
+        else:
+            features = self._analyze_text_features(text)
+        
+        basic_polarity = features["polarity"]
+        basic_subjectivity = features["subjectivity"]
+        emotional_state = features["emotional_state"]
+        intensity = features["intensity"]
+        urgency_level = features["urgency_level"]
+        satisfaction_score = features["satisfaction_score"]
+        engagement_level = features["engagement_level"]
+        question_ratio = features["question_ratio"]
+        complexity_score = features["complexity_score"]
+        assertiveness = features["assertiveness"]
         
         # Advanced analysis using OpenAI for nuanced understanding
         ai_analysis = await self._get_ai_sentiment_analysis(text, context)
@@ -209,17 +241,36 @@ class AdvancedSentimentAnalyzer:
             processing_time_ms=(datetime.now() - start_time).total_seconds() * 1000
         )
         
-        # Store in history for trend analysis
-        if speaker_id:
-            if speaker_id not in self.sentiment_history:
-                self.sentiment_history[speaker_id] = []
-            self.sentiment_history[speaker_id].append(analysis)
-            
-            # Keep only last 20 analyses
-            self.sentiment_history[speaker_id] = self.sentiment_history[speaker_id][-20:]
+        # Store in the session's history for trend analysis
+        if speaker_id and history is not None:
+            history.record(speaker_id, analysis)
         
         return analysis
     
+    def _analyze_text_features(self, text: str) -> Dict[str, Any]:
+        """Run all lexical and TextBlob scoring for a text"""
+        
+        # Basic sentiment analysis
+        blob = textblob.TextBlob(text)
+        
+        # Emotional state detection
+        emotional_state = self._detect_emotional_state(text)
+        
+        return {
+            "polarity": blob.sentiment.polarity,
+            "subjectivity": blob.sentiment.subjectivity,
+            "emotional_state": emotional_state,
+            "intensity": self._calculate_intensity(text, emotional_state),
+            # Contextual analysis
+            "urgency_level": self._calculate_urgency(text),
+            "satisfaction_score": self._calculate_satisfaction(text),
+            "engagement_level": self._calculate_engagement(text),
+            # Conversation dynamics
+            "question_ratio": self._calculate_question_ratio(text),
+            "complexity_score": self._calculate_complexity(text),
+            "assertiveness": self._calculate_assertiveness(text)
+        }
+    
     def _detect_emotional_state(self, text: str) -> EmotionalState:
         """Detect specific emotional state from text"""
         text_lower = text.lower()
@@ -237,7 +288,7 @@ class AdvancedSentimentAnalyzer:
             return max(emotion_scores, key=emotion_scores.get)
         
         # Fallback to basic sentiment-based classification
-        blob = TextBlob(text)
+        blob = textblob.TextBlob(text)
         polarity = blob.sentiment.polarity
         
         if polarity > 0.5:
@@ -502,13 +553,13 @@ class AdvancedSentimentAnalyzer:
         total_risk = 1.0 - np.prod([1.0 - factor for factor in risk_factors])
         return min(total_risk, 1.0)
     
-    def analyze_sentiment_trend(self, speaker_id: str, 
+    def analyze_sentiment_trend(self, sentiment_history: SentimentHistory, speaker_id: str, 
                               window_size: int = 10) -> Tuple[SentimentTrend, float]:
         """Analyze sentiment trend over conversation"""
-        if speaker_id not in self.sentiment_history:
+        if speaker_id not in sentiment_history:
             return SentimentTrend.STABLE, 0.0
         
-        history = self.sentiment_history[speaker_id]
+        history = sentiment_history.get(speaker_id)
         if len(history) < 3:
             return SentimentTrend.STABLE, 0.0
         
@@ -537,7 +588,8 @@ class AdvancedSentimentAnalyzer:
             return SentimentTrend.STABLE, slope
     
     async def process_livekit_audio_event(self, event: rtc.TrackEvent, 
-                                        room_context: Dict[str, Any]) -> Optional[SentimentAnalysis]:
+                                        room_context: Dict[str, Any],
+                                        history: Optional[SentimentHistory] = None) -> Optional[SentimentAnalysis]:
         """Process LiveKit audio events for real-time sentiment analysis"""
         try:
             # This would integrate with speech-to-text to get real-time transcription
@@ -547,7 +599,8 @@ class AdvancedSentimentAnalyzer:
                 return await self.analyze_comprehensive_sentiment(
                     event.transcript,
                     event.participant.identity,
-                    room_context
+                    room_context,
+                    history
                 )
             
             return None
@@ -556,12 +609,12 @@ class AdvancedSentimentAnalyzer:
             logger.error(f"Failed to process LiveKit audio event: {e}")
             return None
     
-    def get_sentiment_summary(self, speaker_id: str) -> Dict[str, Any]:
+    def get_sentiment_summary(self, sentiment_history: SentimentHistory, speaker_id: str) -> Dict[str, Any]:
         """Get comprehensive sentiment summary for a speaker"""
-        if speaker_id not in self.sentiment_history:
+        if speaker_id not in sentiment_history:
             return {"error": "No sentiment history found"}
         
-        history = self.sentiment_history[speaker_id]
+        history = sentiment_history.get(speaker_id)
         if not history:
             return {"error": "Empty sentiment history"}
         
@@ -572,7 +625,7 @@ class AdvancedSentimentAnalyzer:
         avg_urgency = np.mean([a.urgency_level for a in history])
         
         # Get trend
-        trend, trend_slope = self.analyze_sentiment_trend(speaker_id)
+        trend, trend_slope = self.analyze_sentiment_trend(sentiment_history, speaker_id)
         
         # Most common emotional state
         emotional_states = [a.emotional_state for a in history]
@@ -0,0 +1,106 @@
+"""
+Process-Level Service Registry for VoiceFlow Pro
+
+This module holds the analyzers and clients shared by every session in a worker:
+- One instance per service name per process, built on first use
+- Factories can be registered up front (configured instances from main.py)
+  or supplied by the caller as a default
+- Shared services keep no per-session state; sessions pass theirs in
+  (e.g. sentiment history)
+- Build time, instance and lookup statistics, and one close for all of them
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional, Callable
+
+from lazy_imports import lazy_import
+
+logger = logging.getLogger(__name__)
+
+openai = lazy_import("openai")
+
+
+class ServiceRegistry:
+    """
+    Named per-process singletons.
+
+    Unlike WorkerResources, which lives in a job process's userdata and is
+    prewarmed, services are reached from anywhere in the agent code (managers
+    that build their own dependencies) and are built lazily. Builds are
+    serialized by a lock so executor threads never see two instances.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self.build_ms: Dict[str, float] = {}
+        self.registry_stats = {"lookups": 0, "builds": 0}
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Use ``factory`` to build ``name``; has no effect once it is built"""
+        with self._lock:
+            if name in self._instances:
+                logger.warning(f"Service {name} is already built; the new factory is ignored")
+            self._factories[name] = factory
+
+    def provide(self, name: str, instance: Any):
+        """Share an instance built elsewhere"""
+        with self._lock:
+            self._instances[name] = instance
+
+    def get(self, name: str, default_factory: Optional[Callable[[], Any]] = None) -> Any:
+        """Return the shared ``name``, building it with the registered (or default) factory"""
+        self.registry_stats["lookups"] += 1
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if name not in self._instances:
+                factory = self._factories.get(name, default_factory)
+                if factory is None:
+                    raise KeyError(f"No factory registered for service {name}")
+                start = time.perf_counter()
+                self._instances[name] = factory()
+                self.build_ms[name] = (time.perf_counter() - start) * 1000
+                self.registry_stats["builds"] += 1
+            return self._instances[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._instances
+
+    async def close(self):
+        """Close every built service that has a ``close``, newest first; safe to call more than once"""
+        with self._lock:
+            instances = list(self._instances.items())
+            self._instances.clear()
+        for name, instance in reversed(instances):
+            close = getattr(instance, "close", None)
+            if close is None:
+                continue
+            try:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Failed to close service {name}: {e}")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "services": sorted(self._instances),
+            "build_ms": dict(self.build_ms),
+            **self.registry_stats
+        }
+
+
+# The registry of this process
+services = ServiceRegistry()
+
+
+def shared_openai_client() -> Any:
+    """This process's AsyncOpenAI client (and its connection pool)"""
+    return services.get("openai_client", lambda: openai.AsyncOpenAI())
@@ -0,0 +1,188 @@
+"""
+Live Settings Propagation for VoiceFlow Pro
+
+This module distributes optimization settings to running sessions:
+- Versioned publication of OptimizationSettings from the optimizer
+- Per-session subscriptions that coalesce to the newest pending version
+- Adoption only at a safe turn boundary chosen by the session
+- Acknowledgement log recording when each session adopted each version
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Union
+from dataclasses import dataclass
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+SettingsApplyFnc = Callable[[Any], Union[None, Awaitable[None]]]
+
+
+@dataclass
+class SettingsUpdate:
+    """A published version of the optimization settings"""
+    version: int
+    settings: Any  # OptimizationSettings
+    optimization_level: str
+    published_at: datetime
+
+
+@dataclass
+class SettingsAcknowledgement:
+    """Record of a session adopting (or failing to adopt) a settings version"""
+    session_id: str
+    version: int
+    optimization_level: str
+    published_at: datetime
+    adopted_at: datetime
+    success: bool
+    error: Optional[str] = None
+
+    @property
+    def adoption_delay_ms(self) -> float:
+        return (self.adopted_at - self.published_at).total_seconds() * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "version": self.version,
+            "optimization_level": self.optimization_level,
+            "published_at": self.published_at.isoformat(),
+            "adopted_at": self.adopted_at.isoformat(),
+            "adoption_delay_ms": self.adoption_delay_ms,
+            "success": self.success,
+            "error": self.error
+        }
+
+
+class SessionSettingsSubscription:
+    """
+    A session's view of the settings bus.
+
+    Published updates are only queued here; the session decides when it is
+    safe to reconfigure by calling ``apply_pending`` (e.g. between turns),
+    so audio already in flight is never processed with half-applied settings.
+    """
+
+    def __init__(self, bus: 'SettingsBus', session_id: str, apply_fnc: SettingsApplyFnc):
+        self.bus = bus
+        self.session_id = session_id
+        self.apply_fnc = apply_fnc
+        self.pending: Optional[SettingsUpdate] = None
+        self.applied_version = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def has_pending(self) -> bool:
+        return self.pending is not None
+
+    def _offer(self, update: SettingsUpdate):
+        # Only the newest version matters; older pending versions are superseded
+        if update.version > self.applied_version:
+            self.pending = update
+
+    async def apply_pending(self) -> Optional[SettingsAcknowledgement]:
+        """Adopt the newest pending settings version, if any"""
+        if self.pending is None:
+            return None
+
+        async with self._lock:
+            update, self.pending = self.pending, None
+            if update is None:
+                return None
+
+            error = None
+            try:
+                result = self.apply_fnc(update.settings)
+                if asyncio.iscoroutine(result):
+                    await result
+                self.applied_version = update.version
+            except Exception as e:
+                # Keep running on the previous settings rather than dropping the call
+                error = str(e)
+                logger.error(f"Session {self.session_id} failed to adopt settings v{update.version}: {e}")
+
+            acknowledgement = SettingsAcknowledgement(
+                session_id=self.session_id,
+                version=update.version,
+                optimization_level=update.optimization_level,
+                published_at=update.published_at,
+                adopted_at=datetime.now(),
+                success=error is None,
+                error=error
+            )
+            self.bus._record_acknowledgement(acknowledgement)
+            return acknowledgement
+
+    def close(self):
+        self.bus.unsubscribe(self.session_id)
+
+
+class SettingsBus:
+    """
+    Process-wide publisher of optimization settings to active sessions
+    """
+
+    def __init__(self, acknowledgement_history: int = 1000):
+        self.current: Optional[SettingsUpdate] = None
+        self.subscriptions: Dict[str, SessionSettingsSubscription] = {}
+        self.acknowledgements: deque = deque(maxlen=acknowledgement_history)
+        self._version = 0
+
+    def publish(self, settings: Any, optimization_level: str) -> SettingsUpdate:
+        """Publish new settings to every subscribed session"""
+        self._version += 1
+        update = SettingsUpdate(
+            version=self._version,
+            settings=settings,
+            optimization_level=optimization_level,
+            published_at=datetime.now()
+        )
+        self.current = update
+
+        for subscription in self.subscriptions.values():
+            subscription._offer(update)
+
+        logger.info(f"Published settings v{update.version} ({optimization_level}) "
+                    f"to {len(self.subscriptions)} sessions")
+        return update
+
+    def subscribe(self, session_id: str, apply_fnc: SettingsApplyFnc) -> SessionSettingsSubscription:
+        """Register a session; it adopts the current settings at its first turn boundary"""
+        subscription = SessionSettingsSubscription(self, session_id, apply_fnc)
+        if self.current is not None:
+            subscription._offer(self.current)
+        self.subscriptions[session_id] = subscription
+        return subscription
+
+    def unsubscribe(self, session_id: str):
+        self.subscriptions.pop(session_id, None)
+
+    def _record_acknowledgement(self, acknowledgement: SettingsAcknowledgement):
+        self.acknowledgements.append(acknowledgement)
+        if acknowledgement.success:
+            logger.info(f"Session {acknowledgement.session_id} adopted settings v{acknowledgement.version} "
+                        f"after {acknowledgement.adoption_delay_ms:.0f}ms")
+
+    def get_adoption_status(self, version: Optional[int] = None) -> Dict[str, Any]:
+        """Report which sessions run the given (default: current) settings version"""
+        if version is None:
+            version = self.current.version if self.current else 0
+
+        adopted: List[Dict[str, Any]] = [
+            ack.to_dict() for ack in self.acknowledgements
+            if ack.version == version and ack.success
+        ]
+        pending = [
+            session_id for session_id, subscription in self.subscriptions.items()
+            if subscription.applied_version < version
+        ]
+
+        return {
+            "version": version,
+            "subscribed_sessions": len(self.subscriptions),
+            "adopted": adopted,
+            "pending_sessions": pending
+        }
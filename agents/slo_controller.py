@@ -0,0 +1,301 @@
+"""
+SLO-Driven Feedback Control for VoiceFlow Pro
+
+This module replaces threshold jumps between optimization levels with:
+- Windowed p95 latency tracking per pipeline stage
+- Hysteresis bands around each latency target
+- AIMD steps (multiplicative decrease, additive increase) on individual knobs
+- An auditable decision log of every adjustment
+"""
+
+import logging
+import math
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+from dataclasses import dataclass, asdict
+
+from latency_sketch import StageLatencySketches
+
+logger = logging.getLogger(__name__)
+
+# Knob ladders, ordered from lowest latency to highest quality
+CHUNK_SIZE_LADDER = [512, 1024, 2048, 4096]
+MODEL_TIER_LADDER = ["ultra_low_latency", "low_latency", "balanced", "high_quality"]
+NS_COMPLEXITY_LADDER = ["minimal", "low", "medium", "high"]
+
+# Knobs that relieve each stage, tried in order
+STAGE_KNOBS = {
+    "stt": ["chunk_size", "ns_complexity", "model_tier"],
+    "llm": ["model_tier"],
+    "tts": ["model_tier"],
+    "total": ["chunk_size", "model_tier", "ns_complexity"]
+}
+
+
+@dataclass
+class ControlKnobs:
+    """Current position (ladder index) of each tunable knob"""
+    chunk_size: int = 1
+    model_tier: int = 1
+    ns_complexity: int = 1
+
+    @property
+    def chunk_size_value(self) -> int:
+        return CHUNK_SIZE_LADDER[self.chunk_size]
+
+    @property
+    def model_tier_value(self) -> str:
+        return MODEL_TIER_LADDER[self.model_tier]
+
+    @property
+    def ns_complexity_value(self) -> str:
+        return NS_COMPLEXITY_LADDER[self.ns_complexity]
+
+
+@dataclass
+class ControlDecision:
+    """Audit record for one knob adjustment"""
+    decided_at: float
+    knob: str
+    direction: str  # "decrease" (towards latency) or "increase" (towards quality)
+    old_value: Any
+    new_value: Any
+    stage: str
+    observed_p95: float
+    target: float
+    sample_count: int
+    reason: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class SLOController:
+    """
+    Feedback controller steering pipeline knobs toward per-stage latency targets.
+
+    A stage is *violating* when its windowed p95 exceeds ``target * violation_ratio``
+    and *healthy* when it stays under ``target * recovery_ratio``; anything in
+    between is the hysteresis band where nothing changes. Violations halve the
+    relevant knob's ladder index (multiplicative decrease); quality is restored
+    one step at a time after ``recovery_evaluations`` consecutive healthy
+    evaluations (additive increase).
+    """
+
+    def __init__(self, targets: Dict[str, float],
+                 window_seconds: float = 60.0,
+                 window_slices: int = 6,
+                 min_samples: int = 20,
+                 violation_ratio: float = 1.0,
+                 recovery_ratio: float = 0.7,
+                 recovery_evaluations: int = 3,
+                 decrease_cooldown_seconds: float = 5.0,
+                 increase_cooldown_seconds: float = 30.0,
+                 cpu_limit: float = 80.0,
+                 quality_minimum: float = 0.7,
+                 decision_history: int = 500):
+        self.targets = dict(targets)
+        self.window_seconds = window_seconds
+        self.window_slices = window_slices
+        self.min_samples = min_samples
+        self.violation_ratio = violation_ratio
+        self.recovery_ratio = recovery_ratio
+        self.recovery_evaluations = recovery_evaluations
+        self.decrease_cooldown_seconds = decrease_cooldown_seconds
+        self.increase_cooldown_seconds = increase_cooldown_seconds
+        self.cpu_limit = cpu_limit
+        self.quality_minimum = quality_minimum
+
+        self.knobs = ControlKnobs()
+        self.decision_log: deque = deque(maxlen=decision_history)
+
+        # Ring of time slices; merged on demand into the sliding window
+        self._slice_seconds = window_seconds / window_slices
+        self._slices: deque = deque()
+        self._cpu_samples: deque = deque()
+        self._quality_samples: deque = deque()
+
+        self._healthy_streak = 0
+        self._last_decrease = 0.0
+        self._last_increase = 0.0
+
+    def set_targets(self, targets: Dict[str, float]):
+        """Switch to a new SLO target table"""
+        self.targets = dict(targets)
+        self._healthy_streak = 0
+
+    def sync_knobs(self, chunk_size: int, model_tier: str, ns_complexity: str):
+        """Align knob positions with settings chosen outside the controller"""
+        if chunk_size in CHUNK_SIZE_LADDER:
+            self.knobs.chunk_size = CHUNK_SIZE_LADDER.index(chunk_size)
+        if model_tier in MODEL_TIER_LADDER:
+            self.knobs.model_tier = MODEL_TIER_LADDER.index(model_tier)
+        if ns_complexity in NS_COMPLEXITY_LADDER:
+            self.knobs.ns_complexity = NS_COMPLEXITY_LADDER.index(ns_complexity)
+
+    def _current_slice(self, now: float) -> StageLatencySketches:
+        slice_key = math.floor(now / self._slice_seconds)
+        if not self._slices or self._slices[-1][0] != slice_key:
+            self._slices.append((slice_key, StageLatencySketches()))
+        self._expire(now)
+        return self._slices[-1][1]
+
+    def _expire(self, now: float):
+        oldest_key = math.floor((now - self.window_seconds) / self._slice_seconds)
+        while self._slices and self._slices[0][0] <= oldest_key:
+            self._slices.popleft()
+        for samples in (self._cpu_samples, self._quality_samples):
+            while samples and samples[0][0] < now - self.window_seconds:
+                samples.popleft()
+
+    def observe(self, metrics: Any, now: Optional[float] = None):
+        """Feed one PerformanceMetrics measurement into the sliding window"""
+        now = now if now is not None else time.time()
+        self.observe_turn({
+            "stt": metrics.stt_latency, "llm": metrics.llm_latency,
+            "tts": metrics.tts_latency, "total": metrics.total_latency
+        }, now)
+        self.observe_system(metrics.cpu_usage, metrics.audio_quality_score, now)
+
+    def observe_turn(self, latencies: Dict[str, float], now: Optional[float] = None):
+        """Feed the stage latencies measured for one turn; unmeasured stages are left out"""
+        window_slice = self._current_slice(now if now is not None else time.time())
+        for stage, latency in latencies.items():
+            window_slice.record(stage, latency)
+
+    def observe_system(self, cpu_usage: float, quality_score: Optional[float] = None,
+                       now: Optional[float] = None):
+        """Feed a CPU (and optionally audio quality) reading into the sliding window"""
+        now = now if now is not None else time.time()
+        self._cpu_samples.append((now, cpu_usage))
+        if quality_score is not None:
+            self._quality_samples.append((now, quality_score))
+
+    def window(self, now: Optional[float] = None) -> StageLatencySketches:
+        """Merged per-stage sketches for the sliding window"""
+        self._expire(now if now is not None else time.time())
+        merged = StageLatencySketches()
+        for _, sketches in self._slices:
+            merged.merge(sketches)
+        return merged
+
+    def _step(self, knob: str, direction: str, stage: str, p95: float, target: float,
+              sample_count: int, reason: str, now: float) -> Optional[ControlDecision]:
+        old_index = getattr(self.knobs, knob)
+        if direction == "decrease":
+            # Multiplicative decrease on the ladder index
+            new_index = old_index // 2 if old_index > 1 else 0
+        else:
+            new_index = min(old_index + 1, len(self._ladder(knob)) - 1)
+
+        if new_index == old_index:
+            return None
+
+        setattr(self.knobs, knob, new_index)
+        # Judge the next step only on samples measured under the new configuration
+        self._slices.clear()
+        decision = ControlDecision(
+            decided_at=now,
+            knob=knob,
+            direction=direction,
+            old_value=self._ladder(knob)[old_index],
+            new_value=self._ladder(knob)[new_index],
+            stage=stage,
+            observed_p95=p95,
+            target=target,
+            sample_count=sample_count,
+            reason=reason
+        )
+        self.decision_log.append(decision)
+        logger.info(f"SLO controller: {knob} {decision.old_value} -> {decision.new_value} ({reason})")
+        return decision
+
+    @staticmethod
+    def _ladder(knob: str) -> List[Any]:
+        return {
+            "chunk_size": CHUNK_SIZE_LADDER,
+            "model_tier": MODEL_TIER_LADDER,
+            "ns_complexity": NS_COMPLEXITY_LADDER
+        }[knob]
+
+    def evaluate(self, now: Optional[float] = None) -> List[ControlDecision]:
+        """Compare the window against targets and adjust at most one knob"""
+        now = now if now is not None else time.time()
+        window = self.window(now)
+        sample_count = window.get("total").count
+        if sample_count < self.min_samples:
+            return []
+
+        # Worst violating stage, measured relative to its target
+        worst_stage, worst_ratio, worst_p95 = None, 0.0, 0.0
+        all_healthy = True
+        for stage, target in self.targets.items():
+            stage_key = stage.replace("_latency", "")
+            p95 = window.get(stage_key).percentile(95)
+            ratio = p95 / target if target else 0.0
+            if ratio > self.violation_ratio and ratio > worst_ratio:
+                worst_stage, worst_ratio, worst_p95 = stage_key, ratio, p95
+            if ratio >= self.recovery_ratio:
+                all_healthy = False
+
+        avg_cpu = sum(v for _, v in self._cpu_samples) / len(self._cpu_samples) if self._cpu_samples else 0.0
+        avg_quality = (sum(v for _, v in self._quality_samples) / len(self._quality_samples)
+                       if self._quality_samples else 1.0)
+
+        decisions = []
+        if worst_stage is not None:
+            self._healthy_streak = 0
+            if now - self._last_decrease >= self.decrease_cooldown_seconds:
+                target = self.targets.get(f"{worst_stage}_latency", self.targets.get(worst_stage, 0.0))
+                for knob in STAGE_KNOBS.get(worst_stage, STAGE_KNOBS["total"]):
+                    decision = self._step(
+                        knob, "decrease", worst_stage, worst_p95, target, sample_count,
+                        f"{worst_stage} p95 {worst_p95:.0f}ms over target {target:.0f}ms", now
+                    )
+                    if decision:
+                        decisions.append(decision)
+                        self._last_decrease = now
+                        break
+            return decisions
+
+        if avg_cpu > self.cpu_limit and now - self._last_decrease >= self.decrease_cooldown_seconds:
+            self._healthy_streak = 0
+            decision = self._step(
+                "ns_complexity", "decrease", "cpu", avg_cpu, self.cpu_limit, sample_count,
+                f"windowed CPU {avg_cpu:.0f}% over {self.cpu_limit:.0f}%", now
+            )
+            if decision:
+                self._last_decrease = now
+                decisions.append(decision)
+            return decisions
+
+        if not all_healthy:
+            # Inside the hysteresis band: hold position
+            self._healthy_streak = 0
+            return decisions
+
+        self._healthy_streak += 1
+        if (self._healthy_streak >= self.recovery_evaluations and
+                now - self._last_increase >= self.increase_cooldown_seconds and
+                now - self._last_decrease >= self.increase_cooldown_seconds):
+            # Restore audio processing first when quality suffers, then models, then buffering
+            order = ["ns_complexity", "model_tier", "chunk_size"]
+            if avg_quality >= self.quality_minimum:
+                order = ["model_tier", "ns_complexity", "chunk_size"]
+            total_p95 = window.get("total").percentile(95)
+            for knob in order:
+                decision = self._step(
+                    knob, "increase", "total", total_p95, self.targets.get("total_latency", 0.0),
+                    sample_count, f"all stages under {self.recovery_ratio:.0%} of target", now
+                )
+                if decision:
+                    decisions.append(decision)
+                    self._last_increase = now
+                    self._healthy_streak = 0
+                    break
+
+        return decisions
+
+    def get_decision_log(self, limit: int = 100) -> List[Dict[str, Any]]:
+        return [decision.to_dict() for decision in list(self.decision_log)[-limit:]]
@@ -0,0 +1,182 @@
+"""
+Speculative Turn Preparation for VoiceFlow Pro
+
+This module starts turn work on interim STT transcripts before the final one:
+- An interim is speculated on once it has been repeated unchanged
+- Work is keyed by normalized text plus the conversation state it read
+- Committed when the final transcript matches, cancelled when it diverges
+- Milliseconds saved per committed turn and milliseconds of work wasted
+"""
+
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Callable, Awaitable, Hashable, Tuple
+
+from latency_sketch import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Sentence punctuation added by final-transcript formatting; punctuation
+# inside a token (e-mail addresses, "follow-up", "3:30") is kept
+_EDGE_PUNCTUATION = re.compile(r"[.,!?;:]+(?=\s|$)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_transcript(text: str) -> str:
+    """Case, spacing and trailing-punctuation insensitive form of a transcript"""
+    return _WHITESPACE.sub(" ", _EDGE_PUNCTUATION.sub("", text.lower())).strip()
+
+
+@dataclass
+class _Speculation:
+    key: Tuple[str, Hashable]
+    transcript: str
+    task: asyncio.Task
+    started_at: float
+    finished_at: Optional[float] = None
+
+
+class SpeculativeExecutor:
+    """
+    Runs ``prepare_fnc`` on a stable interim transcript ahead of the final.
+
+    ``prepare_fnc`` must be free of side effects: its result is only used if
+    the final transcript normalizes to the same text and ``basis_fnc`` (the
+    conversation state the work depends on) has not changed. Otherwise the
+    work is cancelled and the final transcript is processed from scratch.
+    At most one speculation is in flight per executor.
+    """
+
+    def __init__(self, prepare_fnc: Callable[[str], Awaitable[Any]],
+                 basis_fnc: Optional[Callable[[], Hashable]] = None,
+                 stable_interims: int = 2, min_words: int = 2):
+        self.prepare_fnc = prepare_fnc
+        self.basis_fnc = basis_fnc or (lambda: None)
+        self.stable_interims = stable_interims
+        self.min_words = min_words
+
+        self._interim_text = ""
+        self._interim_repeats = 0
+        self._current: Optional[_Speculation] = None
+
+        self.saved_ms = LatencyHistogram()
+        self.speculation_stats = {
+            "interims": 0,
+            "started": 0,
+            "committed": 0,
+            "diverged": 0,
+            "stale": 0,
+            "failed": 0,
+            "finals_without_speculation": 0,
+            "wasted_ms": 0.0
+        }
+
+    def _key(self, normalized: str) -> Tuple[str, Hashable]:
+        return normalized, self.basis_fnc()
+
+    def _work_ms(self, speculation: _Speculation, until: float) -> float:
+        end = speculation.finished_at if speculation.finished_at is not None else until
+        return (end - speculation.started_at) * 1000
+
+    def _discard(self, reason: str):
+        speculation = self._current
+        self._current = None
+        if speculation is None:
+            return
+        if not speculation.task.done():
+            speculation.task.cancel()
+        self.speculation_stats[reason] += 1
+        self.speculation_stats["wasted_ms"] += self._work_ms(speculation, time.perf_counter())
+
+    def _start(self, key: Tuple[str, Hashable], transcript: str):
+        speculation = _Speculation(key, transcript, None, time.perf_counter())
+
+        async def run():
+            try:
+                return await self.prepare_fnc(transcript)
+            finally:
+                speculation.finished_at = time.perf_counter()
+
+        speculation.task = asyncio.ensure_future(run())
+        self._current = speculation
+        self.speculation_stats["started"] += 1
+
+    def on_interim(self, transcript: str):
+        """Feed an interim transcript; starts or restarts speculation once it is stable"""
+        self.speculation_stats["interims"] += 1
+        normalized = normalize_transcript(transcript)
+
+        if normalized == self._interim_text:
+            self._interim_repeats += 1
+        else:
+            self._interim_text = normalized
+            self._interim_repeats = 1
+
+        if self._interim_repeats < self.stable_interims or len(normalized.split()) < self.min_words:
+            return
+
+        key = self._key(normalized)
+        if self._current is not None:
+            if self._current.key == key:
+                return
+            # The caller kept talking or the interim was revised
+            self._discard("diverged")
+        self._start(key, transcript)
+
+    async def on_final(self, transcript: str) -> Tuple[Optional[Any], Dict[str, Any]]:
+        """
+        Resolve the in-flight speculation against the final transcript.
+
+        Returns the speculative result (None if there is nothing to commit)
+        and a per-turn report with ``saved_ms`` and ``wasted_ms``.
+        """
+        final_at = time.perf_counter()
+        speculation = self._current
+        self._interim_text = ""
+        self._interim_repeats = 0
+
+        if speculation is None:
+            self.speculation_stats["finals_without_speculation"] += 1
+            return None, {"speculated": False, "saved_ms": 0.0, "wasted_ms": 0.0}
+
+        normalized = normalize_transcript(transcript)
+        if speculation.key != self._key(normalized):
+            reason = "diverged" if speculation.key[0] != normalized else "stale"
+            wasted_ms = self._work_ms(speculation, final_at)
+            self._discard(reason)
+            return None, {"speculated": True, "committed": False, "reason": reason,
+                          "saved_ms": 0.0, "wasted_ms": wasted_ms}
+
+        self._current = None
+        try:
+            result = await speculation.task
+        except Exception as e:
+            self.speculation_stats["failed"] += 1
+            logger.warning(f"Speculative preparation failed, processing final transcript: {e}")
+            return None, {"speculated": True, "committed": False, "reason": "failed",
+                          "saved_ms": 0.0, "wasted_ms": self._work_ms(speculation, final_at)}
+
+        # Only the work already done when the final arrived came off the turn
+        saved_ms = min(self._work_ms(speculation, final_at), (final_at - speculation.started_at) * 1000)
+        self.saved_ms.record(saved_ms)
+        self.speculation_stats["committed"] += 1
+        return result, {"speculated": True, "committed": True, "saved_ms": saved_ms, "wasted_ms": 0.0}
+
+    def cancel(self):
+        """Drop in-flight work, e.g. when the session ends"""
+        self._discard("diverged")
+        self._interim_text = ""
+        self._interim_repeats = 0
+
+    def get_statistics(self) -> Dict[str, Any]:
+        resolved = self.speculation_stats["committed"] + self.speculation_stats["diverged"] + \
+            self.speculation_stats["stale"] + self.speculation_stats["failed"]
+        return {
+            "commit_rate": self.speculation_stats["committed"] / resolved if resolved else 0.0,
+            "saved_ms": self.saved_ms.summary(),
+            "saved_ms_total": self.saved_ms.total,
+            **self.speculation_stats
+        }
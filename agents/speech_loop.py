@@ -0,0 +1,205 @@
+"""
+Caller Speech Loop for VoiceFlow Pro
+
+This module connects a VoiceFlowAgent to the audio of its room:
+- The caller's audio track streamed into the STT plugin
+- Interim transcripts handed to the agent for speculative preparation
+- Final transcripts run as turns, one at a time
+- Replies synthesized by the TTS plugin and spoken on a published agent track
+- Pre-synthesized replies found by the turn's audio stage played from the
+  cache, with no TTS request
+- Measured STT and TTS latency fed to the agent's model router
+- Measured turn latencies fed to the worker load monitor and the
+  performance optimizer's SLO controller
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional, Set
+
+from admission_control import WorkerLoadMonitor
+from audio_cache import CachedAudio
+from performance_optimizer import PerformanceOptimizer
+
+from livekit import rtc
+from livekit.agents.stt import SpeechEventType
+
+logger = logging.getLogger(__name__)
+
+
+class SpeechLoop:
+    """
+    Listens to one caller and speaks the agent's replies.
+
+    Each audio track the caller publishes gets its own STT stream. Finals
+    are processed in arrival order; a final that arrives while the previous
+    reply is still being spoken waits for it.
+    """
+
+    def __init__(self, agent: Any, stt: Any, tts: Any,
+                 sample_rate: int = 16000, num_channels: int = 1,
+                 track_name: str = "voiceflow-agent",
+                 load_monitor: Optional[WorkerLoadMonitor] = None,
+                 performance_optimizer: Optional[PerformanceOptimizer] = None):
+        self.agent = agent
+        self.stt = stt
+        self.tts = tts
+        self.load_monitor = load_monitor
+        self.performance_optimizer = performance_optimizer
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.track_name = track_name
+
+        self.audio_source: Optional[rtc.AudioSource] = None
+        self._turn_lock = asyncio.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+        self._listening: Set[str] = set()
+        # When the caller's words last changed: the end of what the final transcript covers
+        self._last_interim = ""
+        self._words_at: Optional[float] = None
+
+        self.loop_stats = {
+            "interim_transcripts": 0,
+            "final_transcripts": 0,
+            "turns": 0,
+            "turn_failures": 0,
+            "replies_synthesized": 0,
+            "replies_from_cache": 0
+        }
+
+    @property
+    def room(self) -> rtc.Room:
+        return self.agent.job_context.room
+
+    async def start(self):
+        """Publish the agent's audio track and listen to the caller's audio tracks"""
+        self.audio_source = rtc.AudioSource(self.tts.sample_rate, self.tts.num_channels)
+        track = rtc.LocalAudioTrack.create_audio_track(self.track_name, self.audio_source)
+        await self.room.local_participant.publish_track(
+            track, rtc.TrackPublishOptions(source=rtc.TrackSource.SOURCE_MICROPHONE)
+        )
+
+        self.room.on("track_subscribed", self._on_track_subscribed)
+        # Tracks subscribed before the loop started raise no event
+        for publication in self.agent.participant.track_publications.values():
+            if publication.track is not None:
+                self._on_track_subscribed(publication.track, publication, self.agent.participant)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _on_track_subscribed(self, track: rtc.Track, publication: rtc.RemoteTrackPublication,
+                             participant: rtc.RemoteParticipant):
+        if (participant.identity != self.agent.participant.identity or track.kind != rtc.TrackKind.KIND_AUDIO
+                or track.sid in self._listening):
+            return
+        self._listening.add(track.sid)
+        self._spawn(self._listen(track))
+
+    async def _listen(self, track: rtc.Track):
+        audio_stream = rtc.AudioStream(track, sample_rate=self.sample_rate, num_channels=self.num_channels)
+        stt_stream = self.stt.stream()
+
+        async def forward_audio():
+            async for event in audio_stream:
+                stt_stream.push_frame(event.frame)
+            stt_stream.end_input()
+
+        forward = self._spawn(forward_audio())
+        try:
+            async for event in stt_stream:
+                await self._on_speech_event(event)
+        finally:
+            forward.cancel()
+            await stt_stream.aclose()
+            self._listening.discard(track.sid)
+
+    async def _on_speech_event(self, event: Any):
+        if event.type == SpeechEventType.INTERIM_TRANSCRIPT:
+            self.loop_stats["interim_transcripts"] += 1
+            if event.alternatives and event.alternatives[0].text:
+                text = event.alternatives[0].text
+                if text != self._last_interim:
+                    self._last_interim, self._words_at = text, time.perf_counter()
+                await self.agent.on_interim_transcript(text)
+        elif event.type == SpeechEventType.FINAL_TRANSCRIPT:
+            self.loop_stats["final_transcripts"] += 1
+            words_at, self._last_interim, self._words_at = self._words_at, "", None
+            if event.alternatives and event.alternatives[0].text.strip():
+                stt_ms = None
+                if words_at is not None:
+                    # Endpointing and finalization: how long the caller waits for STT
+                    stt_ms = (time.perf_counter() - words_at) * 1000
+                    self._record_latency("stt", self.agent.active_models.get("stt"), stt_ms)
+                self._spawn(self._run_turn(event.alternatives[0].text, words_at, stt_ms))
+
+    async def _run_turn(self, transcript: str, words_at: Optional[float] = None,
+                        stt_ms: Optional[float] = None):
+        async with self._turn_lock:
+            try:
+                response = await self.agent.process_conversation(transcript)
+                reply_at = time.perf_counter()
+                tts_ms = await self._speak(response, self.agent.last_turn_results.get("audio"))
+                if words_at is not None:
+                    # What the caller hears as the agent's response time: last words to first audio
+                    total_ms = (reply_at - words_at) * 1000 + (tts_ms or 0.0)
+                    self._record_turn(stt_ms, tts_ms, total_ms)
+                self.loop_stats["turns"] += 1
+            except Exception as e:
+                self.loop_stats["turn_failures"] += 1
+                logger.error(f"Turn failed for room {self.room.name}: {e}")
+
+    async def _speak(self, text: str, cached: Optional[CachedAudio] = None) -> Optional[float]:
+        """Play a reply; returns the TTS time to first audio, or None when it played from the cache"""
+        if (cached is not None and cached.sample_rate == self.audio_source.sample_rate
+                and cached.num_channels == self.audio_source.num_channels):
+            self.loop_stats["replies_from_cache"] += 1
+            for frame in cached.frames():
+                await self.audio_source.capture_frame(frame)
+            return None
+
+        self.loop_stats["replies_synthesized"] += 1
+        model = self.agent.active_models.get("tts")
+        start = time.perf_counter()
+        first_audio_ms = None
+        try:
+            async with self.tts.synthesize(text) as stream:
+                async for event in stream:
+                    if first_audio_ms is None:
+                        first_audio_ms = (time.perf_counter() - start) * 1000
+                    await self.audio_source.capture_frame(event.frame)
+        except Exception:
+            self._record_latency("tts", model, None, success=False)
+            raise
+        if first_audio_ms is not None:
+            self._record_latency("tts", model, first_audio_ms)
+        return first_audio_ms
+
+    def _record_turn(self, stt_ms: Optional[float], tts_ms: Optional[float], total_ms: float):
+        if self.load_monitor is not None:
+            self.load_monitor.record_turn_latency(total_ms)
+        if self.performance_optimizer is not None:
+            # Replies come from the scenario handlers, so there is no LLM stage to report
+            self.performance_optimizer.record_turn(stt_latency=stt_ms, tts_latency=tts_ms, total_latency=total_ms)
+
+    def _record_latency(self, stage: str, model: Optional[str], latency_ms: Optional[float],
+                        success: bool = True):
+        if self.agent.model_router is not None and model:
+            self.agent.model_router.record(stage, model, latency_ms, success)
+
+    async def close(self):
+        """Stop listening; a reply being spoken is cut off"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.audio_source is not None:
+            await self.audio_source.aclose()
+            self.audio_source = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {"listening_tracks": len(self._listening), **self.loop_stats}
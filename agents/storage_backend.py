@@ -0,0 +1,749 @@
+"""
+Conversation Storage Backends for VoiceFlow Pro
+
+This module decouples DatabaseManager from where conversation data is written:
+- One async interface for state updates, message logs and state loads
+- HTTP backend: the TypeScript backend in front of Postgres
+- Embedded SQLite backend in WAL mode, colocated with the agent, storing
+  conversation state in CustomerContext's binary encoding
+- Group commit: writes arriving while a transaction runs share the next one
+- Asynchronous upstream sync of committed state and messages, with a lease
+  so only one process on the node syncs a shared database file
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from latency_sketch import LatencyHistogram
+from http_client import PooledHTTPClient, shared_http_client
+from context_sync import UPDATE_SNAPSHOT, apply_delta, conflict_snapshot
+from customer_context import CustomerContext
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND_URL = "http://backend:8000"
+
+# Client errors that can succeed on a later attempt: timeout, version conflict, too early, rate limit
+_RETRYABLE_CLIENT_ERRORS = {408, 409, 425, 429}
+
+
+class WriteRejected(Exception):
+    """The backend refused a write outright; sending it again cannot succeed"""
+
+    def __init__(self, status: int, endpoint: str):
+        super().__init__(f"{endpoint} rejected with status {status}")
+        self.status = status
+        self.endpoint = endpoint
+
+
+def is_rejection(status: int) -> bool:
+    return 400 <= status < 500 and status not in _RETRYABLE_CLIENT_ERRORS
+
+
+class StorageBackend:
+    """
+    Where DatabaseManager reads and writes conversation data.
+
+    Writes report failure by returning False rather than raising, so callers
+    (the write-behind queue in particular) can retry. A write the backend
+    rejects outright (a validation error, an unknown conversation) raises
+    ``WriteRejected`` instead, since retrying it would never succeed. A delta whose base
+    version does not match the stored state is replaced right away by a full
+    snapshot of the session's context, so a conflict on the last save of a
+    session loses nothing.
+    """
+
+    name = "base"
+
+    async def save_conversation_update(self, update: Dict[str, Any]) -> bool:
+        """Write a context_sync snapshot or delta"""
+        raise NotImplementedError
+
+    async def save_conversation_snapshot(self, state: Dict[str, Any]) -> bool:
+        """Write an already serialized conversation state"""
+        raise NotImplementedError
+
+    async def load_conversation_state(self, room_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored serialized state (with its ``version``) or None"""
+        raise NotImplementedError
+
+    async def load_conversation_messages(self, room_id: str, offset: int = 0,
+                                         limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Logged messages of a room in order, from the ``offset``-th on; None if unavailable"""
+        raise NotImplementedError
+
+    async def log_conversation_message(self, message: Dict[str, Any]) -> bool:
+        return await self.log_conversation_messages(message["room_id"], [message])
+
+    async def log_conversation_messages(self, room_id: str, messages: List[Dict[str, Any]]) -> bool:
+        raise NotImplementedError
+
+    async def warm(self):
+        """Open connections before the first turn needs them"""
+
+    async def close(self):
+        """Write out anything buffered and release connections"""
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+class HTTPStorageBackend(StorageBackend):
+    """The TypeScript backend, which writes to Postgres per database/schema.sql"""
+
+    name = "http"
+
+    def __init__(self, backend_url: str = DEFAULT_BACKEND_URL,
+                 http_client: Optional[PooledHTTPClient] = None):
+        self.backend_url = backend_url
+        # Keep-alive pool shared by every session in this process
+        self.http = http_client or shared_http_client(backend_url)
+
+    @staticmethod
+    def _written(status: int, endpoint: str) -> bool:
+        if is_rejection(status):
+            raise WriteRejected(status, endpoint)
+        return status == 200
+
+    async def save_conversation_update(self, update: Dict[str, Any]) -> bool:
+        if update["type"] == UPDATE_SNAPSHOT:
+            return await self.save_conversation_snapshot({**update["state"], "version": update["version"]})
+
+        try:
+            status, _ = await self.http.request(
+                "POST", "/api/conversation/state/delta",
+                json=update,
+                endpoint="save_state_delta"
+            )
+        except Exception as e:
+            logger.error(f"Failed to save conversation state delta: {e}")
+            return False
+        if status == 409:
+            # Backend holds a different version: send the whole state instead of the delta
+            snapshot = conflict_snapshot(update["room_id"])
+            return snapshot is None or await self.save_conversation_update(snapshot)
+        return self._written(status, "save_state_delta")
+
+    async def save_conversation_snapshot(self, state: Dict[str, Any]) -> bool:
+        try:
+            status, _ = await self.http.request(
+                "POST", "/api/conversation/state",
+                json=state,
+                endpoint="save_state"
+            )
+        except Exception as e:
+            logger.error(f"Failed to save conversation state: {e}")
+            return False
+        return self._written(status, "save_state")
+
+    async def load_conversation_state(self, room_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            status, data = await self.http.request(
+                "GET", f"/api/conversation/state/{room_id}",
+                endpoint="load_state"
+            )
+            if status == 200 and data:
+                return data
+        except Exception as e:
+            logger.error(f"Failed to load conversation state: {e}")
+        return None
+
+    async def load_conversation_messages(self, room_id: str, offset: int = 0,
+                                         limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        path = f"/api/conversation/messages/{room_id}?offset={offset}"
+        if limit is not None:
+            path += f"&limit={limit}"
+        try:
+            status, data = await self.http.request("GET", path, endpoint="load_messages")
+            if status == 200 and data is not None:
+                return data["messages"]
+        except Exception as e:
+            logger.error(f"Failed to load conversation messages: {e}")
+        return None
+
+    async def log_conversation_message(self, message: Dict[str, Any]) -> bool:
+        try:
+            # Not idempotent: a blind retry could store the message twice
+            status, _ = await self.http.request(
+                "POST", "/api/conversation/message",
+                json=message,
+                idempotent=False,
+                endpoint="log_message"
+            )
+        except Exception as e:
+            logger.error(f"Failed to log conversation message: {e}")
+            return False
+        return self._written(status, "log_message")
+
+    async def log_conversation_messages(self, room_id: str, messages: List[Dict[str, Any]]) -> bool:
+        try:
+            status, _ = await self.http.request(
+                "POST", "/api/conversation/messages/batch",
+                json={
+                    "room_id": room_id,
+                    "messages": [
+                        {key: message[key] for key in ("speaker", "message", "metadata", "timestamp")}
+                        for message in messages
+                    ]
+                },
+                idempotent=False,
+                endpoint="log_messages_batch"
+            )
+        except Exception as e:
+            logger.error(f"Failed to log conversation messages: {e}")
+            return False
+        return self._written(status, "log_messages_batch")
+
+    async def warm(self):
+        await self.http.warm()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return self.http.get_statistics()
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    room_id TEXT PRIMARY KEY,
+    scenario TEXT,
+    state BLOB NOT NULL,
+    state_version INTEGER NOT NULL DEFAULT 0,
+    synced_version INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conversation_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    room_id TEXT NOT NULL,
+    seq INTEGER,
+    speaker TEXT NOT NULL,
+    message TEXT NOT NULL,
+    metadata TEXT,
+    timestamp TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    synced INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS message_sequences (
+    room_id TEXT PRIMARY KEY,
+    next_seq INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_conversation_messages_unsynced ON conversation_messages(id) WHERE synced = 0;
+CREATE INDEX IF NOT EXISTS idx_conversations_unsynced ON conversations(updated_at)
+    WHERE synced_version < state_version;
+CREATE TABLE IF NOT EXISTS sync_lease (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    owner INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def _encode_state(state: Dict[str, Any]) -> bytes:
+    return CustomerContext.from_dict(state).to_bytes()
+
+
+def _decode_state(value: Any) -> Dict[str, Any]:
+    if isinstance(value, str):
+        # Written as JSON text before states were stored binary
+        return json.loads(value)
+    return CustomerContext.from_bytes(value).to_dict()
+
+
+# Outcomes of a state write inside a transaction
+_WRITTEN = "written"
+_CONFLICT = "conflict"
+
+
+class SQLiteStorageBackend(StorageBackend):
+    """
+    Embedded conversation store in a local SQLite database.
+
+    All database work runs on one dedicated thread so the event loop never
+    blocks on disk. Writes are queued and committed by a single committer:
+    whatever queued up while the previous transaction ran goes into the next
+    one, each write in its own savepoint so one bad write does not fail the
+    others. WAL mode lets the database be read (and shared by the other
+    worker processes on the node) while it is being written.
+
+    With an ``upstream`` backend, committed rows are pushed there in the
+    background: each room's latest state as a snapshot, then its messages in
+    order. Delivery upstream is at least once. Synced messages are pruned
+    after ``retain_synced_seconds``; without an upstream nothing is pruned.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, upstream: Optional[StorageBackend] = None,
+                 max_batch: int = 512, sync_interval: float = 1.0, sync_batch_size: int = 500,
+                 lease_seconds: float = 10.0, retain_synced_seconds: float = 3600.0,
+                 busy_timeout_ms: int = 5000, close_sync_timeout: float = 2.0):
+        self.path = path
+        self.upstream = upstream
+        self.max_batch = max_batch
+        self.sync_interval = sync_interval
+        self.sync_batch_size = sync_batch_size
+        self.lease_seconds = lease_seconds
+        self.retain_synced_seconds = retain_synced_seconds
+        self.busy_timeout_ms = busy_timeout_ms
+        self.close_sync_timeout = close_sync_timeout
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._queued: List[Tuple[Callable[[sqlite3.Connection], Any], asyncio.Future, float]] = []
+        self._committer: Optional[asyncio.Task] = None
+        self._syncer: Optional[asyncio.Task] = None
+        self._holds_lease = False
+        self._closing = False
+        self._last_prune = 0.0
+
+        self.commit_latency = LatencyHistogram()
+        self.write_latency = LatencyHistogram()
+        self.commit_batch = LatencyHistogram(resolution_ms=1.0)
+        self.sync_latency = LatencyHistogram()
+        # Encoded size of each state row written
+        self.state_bytes = LatencyHistogram(resolution_ms=1.0)
+        self.storage_stats = {
+            "states_written": 0,
+            "state_bytes_written": 0,
+            "messages_written": 0,
+            "conflicts": 0,
+            "commits": 0,
+            "write_failures": 0,
+            "sync_passes": 0,
+            "states_synced": 0,
+            "messages_synced": 0,
+            "sync_failures": 0,
+            "sync_rejected": 0,
+            "messages_pruned": 0
+        }
+        self.sync_backlog = {"states": 0, "messages": 0}
+
+    # Database thread
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit mode; transactions are opened explicitly
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+            conn.execute("PRAGMA journal_mode = WAL")
+            # With WAL, NORMAL only risks the last commits on power loss, never corruption
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(_SQLITE_SCHEMA)
+            self._migrate(conn)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """Bring a database created before messages carried their per-room sequence up to date"""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(conversation_messages)")]
+        if "seq" not in columns:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("ALTER TABLE conversation_messages ADD COLUMN seq INTEGER")
+            conn.execute("COMMIT")
+        if conn.execute("SELECT 1 FROM conversation_messages WHERE seq IS NULL LIMIT 1").fetchone():
+            # Best effort: rows pruned before the upgrade are no longer counted
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE conversation_messages SET seq = (SELECT COUNT(*) FROM conversation_messages AS earlier "
+                "WHERE earlier.room_id = conversation_messages.room_id AND earlier.id < conversation_messages.id)"
+            )
+            conn.execute("INSERT OR REPLACE INTO message_sequences (room_id, next_seq) "
+                         "SELECT room_id, MAX(seq) + 1 FROM conversation_messages GROUP BY room_id")
+            conn.execute("COMMIT")
+        conn.execute("DROP INDEX IF EXISTS idx_conversation_messages_room_id")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_conversation_messages_room_seq "
+                     "ON conversation_messages(room_id, seq)")
+
+    def _run_transaction(self, operations: List[Callable[[sqlite3.Connection], Any]]) -> List[Tuple[bool, Any]]:
+        conn = self._connect()
+        outcomes: List[Tuple[bool, Any]] = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for operation in operations:
+                conn.execute("SAVEPOINT write")
+                try:
+                    outcomes.append((True, operation(conn)))
+                    conn.execute("RELEASE write")
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO write")
+                    conn.execute("RELEASE write")
+                    outcomes.append((False, e))
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        return outcomes
+
+    def _close_connection(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _run(self, fnc: Callable, *args) -> Any:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-storage")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fnc, *args)
+
+    # Group commit
+
+    async def _write(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run ``operation`` in the next transaction and return its result"""
+        future = asyncio.get_running_loop().create_future()
+        self._queued.append((operation, future, time.perf_counter()))
+        if self._committer is None or self._committer.done():
+            self._committer = asyncio.get_running_loop().create_task(self._commit_loop())
+        self._start_sync()
+        return await future
+
+    async def _commit_loop(self):
+        while self._queued:
+            batch, self._queued = self._queued[:self.max_batch], self._queued[self.max_batch:]
+            start = time.perf_counter()
+            try:
+                outcomes = await self._run(self._run_transaction, [operation for operation, _, _ in batch])
+            except Exception as e:
+                self.storage_stats["write_failures"] += len(batch)
+                logger.error(f"SQLite transaction of {len(batch)} writes failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            self.commit_latency.record((done - start) * 1000)
+            self.commit_batch.record(len(batch))
+            self.storage_stats["commits"] += 1
+            for (_, future, queued_at), (ok, value) in zip(batch, outcomes):
+                self.write_latency.record((done - queued_at) * 1000)
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    self.storage_stats["write_failures"] += 1
+                    future.set_exception(value)
+
+    # Writes
+
+    def _store_state(self, conn: sqlite3.Connection, room_id: str, state: Dict[str, Any], version: int):
+        encoded = _encode_state(state)
+        self.state_bytes.record(len(encoded))
+        self.storage_stats["state_bytes_written"] += len(encoded)
+        conn.execute(
+            "INSERT INTO conversations (room_id, scenario, state, state_version, updated_at) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(room_id) DO UPDATE SET scenario = excluded.scenario, state = excluded.state, "
+            "state_version = excluded.state_version, updated_at = excluded.updated_at",
+            (room_id, state.get("current_scenario"), encoded, version, time.time())
+        )
+
+    def _save_update(self, conn: sqlite3.Connection, update: Dict[str, Any]) -> str:
+        room_id = update["room_id"]
+        if update["type"] == UPDATE_SNAPSHOT:
+            self._store_state(conn, room_id, update["state"], update["version"])
+            return _WRITTEN
+
+        row = conn.execute("SELECT state, state_version FROM conversations WHERE room_id = ?",
+                           (room_id,)).fetchone()
+        if row is None or row[1] != update["base_version"]:
+            return _CONFLICT
+        self._store_state(conn, room_id, apply_delta(_decode_state(row[0]), update), update["version"])
+        return _WRITTEN
+
+    def _save_snapshot(self, conn: sqlite3.Connection, state: Dict[str, Any]) -> str:
+        state = dict(state)
+        version = state.pop("version", None)
+        if version is None:
+            row = conn.execute("SELECT state_version FROM conversations WHERE room_id = ?",
+                               (state["room_id"],)).fetchone()
+            version = (row[0] if row else 0) + 1
+        self._store_state(conn, state["room_id"], state, version)
+        return _WRITTEN
+
+    @staticmethod
+    def _insert_messages(conn: sqlite3.Connection, room_id: str, messages: List[Dict[str, Any]]) -> int:
+        # Absolute position in the room's log; kept in its own table so pruning never resets it
+        row = conn.execute("SELECT next_seq FROM message_sequences WHERE room_id = ?", (room_id,)).fetchone()
+        first_seq = row[0] if row else 0
+        now = time.time()
+        conn.executemany(
+            "INSERT INTO conversation_messages (room_id, seq, speaker, message, metadata, timestamp, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(room_id, first_seq + i, message["speaker"], message["message"],
+              json.dumps(message.get("metadata"), default=str), message["timestamp"], now)
+             for i, message in enumerate(messages)]
+        )
+        conn.execute("INSERT OR REPLACE INTO message_sequences (room_id, next_seq) VALUES (?, ?)",
+                     (room_id, first_seq + len(messages)))
+        return len(messages)
+
+    async def _write_state(self, operation: Callable[[sqlite3.Connection], str], room_id: str) -> bool:
+        try:
+            outcome = await self._write(operation)
+        except Exception as e:
+            logger.error(f"Failed to save conversation state locally: {e}")
+            return False
+        if outcome == _CONFLICT:
+            self.storage_stats["conflicts"] += 1
+            snapshot = conflict_snapshot(room_id)
+            return snapshot is None or await self.save_conversation_update(snapshot)
+        self.storage_stats["states_written"] += 1
+        return True
+
+    async def save_conversation_update(self, update: Dict[str, Any]) -> bool:
+        return await self._write_state(lambda conn: self._save_update(conn, update), update["room_id"])
+
+    async def save_conversation_snapshot(self, state: Dict[str, Any]) -> bool:
+        return await self._write_state(lambda conn: self._save_snapshot(conn, state), state["room_id"])
+
+    async def log_conversation_messages(self, room_id: str, messages: List[Dict[str, Any]]) -> bool:
+        try:
+            written = await self._write(lambda conn: self._insert_messages(conn, room_id, messages))
+        except Exception as e:
+            logger.error(f"Failed to log conversation messages locally: {e}")
+            return False
+        self.storage_stats["messages_written"] += written
+        return True
+
+    # Reads
+
+    def _load_state(self, room_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT state, state_version FROM conversations WHERE room_id = ?",
+                                      (room_id,)).fetchone()
+        if row is None:
+            return None
+        return {**_decode_state(row[0]), "version": row[1]}
+
+    def _load_messages(self, room_id: str, offset: int,
+                       limit: Optional[int]) -> Tuple[List[Dict[str, Any]], bool]:
+        """Messages from sequence ``offset`` on, and whether some of the requested ones were pruned"""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT speaker, message, metadata, timestamp FROM conversation_messages "
+            "WHERE room_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+            (room_id, offset, -1 if limit is None else limit)
+        ).fetchall()
+        oldest = conn.execute("SELECT MIN(seq) FROM conversation_messages WHERE room_id = ?",
+                              (room_id,)).fetchone()[0]
+        messages = [{"room_id": room_id, "speaker": speaker, "message": message,
+                     "metadata": json.loads(metadata) if metadata else None, "timestamp": timestamp}
+                    for speaker, message, metadata, timestamp in rows]
+        return messages, oldest is not None and offset < oldest
+
+    async def load_conversation_messages(self, room_id: str, offset: int = 0,
+                                         limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        pruned = False
+        try:
+            messages, pruned = await self._run(self._load_messages, room_id, offset, limit)
+        except Exception as e:
+            logger.error(f"Failed to load conversation messages locally: {e}")
+            messages = None
+        if self.upstream is not None and (messages is None or pruned or limit is None or len(messages) < limit):
+            # Synced messages are pruned locally after a while; the upstream keeps the full log
+            upstream_messages = await self.upstream.load_conversation_messages(room_id, offset, limit)
+            if upstream_messages is not None and (pruned or len(upstream_messages) > len(messages or [])):
+                return upstream_messages
+        # Local rows past a pruned gap would start at the wrong position
+        return None if pruned else messages
+
+    async def load_conversation_state(self, room_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            state = await self._run(self._load_state, room_id)
+        except Exception as e:
+            logger.error(f"Failed to load conversation state locally: {e}")
+            state = None
+        if state is None and self.upstream is not None:
+            # A room that started on another node, or before the local database existed
+            return await self.upstream.load_conversation_state(room_id)
+        return state
+
+    # Upstream sync
+
+    def _start_sync(self):
+        if self.upstream is None or self._closing:
+            return
+        if self._syncer is None or self._syncer.done():
+            self._syncer = asyncio.get_running_loop().create_task(self._sync_loop())
+
+    def _acquire_lease(self, conn: sqlite3.Connection) -> bool:
+        now = time.time()
+        row = conn.execute("SELECT owner, expires_at FROM sync_lease WHERE id = 1").fetchone()
+        if row is not None and row[0] != os.getpid() and row[1] > now:
+            return False
+        conn.execute("INSERT OR REPLACE INTO sync_lease (id, owner, expires_at) VALUES (1, ?, ?)",
+                     (os.getpid(), now + self.lease_seconds))
+        return True
+
+    @staticmethod
+    def _release_lease(conn: sqlite3.Connection):
+        conn.execute("DELETE FROM sync_lease WHERE owner = ?", (os.getpid(),))
+
+    def _read_backlog(self) -> Tuple[List[Tuple[str, Any, int]], List[Tuple[int, str, str, str, str, str]]]:
+        conn = self._connect()
+        states = conn.execute(
+            "SELECT room_id, state, state_version FROM conversations "
+            "WHERE synced_version < state_version ORDER BY updated_at LIMIT ?",
+            (self.sync_batch_size,)
+        ).fetchall()
+        messages = conn.execute(
+            "SELECT id, room_id, speaker, message, metadata, timestamp FROM conversation_messages "
+            "WHERE synced = 0 ORDER BY id LIMIT ?",
+            (self.sync_batch_size,)
+        ).fetchall()
+        self.sync_backlog = {
+            "states": conn.execute("SELECT COUNT(*) FROM conversations "
+                                   "WHERE synced_version < state_version").fetchone()[0],
+            "messages": conn.execute("SELECT COUNT(*) FROM conversation_messages WHERE synced = 0").fetchone()[0]
+        }
+        return states, messages
+
+    @staticmethod
+    def _mark_state_synced(conn: sqlite3.Connection, room_id: str, version: int):
+        conn.execute("UPDATE conversations SET synced_version = MAX(synced_version, ?) WHERE room_id = ?",
+                     (version, room_id))
+
+    @staticmethod
+    def _mark_messages_synced(conn: sqlite3.Connection, message_ids: List[int]):
+        conn.executemany("UPDATE conversation_messages SET synced = 1 WHERE id = ?",
+                         [(message_id,) for message_id in message_ids])
+
+    def _prune(self, conn: sqlite3.Connection) -> int:
+        cursor = conn.execute("DELETE FROM conversation_messages WHERE synced = 1 AND created_at < ?",
+                              (time.time() - self.retain_synced_seconds,))
+        return cursor.rowcount
+
+    async def _sync_room(self, room_id: str, state: Optional[Tuple[Any, int]],
+                         messages: List[Tuple[int, str, str, str, str, str]]) -> bool:
+        # State first: the backend creates the conversation row that messages reference
+        if state is not None:
+            state_blob, version = state
+            try:
+                if not await self.upstream.save_conversation_update(
+                        {"type": UPDATE_SNAPSHOT, "room_id": room_id, "version": version,
+                         "state": _decode_state(state_blob)}):
+                    return False
+                self.storage_stats["states_synced"] += 1
+            except WriteRejected as e:
+                # Not pushed again, so the rest of the room's backlog keeps moving
+                self.storage_stats["sync_rejected"] += 1
+                logger.error(f"Upstream rejected state of room {room_id} v{version}: {e}")
+            await self._write(lambda conn: self._mark_state_synced(conn, room_id, version))
+
+        if messages:
+            payloads = [
+                {"room_id": room_id, "speaker": speaker, "message": message,
+                 "metadata": json.loads(metadata) if metadata else None, "timestamp": timestamp}
+                for _, _, speaker, message, metadata, timestamp in messages
+            ]
+            try:
+                if not await self.upstream.log_conversation_messages(room_id, payloads):
+                    return False
+                self.storage_stats["messages_synced"] += len(messages)
+            except WriteRejected as e:
+                self.storage_stats["sync_rejected"] += len(messages)
+                logger.error(f"Upstream rejected {len(messages)} messages of room {room_id}: {e}")
+            message_ids = [row[0] for row in messages]
+            await self._write(lambda conn: self._mark_messages_synced(conn, message_ids))
+        return True
+
+    async def sync_once(self) -> bool:
+        """Push one batch of unsynced rows upstream; False if another process holds the lease or a push failed"""
+        if self.upstream is None:
+            return True
+        self._holds_lease = await self._write(self._acquire_lease)
+        if not self._holds_lease:
+            return False
+
+        start = time.perf_counter()
+        states, messages = await self._run(self._read_backlog)
+        rooms: Dict[str, Dict[str, Any]] = {}
+        for room_id, state_blob, version in states:
+            rooms.setdefault(room_id, {"state": None, "messages": []})["state"] = (state_blob, version)
+        for row in messages:
+            rooms.setdefault(row[1], {"state": None, "messages": []})["messages"].append(row)
+
+        results = await asyncio.gather(*(self._sync_room(room_id, entry["state"], entry["messages"])
+                                         for room_id, entry in rooms.items()), return_exceptions=True)
+        failed = sum(1 for result in results if result is not True)
+        if failed:
+            self.storage_stats["sync_failures"] += failed
+            logger.warning(f"Upstream sync failed for {failed} of {len(rooms)} rooms; retrying next pass")
+
+        # Synced messages only need to stay around for a while; checked at most once a minute
+        if time.monotonic() - self._last_prune > 60.0:
+            self._last_prune = time.monotonic()
+            self.storage_stats["messages_pruned"] += await self._write(self._prune)
+        self.storage_stats["sync_passes"] += 1
+        if rooms:
+            self.sync_latency.record((time.perf_counter() - start) * 1000)
+        return not failed
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync_once()
+            except Exception as e:
+                self.storage_stats["sync_failures"] += 1
+                logger.warning(f"Upstream sync pass failed: {e}")
+
+    # Lifecycle
+
+    async def warm(self):
+        await self._run(self._connect)
+        self._start_sync()
+        if self.upstream is not None:
+            await self.upstream.warm()
+
+    async def close(self):
+        """Commit queued writes, make a bounded last sync pass, then close the database"""
+        self._closing = True
+        if self._committer is not None:
+            await self._committer
+        if self._syncer is not None:
+            self._syncer.cancel()
+            try:
+                await self._syncer
+            except asyncio.CancelledError:
+                pass
+            self._syncer = None
+        if self.upstream is not None:
+            try:
+                await asyncio.wait_for(self.sync_once(), timeout=self.close_sync_timeout)
+            except Exception as e:
+                logger.warning(f"Final upstream sync did not finish ({e}); rows stay queued in {self.path}")
+            if self._holds_lease:
+                await self._write(self._release_lease)
+                self._holds_lease = False
+            if self._committer is not None:
+                await self._committer
+        if self._executor is not None:
+            await self._run(self._close_connection)
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._closing = False
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "queued_writes": len(self._queued),
+            "write_ms": self.write_latency.summary(),
+            "commit_ms": self.commit_latency.summary(),
+            "writes_per_commit": self.commit_batch.summary(),
+            "state_bytes": self.state_bytes.summary(),
+            "sync_ms": self.sync_latency.summary(),
+            "sync_backlog": dict(self.sync_backlog),
+            "holds_sync_lease": self._holds_lease,
+            "upstream": self.upstream.get_statistics() if self.upstream is not None else None,
+            **self.storage_stats
+        }
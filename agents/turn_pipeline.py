@@ -0,0 +1,190 @@
+"""
+Per-Turn Stage DAG Executor for VoiceFlow Pro
+
+This module runs the stages of a conversation turn as a dependency graph:
+- Stages declare dependencies; independent stages run concurrently
+- Optional stages get a deadline and a fallback value
+- Each turn produces a span tree with per-stage timings and outcomes
+- Critical path extraction to show which chain bounded the turn
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Callable, Sequence
+
+logger = logging.getLogger(__name__)
+
+SPAN_OK = "ok"
+SPAN_TIMEOUT = "timeout"
+SPAN_ERROR = "error"
+SPAN_CANCELLED = "cancelled"
+
+
+@dataclass
+class Stage:
+    """One step of a turn; ``fnc`` receives the results of earlier stages"""
+    name: str
+    fnc: Callable[[Dict[str, Any]], Any]
+    depends_on: Sequence[str] = ()
+    deadline_ms: Optional[float] = None
+    optional: bool = False
+    fallback: Any = None
+
+
+@dataclass
+class Span:
+    """Timing record for a turn or one of its stages (ms relative to turn start)"""
+    name: str
+    start_ms: float
+    end_ms: float = 0.0
+    status: str = SPAN_OK
+    wait_ms: float = 0.0
+    error: Optional[str] = None
+    children: List["Span"] = field(default_factory=list)
+
+    @property
+    def duration_ms(self) -> float:
+        return self.end_ms - self.start_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "name": self.name,
+            "start_ms": round(self.start_ms, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+        }
+        if self.wait_ms:
+            data["wait_ms"] = round(self.wait_ms, 3)
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+
+@dataclass
+class TurnResult:
+    """Stage results and the span tree of one turn"""
+    results: Dict[str, Any]
+    span: Span
+    critical_path: List[str]
+
+
+class TurnPipeline:
+    """
+    Dependency-driven executor for the stages of one turn.
+
+    The graph is validated once at construction. ``run`` starts every stage
+    as a task that waits only for its own dependencies. An optional stage
+    that misses its deadline or raises yields its fallback; a required
+    stage that raises cancels the rest of the turn and the error propagates.
+    """
+
+    def __init__(self, stages: List[Stage], name: str = "turn"):
+        self.name = name
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Duplicate stage names in turn pipeline")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order: List[str] = []
+        state: Dict[str, str] = {}
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Cycle in turn pipeline: {' -> '.join(path + [name])}")
+            state[name] = "visiting"
+            for dependency in self.stages[name].depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(f"Stage {name} depends on unknown stage {dependency}")
+                visit(dependency, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    async def _run_stage(self, stage: Stage, tasks: Dict[str, asyncio.Task],
+                         results: Dict[str, Any], spans: Dict[str, Span], turn_start: float) -> Any:
+        ready_at = time.perf_counter()
+        if stage.depends_on:
+            await asyncio.gather(*(tasks[dependency] for dependency in stage.depends_on))
+
+        started_at = time.perf_counter()
+        span = Span(stage.name, (started_at - turn_start) * 1000, wait_ms=(started_at - ready_at) * 1000)
+        spans[stage.name] = span
+
+        try:
+            outcome = stage.fnc(results)
+            if inspect.isawaitable(outcome):
+                if stage.deadline_ms is not None:
+                    outcome = await asyncio.wait_for(outcome, stage.deadline_ms / 1000)
+                else:
+                    outcome = await outcome
+        except asyncio.TimeoutError:
+            span.status = SPAN_TIMEOUT
+            if not stage.optional:
+                raise
+            outcome = stage.fallback
+        except asyncio.CancelledError:
+            span.status = SPAN_CANCELLED
+            raise
+        except Exception as e:
+            span.status = SPAN_ERROR
+            span.error = f"{type(e).__name__}: {e}"
+            if not stage.optional:
+                raise
+            logger.warning(f"Optional stage {stage.name} failed, using fallback: {e}")
+            outcome = stage.fallback
+        finally:
+            span.end_ms = (time.perf_counter() - turn_start) * 1000
+
+        results[stage.name] = outcome
+        return outcome
+
+    async def run(self, **inputs) -> TurnResult:
+        """Run one turn; ``inputs`` seed the results visible to every stage"""
+        turn_start = time.perf_counter()
+        results: Dict[str, Any] = dict(inputs)
+        spans: Dict[str, Span] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        for name in self.order:
+            tasks[name] = asyncio.ensure_future(
+                self._run_stage(self.stages[name], tasks, results, spans, turn_start)
+            )
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            root = Span(self.name, 0.0, (time.perf_counter() - turn_start) * 1000)
+            root.children = sorted(spans.values(), key=lambda span: span.start_ms)
+
+        return TurnResult(results={name: results[name] for name in self.order}, span=root,
+                          critical_path=self.critical_path(root))
+
+    def critical_path(self, root: Span) -> List[str]:
+        """Chain of stages that determined the turn's end time"""
+        spans = {span.name: span for span in root.children}
+        if not spans:
+            return []
+
+        path = [max(spans.values(), key=lambda span: span.end_ms).name]
+        while True:
+            dependencies = [spans[d] for d in self.stages[path[-1]].depends_on if d in spans]
+            if not dependencies:
+                break
+            path.append(max(dependencies, key=lambda span: span.end_ms).name)
+        return list(reversed(path))
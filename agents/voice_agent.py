@@ -13,93 +13,56 @@ This module implements comprehensive business automation with:
 import asyncio
 import logging
 import json
-import re
-from typing import Dict, Any, Optional, List
-from enum import Enum
-from dataclasses import dataclass, asdict
-from datetime import datetime, timedelta
-import aiohttp
+from collections import deque
+from typing import Dict, Any, Optional, List, Tuple
+from datetime import datetime
 
 from livekit.agents import JobContext, llm
 from livekit import rtc
 
+from settings_bus import SettingsBus, SessionSettingsSubscription
+from model_router import ModelRouter
+from http_client import PooledHTTPClient
+from persistence_queue import WriteBehindQueue
+from context_sync import ContextDeltaTracker
+from storage_backend import StorageBackend, HTTPStorageBackend, WriteRejected, DEFAULT_BACKEND_URL
+from intent_scanner import KeywordScanner, ScanResult
+from turn_pipeline import TurnPipeline, Stage
+from speculation import SpeculativeExecutor
+from audio_cache import SynthesizedAudioCache, CachedAudio, audio_cache_key
+from customer_context import CustomerContext, Scenario, Priority
+from conversation_history import DEFAULT_WINDOW_ENTRIES, DEFAULT_WINDOW_BYTES, history_entry_from_message
+from service_registry import services
+
 logger = logging.getLogger(__name__)
 
 
-class Scenario(Enum):
-    """Business scenarios the agent can handle"""
-    ONBOARDING = "onboarding"
-    SALES = "sales"
-    SUPPORT = "support"
-    SCHEDULING = "scheduling"
-    FOLLOW_UP = "follow_up"
-    ESCALATION = "escalation"
+# Fixed responses of the scenario handlers; their audio is synthesized ahead of time
+SCENARIO_RESPONSES = {
+    "onboarding.welcome": "Welcome to VoiceFlow Pro! I'm here to help with your business needs. Whether you're interested in our solutions, need support, or want to schedule a consultation, I'm ready to assist. What brings you here today?",
+    "onboarding.options": "Thank you for reaching out! I can help you with product information, technical support, or scheduling appointments. What would you like to know more about?",
+    "onboarding.challenges": "Great to have you here! I specialize in helping businesses like yours. Could you tell me a bit about your current challenges or what you're hoping to accomplish?",
+    "sales.demo": "I'd be happy to schedule a personalized demo for you! Our platform can significantly improve your business efficiency. What's your availability this week? I can also have one of our solution specialists join us.",
+    "sales.pricing": "Our pricing depends on your specific needs and company size. I'd like to understand your requirements better so I can provide accurate pricing. How many users would need access, and what's your primary use case?",
+    "sales.discovery": "I understand you're evaluating solutions for your business. To recommend the best package, could you tell me about your current setup and main challenges? This helps me match you with the right features.",
+    "scheduling.demo": "Perfect! I can schedule a product demonstration for you. I have availability next Tuesday at 2 PM or Wednesday at 10 AM. The demo will take about 30 minutes and I'll send you the meeting link. Which time works better?",
+    "scheduling.consultation": "I'd be happy to schedule a consultation with one of our specialists. We have slots available this week on Tuesday afternoon or Thursday morning. What type of consultation are you looking for, and do you prefer morning or afternoon?",
+    "scheduling.general": "I can help you schedule an appointment. What type of meeting would you like - a product demo, technical consultation, or something else? And what's your preferred time frame?",
+    "follow_up.check_in": "Thank you for following up! I have your previous conversation history here. How did everything go with your last request? Is there anything else I can help you with today?",
+    "escalation.transfer": "I understand you need to speak with a supervisor. I'm connecting you with our management team right now. Please hold for just a moment while I transfer you with all the context from our conversation.",
+}
 
+_STATIC_RESPONSE_TEXTS = frozenset(SCENARIO_RESPONSES.values())
 
-class Priority(Enum):
-    """Priority levels for conversations"""
-    LOW = "low"
-    MEDIUM = "medium"
-    HIGH = "high"
-    CRITICAL = "critical"
 
+def response_audio_key(text: str, tts_voice: Dict[str, Any], model: Optional[str] = None) -> str:
+    """Audio cache key of a response in the configured voice (``model`` overrides the voice's model)"""
+    return audio_cache_key(text, tts_voice["voice_id"], model or tts_voice["model"], tts_voice.get("settings"))
 
-@dataclass
-class CustomerContext:
-    """Enhanced customer information and conversation state"""
-    # Basic information
-    name: Optional[str] = None
-    email: Optional[str] = None
-    phone: Optional[str] = None
-    company: Optional[str] = None
-    title: Optional[str] = None
-    
-    # Business context
-    current_scenario: Scenario = Scenario.ONBOARDING
-    previous_scenarios: List[Scenario] = None
-    lead_score: int = 0
-    priority: Priority = Priority.MEDIUM
-    
-    # Conversation state
-    conversation_history: List[Dict] = None
-    extracted_entities: Dict[str, Any] = None
-    business_actions: List[Dict] = None
-    sentiment_scores: List[float] = None
-    
-    # Technical context
-    room_id: Optional[str] = None
-    participant_id: Optional[str] = None
-    session_start: Optional[datetime] = None
-    last_activity: Optional[datetime] = None
-    
-    def __post_init__(self):
-        if self.previous_scenarios is None:
-            self.previous_scenarios = []
-        if self.conversation_history is None:
-            self.conversation_history = []
-        if self.extracted_entities is None:
-            self.extracted_entities = {}
-        if self.business_actions is None:
-            self.business_actions = []
-        if self.sentiment_scores is None:
-            self.sentiment_scores = []
-        if self.session_start is None:
-            self.session_start = datetime.now()
-        self.last_activity = datetime.now()
 
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for database storage"""
-        data = asdict(self)
-        # Convert datetime objects to ISO strings
-        if self.session_start:
-            data['session_start'] = self.session_start.isoformat()
-        if self.last_activity:
-            data['last_activity'] = self.last_activity.isoformat()
-        # Convert enums to strings
-        data['current_scenario'] = self.current_scenario.value
-        data['priority'] = self.priority.value
-        data['previous_scenarios'] = [s.value for s in self.previous_scenarios]
-        return data
+def scenario_response_audio_entries(tts_voice: Dict[str, Any]) -> Dict[str, str]:
+    """``{cache key: text}`` for every fixed response, for cache pre-population"""
+    return {response_audio_key(text, tts_voice): text for text in SCENARIO_RESPONSES.values()}
 
 
 class BusinessLLM(llm.LLM):
@@ -201,7 +164,15 @@ RESPONSE GUIDELINES:
 
 
 class IntentClassifier:
-    """Advanced intent classification for business scenarios"""
+    """
+    Advanced intent classification for business scenarios.
+    
+    Stateless apart from a memo of the last scan, so one instance is shared
+    by every session in the process (``services.get("intent_classifier")``).
+    """
+    
+    # Compiled once per process and shared by every classifier
+    _scanner: Optional[KeywordScanner] = None
     
     def __init__(self):
         # Business terminology patterns for intent detection
@@ -241,28 +212,51 @@ class IntentClassifier:
             'date': r'\b(?:today|tomorrow|next\s+\w+|this\s+\w+|\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\b',
             'time': r'\b(?:\d{1,2}:\d{2}\s*(?:am|pm)?|\d{1,2}\s*(?:am|pm))\b'
         }
+        
+        # Cheap necessary conditions for each entity pattern (searched in lowercased text)
+        self.entity_gates = {
+            'email': r'@',
+            'phone': r'\d',
+            'company': r'\b(?:inc|llc|corp|ltd|co)\b',
+            'money': r'\d',
+            'date': r'\d|\btoday|\btomorrow|\bnext\s|\bthis\s',
+            'time': r'\d'
+        }
+        
+        self.escalation_keywords = ['urgent', 'critical', 'emergency', 'manager', 'supervisor']
+        
+        if IntentClassifier._scanner is None:
+            IntentClassifier._scanner = KeywordScanner(
+                self.intent_patterns, self.entity_patterns,
+                self.escalation_keywords, self.entity_gates
+            )
+        self.scanner = IntentClassifier._scanner
+        
+        # extract_entities and classify_intent see the same transcript each turn; keyed by the
+        # text, so sessions sharing the classifier can only cost each other a re-scan
+        self._last_scan: Optional[Tuple[str, ScanResult]] = None
+    
+    def scan(self, text: str) -> ScanResult:
+        """Single pass over the transcript for intent counts, escalation and entities"""
+        if self._last_scan is None or self._last_scan[0] != text:
+            self._last_scan = (text, self.scanner.scan(text))
+        return self._last_scan[1]
     
     async def classify_intent(self, text: str, context: CustomerContext) -> Scenario:
         """Classify intent based on text and conversation context"""
-        text_lower = text.lower()
-        scenario_scores = {}
+        scan = self.scan(text)
+        
+        # Handle escalation triggers
+        if scan.escalation:
+            return Scenario.ESCALATION
         
         # Score each scenario based on pattern matching
-        for scenario, patterns in self.intent_patterns.items():
-            score = 0
-            for pattern in patterns:
-                matches = len(re.findall(pattern, text_lower, re.IGNORECASE))
-                score += matches
-            scenario_scores[scenario] = score
+        scenario_scores = dict(scan.intent_counts)
         
         # Apply context weighting
         if context.current_scenario in scenario_scores:
             scenario_scores[context.current_scenario] *= 1.5  # Boost current scenario
         
-        # Handle escalation triggers
-        if any(word in text_lower for word in ['urgent', 'critical', 'emergency', 'manager', 'supervisor']):
-            return Scenario.ESCALATION
-        
         # Return highest scoring scenario or default to current
         if max(scenario_scores.values()) > 0:
             return max(scenario_scores, key=scenario_scores.get)
@@ -271,69 +265,66 @@ class IntentClassifier:
     
     def extract_entities(self, text: str) -> Dict[str, List[str]]:
         """Extract business entities from text"""
-        entities = {}
-        
-        for entity_type, pattern in self.entity_patterns.items():
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                entities[entity_type] = matches
-        
-        return entities
+        return {entity_type: list(matches) for entity_type, matches in self.scan(text).entities.items()}
 
 
 class DatabaseManager:
     """Handles database persistence for conversation data"""
     
-    def __init__(self, backend_url: str = "http://backend:8000"):
+    def __init__(self, backend_url: str = DEFAULT_BACKEND_URL,
+                 http_client: Optional[PooledHTTPClient] = None,
+                 storage: Optional[StorageBackend] = None):
         self.backend_url = backend_url
+        # The backend over HTTP unless an embedded store is configured
+        self.storage = storage or HTTPStorageBackend(backend_url, http_client)
     
     async def save_conversation_state(self, context: CustomerContext) -> bool:
         """Save conversation state to database"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.backend_url}/api/conversation/state",
-                    json=context.to_dict()
-                ) as response:
-                    return response.status == 200
-        except Exception as e:
-            logger.error(f"Failed to save conversation state: {e}")
-            return False
+        return await self.save_conversation_snapshot(context.to_dict())
+    
+    async def save_conversation_update(self, update: Dict[str, Any]) -> bool:
+        """Save a versioned snapshot or delta built by ContextDeltaTracker"""
+        return await self.storage.save_conversation_update(update)
+    
+    async def save_conversation_snapshot(self, state: Dict[str, Any]) -> bool:
+        """Save an already serialized conversation state"""
+        return await self.storage.save_conversation_snapshot(state)
     
     async def load_conversation_state(self, room_id: str) -> Optional[CustomerContext]:
         """Load conversation state from database"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.backend_url}/api/conversation/state/{room_id}"
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return CustomerContext(**data)
-        except Exception as e:
-            logger.error(f"Failed to load conversation state: {e}")
-        
+        data = await self.storage.load_conversation_state(room_id)
+        if data:
+            return CustomerContext.from_dict(data)
         return None
     
+    @staticmethod
+    def message_payload(room_id: str, speaker: str, message: str,
+                        metadata: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "room_id": room_id,
+            "speaker": speaker,
+            "message": message,
+            "metadata": metadata,
+            "timestamp": datetime.now().isoformat()
+        }
+    
     async def log_conversation_message(self, room_id: str, speaker: str, message: str, 
                                      metadata: Dict[str, Any]) -> bool:
         """Log individual conversation message"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.backend_url}/api/conversation/message",
-                    json={
-                        "room_id": room_id,
-                        "speaker": speaker,
-                        "message": message,
-                        "metadata": metadata,
-                        "timestamp": datetime.now().isoformat()
-                    }
-                ) as response:
-                    return response.status == 200
-        except Exception as e:
-            logger.error(f"Failed to log conversation message: {e}")
-            return False
+        return await self.storage.log_conversation_message(
+            self.message_payload(room_id, speaker, message, metadata))
+    
+    async def log_conversation_messages(self, room_id: str, messages: List[Dict[str, Any]]) -> bool:
+        """Log several messages for one room in a single bulk write"""
+        return await self.storage.log_conversation_messages(room_id, messages)
+    
+    async def load_conversation_messages(self, room_id: str, offset: int = 0,
+                                         limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Logged messages of a room in order, from the ``offset``-th on"""
+        return await self.storage.load_conversation_messages(room_id, offset, limit)
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        return self.storage.get_statistics()
 
 
 class VoiceFlowAgent:
@@ -341,18 +332,67 @@ class VoiceFlowAgent:
     Advanced VoiceFlow Pro agent with multi-scenario support and business intelligence
     """
     
-    def __init__(self, job_context: JobContext, participant: rtc.Participant):
-        # Note: VoiceAssistant integration would be added here in production
+    def __init__(self, job_context: JobContext, participant: rtc.Participant,
+                 settings_bus: Optional[SettingsBus] = None,
+                 audio_processor: Optional[Any] = None,
+                 business_llm: Optional['BusinessLLM'] = None,
+                 stt: Optional[Any] = None,
+                 tts: Optional[Any] = None,
+                 model_router: Optional[ModelRouter] = None,
+                 turn_budget_ms: float = 500.0,
+                 stt_model: Optional[str] = None,
+                 persistence_queue: Optional[WriteBehindQueue] = None,
+                 sentiment_deadline_ms: float = 50.0,
+                 audio_cache: Optional[SynthesizedAudioCache] = None,
+                 tts_voice: Optional[Dict[str, Any]] = None,
+                 storage_backend: Optional[StorageBackend] = None,
+                 history_window_entries: int = DEFAULT_WINDOW_ENTRIES,
+                 history_window_bytes: int = DEFAULT_WINDOW_BYTES):
+        # Caller audio reaches the agent through SpeechLoop (speech_loop.py)
         self.job_context = job_context
         self.participant = participant
+        
+        # Pipeline components reconfigured by the optimizer between turns
+        self.settings_bus = settings_bus
+        self.settings_subscription: Optional[SessionSettingsSubscription] = None
+        self.audio_processor = audio_processor
+        self.business_llm = business_llm
+        self.stt = stt
+        self.tts = tts
+        self.pipeline_settings = None
+        # Models the plugins were built with; routing never goes above them until settings are published
+        self.configured_models: Dict[str, str] = {
+            stage: model for stage, model in (
+                ("stt", stt_model),
+                ("llm", business_llm.model if business_llm is not None else None),
+                ("tts", tts_voice.get("model") if tts_voice else None)
+            ) if model
+        }
+        self.active_models: Dict[str, str] = dict(self.configured_models)
+        self.model_router = model_router
+        self.turn_budget_ms = turn_budget_ms
+        # Pre-synthesized audio for fixed responses, looked up in the voice the TTS uses
+        self.audio_cache = audio_cache if tts_voice else None
+        self.tts_voice = tts_voice
         self.customer_context = CustomerContext(
             room_id=job_context.room.name,
             participant_id=participant.identity
         )
         
         # Initialize components
-        self.intent_classifier = IntentClassifier()
-        self.db_manager = DatabaseManager()
+        # Analyzers and the database manager are per-process services; an explicitly
+        # given storage backend gets its own (cheap) manager
+        self.intent_classifier = services.get("intent_classifier", IntentClassifier)
+        self.db_manager = (services.get("database_manager", DatabaseManager) if storage_backend is None
+                           else DatabaseManager(storage=storage_backend))
+        # Write-behind persistence; without it every turn awaits the backend
+        self.persistence_queue = persistence_queue
+        # Versioned deltas instead of re-posting the whole context every turn
+        self.context_sync = ContextDeltaTracker(self.customer_context.room_id)
+        # Recent turns stay in memory; older ones are paged back from the message log
+        self.history_window_entries = history_window_entries
+        self.history_window_bytes = history_window_bytes
+        self._bind_history()
         
         # Agent handlers for different scenarios
         self.scenario_handlers = {
@@ -367,54 +407,246 @@ class VoiceFlowAgent:
         # Conversation state
         self.conversation_active = True
         self.last_transcript = ""
-        self.sentiment_analyzer = SentimentAnalyzer()
+        self.sentiment_analyzer = services.get("keyword_sentiment", SentimentAnalyzer)
+        
+        # Turn stages as a dependency graph; span trees of recent turns kept for inspection
+        self.sentiment_deadline_ms = sentiment_deadline_ms
+        self.turn_pipeline = self._build_turn_pipeline()
+        self.turn_traces: deque = deque(maxlen=50)
+        self.last_turn_results: Dict[str, Any] = {}
+        
+        # Intent classification started on stable interim transcripts
+        self.speculation = SpeculativeExecutor(self._prepare_turn, basis_fnc=self._speculation_basis)
+    
+    def _build_turn_pipeline(self) -> TurnPipeline:
+        """Declare the per-turn stages and what each one needs"""
+        return TurnPipeline([
+            Stage("entities", self._stage_entities),
+            Stage("intent", self._stage_intent),
+            # Sentiment only feeds logging and analytics, so it may be dropped for a turn
+            Stage("sentiment", self._stage_sentiment, deadline_ms=self.sentiment_deadline_ms,
+                  optional=True, fallback=0.0),
+            Stage("transition", self._stage_transition, depends_on=("intent",)),
+            Stage("respond", self._stage_respond, depends_on=("intent", "transition", "entities")),
+            Stage("audio", self._stage_audio, depends_on=("respond",)),
+            Stage("log", self._stage_log, depends_on=("respond", "entities", "sentiment")),
+            Stage("save", self._stage_save, depends_on=("log",)),
+        ])
     
     async def setup_event_handlers(self):
         """Set up event handlers for LiveKit room events"""
         self.job_context.room.on("participant_disconnected", self._on_participant_disconnected)
         self.job_context.room.on("data_received", self._on_data_received)
         
+        if self.settings_bus:
+            self.settings_subscription = self.settings_bus.subscribe(
+                f"{self.customer_context.room_id}:{self.participant.identity}",
+                self._apply_pipeline_settings
+            )
+        
         # Load existing conversation state if any
         existing_context = await self.db_manager.load_conversation_state(self.customer_context.room_id)
         if existing_context:
             self.customer_context = existing_context
+            self._bind_history()
             logger.info(f"Loaded existing conversation context for room {self.customer_context.room_id}")
     
+    def _bind_history(self):
+        self.customer_context.conversation_history.configure(
+            max_entries=self.history_window_entries,
+            max_bytes=self.history_window_bytes,
+            page_fnc=self._page_history
+        )
+    
+    async def _page_history(self, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Spilled history entries, read back from the logged conversation messages"""
+        room_id = self.customer_context.room_id
+        if self.persistence_queue:
+            # Messages still queued have not reached storage yet
+            await self.persistence_queue.flush(room_id)
+        messages = await self.db_manager.load_conversation_messages(room_id, offset, limit)
+        if messages is None:
+            raise RuntimeError(f"conversation messages for room {room_id} are unavailable")
+        return [history_entry_from_message(message) for message in messages]
+    
     async def process_conversation(self, transcript: str) -> str:
         """
         Main conversation processing pipeline with advanced business logic
         """
         logger.info(f"Processing transcript: {transcript}")
         
+        # Turn boundary: adopt settings published since the previous turn
+        if self.settings_subscription:
+            await self.settings_subscription.apply_pending()
+        if self.model_router:
+            self._route_turn_models()
+        
         # Update activity timestamp
         self.customer_context.last_activity = datetime.now()
         
+        # Work already done on a matching interim transcript is reused
+        prepared, speculation = await self.speculation.on_final(transcript)
+        
+        # Run the turn's stages; independent ones overlap
+        turn = await self.turn_pipeline.run(transcript=transcript, prepared=prepared)
+        trace = turn.span.to_dict()
+        trace["speculation"] = speculation
+        self.turn_traces.append(trace)
+        self.last_turn_results = turn.results
+        logger.debug(f"Turn took {turn.span.duration_ms:.1f}ms, critical path {' -> '.join(turn.critical_path)}, "
+                     f"speculation saved {speculation['saved_ms']:.1f}ms")
+        
+        return turn.results["respond"]
+    
+    async def on_interim_transcript(self, transcript: str):
+        """Interim STT result: speculate on it once it stops changing"""
+        if self.pipeline_settings is not None and not self.pipeline_settings.partial_results:
+            return
+        self.speculation.on_interim(transcript)
+    
+    def _speculation_basis(self) -> Tuple[Scenario, int]:
+        # Prepared work is only valid against the conversation state it read
+        return self.customer_context.current_scenario, len(self.customer_context.conversation_history)
+    
+    async def _prepare_turn(self, transcript: str) -> Dict[str, Any]:
+        """Side-effect free part of a turn that can run ahead of the final transcript"""
+        return {"intent": await self.intent_classifier.classify_intent(transcript, self.customer_context)}
+    
+    def _stage_entities(self, results: Dict[str, Any]) -> Dict[str, List[str]]:
         # Extract entities from current message
-        entities = self.intent_classifier.extract_entities(transcript)
+        entities = self.intent_classifier.extract_entities(results["transcript"])
         self.customer_context.extracted_entities.update(entities)
-        
+        return entities
+    
+    async def _stage_intent(self, results: Dict[str, Any]) -> Scenario:
+        if results["prepared"]:
+            return results["prepared"]["intent"]
         # Classify intent and determine scenario
-        new_scenario = await self.intent_classifier.classify_intent(transcript, self.customer_context)
-        
+        return await self.intent_classifier.classify_intent(results["transcript"], self.customer_context)
+    
+    async def _stage_sentiment(self, results: Dict[str, Any]) -> float:
+        # Recorded here so a turn whose analysis misses its deadline adds no score
+        sentiment_score = await self.sentiment_analyzer.analyze(results["transcript"])
+        self.customer_context.sentiment_scores.append(sentiment_score)
+        return sentiment_score
+    
+    async def _stage_transition(self, results: Dict[str, Any]) -> bool:
         # Handle scenario transitions
-        if new_scenario != self.customer_context.current_scenario:
-            await self._handle_scenario_transition(new_scenario)
+        if results["intent"] != self.customer_context.current_scenario:
+            await self._handle_scenario_transition(results["intent"])
+            return True
+        return False
+    
+    async def _stage_respond(self, results: Dict[str, Any]) -> str:
+        # Route to appropriate scenario handler
+        handler = self.scenario_handlers.get(results["intent"], self._handle_onboarding)
+        return await handler(results["transcript"])
+    
+    def _stage_audio(self, results: Dict[str, Any]) -> Optional[CachedAudio]:
+        # A hit plays from ready-made frames; anything else goes to live TTS
+        if self.audio_cache is None or results["respond"] not in _STATIC_RESPONSE_TEXTS:
+            return None
+        return self.audio_cache.get(response_audio_key(results["respond"], self.tts_voice, self.active_models.get("tts")))
+    
+    async def _stage_log(self, results: Dict[str, Any]):
+        await self._log_conversation_turn(results["transcript"], results["respond"],
+                                          results["entities"], results["sentiment"])
+    
+    async def _stage_save(self, results: Dict[str, Any]):
+        await self._save_conversation_state()
+    
+    async def _save_conversation_state(self):
+        # Build now: the context keeps changing while a queued write waits
+        update = self.context_sync.build(self.customer_context)
+        if self.persistence_queue:
+            await self.persistence_queue.enqueue_state(update)
+            return
+        try:
+            await self.db_manager.save_conversation_update(update)
+        except WriteRejected as e:
+            logger.error(f"Conversation state for room {update['room_id']} not saved: {e}")
+    
+    async def _log_message(self, speaker: str, message: str, metadata: Dict[str, Any]):
+        if self.persistence_queue:
+            await self.persistence_queue.enqueue_message(
+                DatabaseManager.message_payload(self.customer_context.room_id, speaker, message, metadata)
+            )
+            return
+        try:
+            await self.db_manager.log_conversation_message(
+                room_id=self.customer_context.room_id,
+                speaker=speaker,
+                message=message,
+                metadata=metadata
+            )
+        except WriteRejected as e:
+            logger.error(f"Conversation message for room {self.customer_context.room_id} not logged: {e}")
+    
+    def _apply_pipeline_settings(self, settings):
+        """
+        Hot-swap audio and LLM/TTS configuration for the next turn.
         
-        # Analyze sentiment
-        sentiment_score = await self.sentiment_analyzer.analyze(transcript)
-        self.customer_context.sentiment_scores.append(sentiment_score)
+        The STT model is not swapped: the worker builds its STT plugin once
+        with a fixed speech model and the session's streaming connection is
+        opened with it, so ``settings.stt_model`` is ignored here.
+        """
+        if self.audio_processor is not None:
+            self.audio_processor.apply_optimization_settings(settings)
         
-        # Route to appropriate scenario handler
-        handler = self.scenario_handlers.get(new_scenario, self._handle_onboarding)
-        response = await handler(transcript)
+        if self.business_llm is not None:
+            self.business_llm.model = settings.llm_model
+        
+        if self.tts is not None and hasattr(self.tts, "update_options"):
+            self.tts.update_options(model=settings.tts_model)
         
-        # Log conversation to database
-        await self._log_conversation_turn(transcript, response, entities, sentiment_score)
+        self.active_models = {
+            **self.active_models,
+            "llm": settings.llm_model,
+            "tts": settings.tts_model
+        }
+        self.pipeline_settings = settings
         
-        # Save updated context
-        await self.db_manager.save_conversation_state(self.customer_context)
+        logger.info(f"Pipeline reconfigured: chunk {settings.chunk_size}, buffer {settings.buffer_size}, "
+                    f"models {self.active_models}")
+    
+    def _route_turn_models(self):
+        """
+        Select this turn's LLM and TTS models from observed provider latency and health.
         
-        return response
+        The ceiling is the published settings' model, or the configured one
+        until the bus first publishes. A stage keeps its ceiling until the
+        router holds real samples for it; the built-in priors alone never
+        move a session off the model it was configured with. The STT model
+        is fixed (see ``_apply_pipeline_settings``) and only uses up budget.
+        """
+        ceilings = dict(self.configured_models)
+        if self.pipeline_settings is not None:
+            ceilings.update({stage: model for stage, model in (
+                ("llm", self.pipeline_settings.llm_model),
+                ("tts", self.pipeline_settings.tts_model)
+            ) if stage in ceilings})
+        
+        routable = [stage for stage in ("llm", "tts")
+                    if stage in ceilings and self.model_router.has_samples(stage, ceilings[stage])]
+        # Fixed stages use up budget only by what they were measured to take
+        budget = self.turn_budget_ms - sum(
+            self.model_router.predicted_latency_ms(stage, model) for stage, model in ceilings.items()
+            if stage not in routable and self.model_router.has_samples(stage, model)
+        )
+        decisions = self.model_router.select_turn(
+            budget, stages=routable,
+            max_quality_ranks={stage: self.model_router.quality_rank(stage, ceilings[stage]) for stage in routable}
+        )
+        routed = {stage: ceilings[stage] for stage in ("llm", "tts") if stage in ceilings}
+        routed.update({stage: decision.model for stage, decision in decisions.items()})
+        
+        if routed.get("llm") != self.active_models.get("llm") and self.business_llm is not None:
+            self.business_llm.model = routed["llm"]
+        if (routed.get("tts") != self.active_models.get("tts") and self.tts is not None
+                and hasattr(self.tts, "update_options")):
+            self.tts.update_options(model=routed["tts"])
+        
+        self.active_models = {**self.active_models, **routed}
     
     async def _handle_scenario_transition(self, new_scenario: Scenario):
         """Handle transitions between business scenarios"""
@@ -437,9 +669,9 @@ class VoiceFlowAgent:
         logger.info("Handling onboarding scenario")
         
         responses = [
-            "Welcome to VoiceFlow Pro! I'm here to help with your business needs. Whether you're interested in our solutions, need support, or want to schedule a consultation, I'm ready to assist. What brings you here today?",
-            "Thank you for reaching out! I can help you with product information, technical support, or scheduling appointments. What would you like to know more about?",
-            "Great to have you here! I specialize in helping businesses like yours. Could you tell me a bit about your current challenges or what you're hoping to accomplish?"
+            SCENARIO_RESPONSES["onboarding.welcome"],
+            SCENARIO_RESPONSES["onboarding.options"],
+            SCENARIO_RESPONSES["onboarding.challenges"]
         ]
         
         # Choose response based on conversation length
@@ -461,13 +693,13 @@ class VoiceFlowAgent:
         })
         
         if "demo" in transcript.lower():
-            return "I'd be happy to schedule a personalized demo for you! Our platform can significantly improve your business efficiency. What's your availability this week? I can also have one of our solution specialists join us."
+            return SCENARIO_RESPONSES["sales.demo"]
         
         elif "price" in transcript.lower() or "cost" in transcript.lower():
-            return "Our pricing depends on your specific needs and company size. I'd like to understand your requirements better so I can provide accurate pricing. How many users would need access, and what's your primary use case?"
+            return SCENARIO_RESPONSES["sales.pricing"]
         
         else:
-            return "I understand you're evaluating solutions for your business. To recommend the best package, could you tell me about your current setup and main challenges? This helps me match you with the right features."
+            return SCENARIO_RESPONSES["sales.discovery"]
     
     async def _handle_support(self, transcript: str) -> str:
         """Handle customer support with intelligent triage"""
@@ -508,13 +740,13 @@ class VoiceFlowAgent:
         })
         
         if "demo" in transcript.lower():
-            return "Perfect! I can schedule a product demonstration for you. I have availability next Tuesday at 2 PM or Wednesday at 10 AM. The demo will take about 30 minutes and I'll send you the meeting link. Which time works better?"
+            return SCENARIO_RESPONSES["scheduling.demo"]
         
         elif "consultation" in transcript.lower():
-            return "I'd be happy to schedule a consultation with one of our specialists. We have slots available this week on Tuesday afternoon or Thursday morning. What type of consultation are you looking for, and do you prefer morning or afternoon?"
+            return SCENARIO_RESPONSES["scheduling.consultation"]
         
         else:
-            return "I can help you schedule an appointment. What type of meeting would you like - a product demo, technical consultation, or something else? And what's your preferred time frame?"
+            return SCENARIO_RESPONSES["scheduling.general"]
     
     async def _handle_follow_up(self, transcript: str) -> str:
         """Handle follow-up conversations and relationship management"""
@@ -527,7 +759,7 @@ class VoiceFlowAgent:
             "timestamp": datetime.now().isoformat()
         })
         
-        return "Thank you for following up! I have your previous conversation history here. How did everything go with your last request? Is there anything else I can help you with today?"
+        return SCENARIO_RESPONSES["follow_up.check_in"]
     
     async def _handle_escalation(self, transcript: str) -> str:
         """Handle escalations to human agents"""
@@ -542,13 +774,12 @@ class VoiceFlowAgent:
             "timestamp": datetime.now().isoformat()
         })
         
-        return "I understand you need to speak with a supervisor. I'm connecting you with our management team right now. Please hold for just a moment while I transfer you with all the context from our conversation."
+        return SCENARIO_RESPONSES["escalation.transfer"]
     
     async def _log_conversation_turn(self, transcript: str, response: str, entities: Dict, sentiment: float):
         """Log a complete conversation turn to database"""
         # Log customer message
-        await self.db_manager.log_conversation_message(
-            room_id=self.customer_context.room_id,
+        await self._log_message(
             speaker="customer",
             message=transcript,
             metadata={
@@ -559,8 +790,7 @@ class VoiceFlowAgent:
         )
         
         # Log agent response
-        await self.db_manager.log_conversation_message(
-            room_id=self.customer_context.room_id,
+        await self._log_message(
             speaker="agent",
             message=response,
             metadata={
@@ -591,6 +821,10 @@ class VoiceFlowAgent:
             logger.info(f"Customer {participant.identity} disconnected")
             self.conversation_active = False
             
+            if self.settings_subscription:
+                self.settings_subscription.close()
+            self.speculation.cancel()
+            
             # Save final conversation state
             self.customer_context.business_actions.append({
                 "type": "session_ended",
@@ -598,7 +832,13 @@ class VoiceFlowAgent:
                 "timestamp": datetime.now().isoformat()
             })
             
-            await self.db_manager.save_conversation_state(self.customer_context)
+            await self._save_conversation_state()
+            if self.persistence_queue:
+                await self.persistence_queue.flush(self.customer_context.room_id)
+            logger.info(f"Context sync for room {self.customer_context.room_id}: {self.context_sync.get_statistics()}")
+            logger.info(f"Speculation for room {self.customer_context.room_id}: {self.speculation.get_statistics()}")
+            logger.info(f"History for room {self.customer_context.room_id}: "
+                        f"{self.customer_context.conversation_history.get_statistics()}")
     
     async def _on_data_received(self, data: rtc.DataPacket):
         """Handle data messages from frontend"""
@@ -0,0 +1,124 @@
+"""
+Process-Wide Worker Resources for VoiceFlow Pro
+
+This module builds the expensive, shareable parts of a job once per worker process:
+- Named factories for configured plugin clients, classifiers and caches
+- Built in the prewarm phase and kept in the process's userdata
+- Jobs reuse them; anything missing is built on demand and counted as cold
+- Cold-start vs warm-start job setup latency
+- Time-to-first-job and process RSS checked against a start-up budget
+"""
+
+import logging
+import time
+from typing import Dict, Any, Callable, List, Optional
+
+import psutil
+
+from latency_sketch import LatencyHistogram
+from lazy_imports import import_profile, process_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerResources:
+    """
+    Registry of per-process singletons.
+
+    Resources are stored in a caller-provided mapping (the worker process's
+    ``userdata``) so they live exactly as long as the process. Factories run
+    in registration order, which lets later factories use earlier resources.
+    """
+
+    def __init__(self, first_job_budget_ms: Optional[float] = None, rss_budget_mb: Optional[float] = None):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self.build_ms: Dict[str, float] = {}
+        self.prewarm_ms = 0.0
+        self.cold_builds = 0
+
+        self.job_setup = {"cold": LatencyHistogram(), "warm": LatencyHistogram()}
+
+        # Start-up budget: spawn to first job ready, and resident memory per process
+        self.first_job_budget_ms = first_job_budget_ms
+        self.rss_budget_mb = rss_budget_mb
+        self.time_to_ready_ms: Optional[float] = None
+        self.time_to_first_job_ms: Optional[float] = None
+        self.rss_mb: Dict[str, float] = {}
+        self.budget_violations: List[str] = []
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        self._factories[name] = factory
+
+    def _build(self, userdata: Dict[str, Any], name: str) -> Any:
+        start = time.perf_counter()
+        resource = userdata[name] = self._factories[name]()
+        self.build_ms[name] = (time.perf_counter() - start) * 1000
+        return resource
+
+    def prewarm(self, userdata: Dict[str, Any], names: Optional[List[str]] = None):
+        """Build every registered resource (or ``names``) not yet in ``userdata``"""
+        start = time.perf_counter()
+        for name in names or list(self._factories):
+            if name not in userdata:
+                self._build(userdata, name)
+        self.prewarm_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Prewarmed {len(self.build_ms)} worker resources in {self.prewarm_ms:.1f}ms: "
+                    + ", ".join(f"{name} {ms:.1f}ms" for name, ms in self.build_ms.items()))
+        # From process creation, so interpreter start and imports count too
+        self.time_to_ready_ms = self._process_age_ms()
+        self._check_rss("after_prewarm")
+
+    @staticmethod
+    def _process_age_ms() -> float:
+        return (time.time() - psutil.Process().create_time()) * 1000
+
+    def _check_rss(self, phase: str):
+        rss = process_rss_bytes()
+        if rss is None:
+            return
+        self.rss_mb[phase] = rss / (1024 * 1024)
+        if self.rss_budget_mb is not None and self.rss_mb[phase] > self.rss_budget_mb:
+            self._violation(f"RSS {self.rss_mb[phase]:.0f}MB {phase} exceeds budget of {self.rss_budget_mb:.0f}MB")
+
+    def _violation(self, message: str):
+        self.budget_violations.append(message)
+        logger.warning(f"Worker start-up budget: {message}")
+
+    def get(self, userdata: Dict[str, Any], name: str) -> Any:
+        """Return the shared resource, building it now if prewarm did not"""
+        if name not in userdata:
+            self.cold_builds += 1
+            logger.info(f"Worker resource {name} was not prewarmed; building it for this job")
+            self._build(userdata, name)
+        return userdata[name]
+
+    def record_job_setup(self, setup_ms: float, cold_builds_before: int):
+        """Record one job's setup time, classed as cold if it had to build anything"""
+        kind = "cold" if self.cold_builds > cold_builds_before else "warm"
+        self.job_setup[kind].record(setup_ms)
+        logger.info(f"Job setup took {setup_ms:.1f}ms ({kind} start)")
+
+        if self.time_to_first_job_ms is None:
+            # Idle time in the process pool waiting for a job does not count
+            if self.time_to_ready_ms is not None:
+                self.time_to_first_job_ms = self.time_to_ready_ms + setup_ms
+            else:
+                self.time_to_first_job_ms = self._process_age_ms()
+            if self.first_job_budget_ms is not None and self.time_to_first_job_ms > self.first_job_budget_ms:
+                self._violation(f"time to first job {self.time_to_first_job_ms:.0f}ms exceeds budget of "
+                                f"{self.first_job_budget_ms:.0f}ms")
+            self._check_rss("first_job")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "prewarm_ms": self.prewarm_ms,
+            "build_ms": dict(self.build_ms),
+            "cold_builds": self.cold_builds,
+            "job_setup_ms": {kind: histogram.summary() for kind, histogram in self.job_setup.items()},
+            "time_to_ready_ms": self.time_to_ready_ms,
+            "time_to_first_job_ms": self.time_to_first_job_ms,
+            "rss_mb": dict(self.rss_mb),
+            "budget": {"first_job_ms": self.first_job_budget_ms, "rss_mb": self.rss_budget_mb},
+            "budget_violations": list(self.budget_violations),
+            "deferred_imports": import_profile()
+        }
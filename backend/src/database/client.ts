@@ -24,6 +24,8 @@ export interface Conversation {
   duration_seconds?: number
   total_words: number
   sentiment_score: number
+  state?: any
+  state_version: number
 }
 
 export interface ConversationMessage {
@@ -185,6 +187,65 @@ export class DatabaseClient {
     return result.rows[0].id
   }
 
+  async saveConversationState(roomId: string, state: any, version: number): Promise<void> {
+    await this.query(
+      `UPDATE conversations 
+       SET state = $1,
+           state_version = $2
+       WHERE room_id = $3`,
+      [JSON.stringify(state), version, roomId]
+    )
+  }
+
+  // Apply an agent delta on top of the stored state; returns null on version conflict
+  async applyConversationDelta(delta: {
+    room_id: string
+    base_version: number
+    version: number
+    scalars: Record<string, any>
+    entities: Record<string, any>
+    append: Record<string, any[]>
+  }): Promise<{ conversation_id: number, new_actions: any[] } | null> {
+    return this.transaction(async (client) => {
+      const current = await client.query(
+        'SELECT id, state, state_version FROM conversations WHERE room_id = $1 FOR UPDATE',
+        [delta.room_id]
+      )
+
+      const row = current.rows[0]
+      if (!row || !row.state || row.state_version !== delta.base_version) {
+        return null
+      }
+
+      const state = { ...row.state, ...delta.scalars }
+      state.extracted_entities = { ...(row.state.extracted_entities || {}), ...delta.entities }
+      for (const [field, items] of Object.entries(delta.append)) {
+        state[field] = [...(row.state[field] || []), ...items]
+      }
+
+      const sentimentScores: number[] = state.sentiment_scores || []
+      await client.query(
+        `UPDATE conversations 
+         SET state = $1,
+             state_version = $2,
+             scenario = $3,
+             total_words = $4,
+             sentiment_score = $5
+         WHERE id = $6`,
+        [
+          JSON.stringify(state),
+          delta.version,
+          state.current_scenario,
+          (state.conversation_history || []).length,
+          sentimentScores.length > 0 ? sentimentScores.reduce((a, b) => a + b) / sentimentScores.length : 0.0,
+          row.id
+        ]
+      )
+
+      return { conversation_id: row.id, new_actions: delta.append.business_actions || [] }
+    })
+  }
+
   async getConversationByRoomId(roomId: string): Promise<Conversation | null> {
     const result = await this.query(
       'SELECT * FROM conversations WHERE room_id = $1',
@@ -246,6 +307,36 @@ export class DatabaseClient {
     return result.rows[0].id
   }
 
+  async insertConversationMessages(messages: Array<{
+    conversation_id: number
+    speaker: string
+    message: string
+    transcript_confidence?: number
+    timestamp: Date
+    metadata: any
+  }>): Promise<number[]> {
+    if (messages.length === 0) {
+      return []
+    }
+
+    // Single multi-row INSERT keeps a turn's messages in one round trip
+    const values: any[] = []
+    const rows = messages.map((msg, i) => {
+      const offset = i * 6
+      values.push(msg.conversation_id, msg.speaker, msg.message, msg.transcript_confidence, msg.timestamp, JSON.stringify(msg.metadata))
+      return `($${offset + 1}, $${offset + 2}, $${offset + 3}, $${offset + 4}, $${offset + 5}, $${offset + 6})`
+    })
+
+    const result = await this.query(
+      `INSERT INTO conversation_messages (conversation_id, speaker, message, transcript_confidence, timestamp, metadata) 
+       VALUES ${rows.join(', ')} 
+       RETURNING id`,
+      values
+    )
+
+    return result.rows.map(row => row.id)
+  }
+
   async getConversationMessages(conversationId: number): Promise<ConversationMessage[]> {
     const result = await this.query(
       `SELECT * FROM conversation_messages 
@@ -260,6 +351,22 @@ export class DatabaseClient {
     }))
   }
 
+  // Messages in logging order, for paging through long conversations
+  async getConversationMessagesPage(conversationId: number, offset: number, limit: number | null): Promise<ConversationMessage[]> {
+    const result = await this.query(
+      `SELECT * FROM conversation_messages 
+       WHERE conversation_id = $1 
+       ORDER BY id ASC
+       OFFSET $2 LIMIT $3`,
+      [conversationId, offset, limit]
+    )
+
+    return result.rows.map(row => ({
+      ...row,
+      metadata: typeof row.metadata === 'string' ? JSON.parse(row.metadata) : row.metadata
+    }))
+  }
+
   async getMessageCount(conversationId: number): Promise<number> {
     const result = await this.query(
       'SELECT COUNT(*) as count FROM conversation_messages WHERE conversation_id = $1',
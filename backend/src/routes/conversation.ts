@@ -25,7 +25,24 @@ const conversationStateSchema = z.object({
   business_actions: z.array(z.any()),
   sentiment_scores: z.array(z.number()),
   session_start: z.string(),
-  last_activity: z.string()
+  last_activity: z.string(),
+  history_offset: z.number().int().optional(),
+  version: z.number().int().optional()
+})
+
+const conversationDeltaSchema = z.object({
+  type: z.literal('delta'),
+  room_id: z.string(),
+  base_version: z.number().int(),
+  version: z.number().int(),
+  scalars: z.record(z.any()),
+  entities: z.record(z.any()),
+  append: z.object({
+    conversation_history: z.array(z.any()).optional(),
+    business_actions: z.array(z.any()).optional(),
+    sentiment_scores: z.array(z.number()).optional(),
+    previous_scenarios: z.array(z.string()).optional()
+  })
 })
 
 const conversationMessageSchema = z.object({
@@ -74,10 +91,15 @@ router.post('/state', async (req, res) => {
       })
     }
     
+    // Keep the full state as the base for later deltas
+    const { version = 0, ...state } = stateData
+    await db.saveConversationState(stateData.room_id, state, version)
+    
     res.json({ 
       success: true, 
       conversation_id: conversationId,
-      customer_id: customerId 
+      customer_id: customerId,
+      version
     })
     
   } catch (error) {
@@ -89,6 +111,43 @@ router.post('/state', async (req, res) => {
   }
 })
 
+// Apply an incremental state update from the agent
+router.post('/state/delta', async (req, res) => {
+  try {
+    const delta = conversationDeltaSchema.parse(req.body)
+    
+    const result = await db.applyConversationDelta(delta)
+    
+    if (!result) {
+      // Agent resends a full snapshot on conflict
+      const conversation = await db.getConversationByRoomId(delta.room_id)
+      return res.status(409).json({ 
+        error: 'State version conflict',
+        current_version: conversation?.state_version ?? null
+      })
+    }
+    
+    // Only actions appended since the last version are new
+    for (const action of result.new_actions) {
+      await db.insertBusinessAction({
+        conversation_id: result.conversation_id,
+        action_type: action.type,
+        action_data: action,
+        status: 'completed'
+      })
+    }
+    
+    res.json({ success: true, version: delta.version })
+    
+  } catch (error) {
+    logger.error('Error applying conversation state delta:', error)
+    res.status(400).json({ 
+      error: 'Failed to apply conversation state delta',
+      message: error instanceof Error ? error.message : 'Unknown error'
+    })
+  }
+})
+
 // Load conversation state
 router.get('/state/:roomId', async (req, res) => {
   try {
@@ -102,6 +161,11 @@ router.get('/state/:roomId', async (req, res) => {
       return res.status(404).json({ error: 'Conversation not found' })
     }
     
+    // Agent-synced state is authoritative when present
+    if (conversation.state) {
+      return res.json({ ...conversation.state, version: conversation.state_version })
+    }
+    
     // Get customer details
     const customer = await db.getCustomerById(conversation.customer_id)
     
@@ -149,6 +213,11 @@ router.get('/state/:roomId', async (req, res) => {
   }
 })
 
+const conversationMessageBatchSchema = z.object({
+  room_id: z.string(),
+  messages: z.array(conversationMessageSchema.omit({ room_id: true })).max(500)
+})
+
 // Log conversation message
 router.post('/message', async (req, res) => {
   try {
@@ -184,6 +253,74 @@ router.post('/message', async (req, res) => {
   }
 })
 
+// Log a batch of conversation messages for one room
+router.post('/messages/batch', async (req, res) => {
+  try {
+    const batchData = conversationMessageBatchSchema.parse(req.body)
+    
+    logger.info(`Logging ${batchData.messages.length} messages for room ${batchData.room_id}`)
+    
+    const conversation = await db.getConversationByRoomId(batchData.room_id)
+    
+    if (!conversation) {
+      return res.status(404).json({ error: 'Conversation not found' })
+    }
+    
+    const ids = await db.insertConversationMessages(batchData.messages.map(messageData => ({
+      conversation_id: conversation.id,
+      speaker: messageData.speaker,
+      message: messageData.message,
+      transcript_confidence: messageData.metadata.confidence || null,
+      timestamp: new Date(messageData.timestamp),
+      metadata: messageData.metadata
+    })))
+    
+    res.json({ success: true, inserted: ids.length })
+    
+  } catch (error) {
+    logger.error('Error logging conversation messages:', error)
+    res.status(400).json({ 
+      error: 'Failed to log messages',
+      message: error instanceof Error ? error.message : 'Unknown error'
+    })
+  }
+})
+
+// Page through a conversation's logged messages (the agent keeps only recent turns in memory)
+router.get('/messages/:roomId', async (req, res) => {
+  try {
+    const { roomId } = req.params
+    const offset = Math.max(0, parseInt(req.query.offset as string) || 0)
+    const limit = req.query.limit !== undefined ? Math.min(1000, Math.max(0, parseInt(req.query.limit as string) || 0)) : null
+    
+    const conversation = await db.getConversationByRoomId(roomId)
+    if (!conversation) {
+      return res.status(404).json({ error: 'Conversation not found' })
+    }
+    
+    const messages = await db.getConversationMessagesPage(conversation.id, offset, limit)
+    
+    res.json({
+      room_id: roomId,
+      offset,
+      messages: messages.map(msg => ({
+        room_id: roomId,
+        speaker: msg.speaker,
+        message: msg.message,
+        metadata: msg.metadata,
+        timestamp: msg.timestamp
+      }))
+    })
+    
+  } catch (error) {
+    logger.error('Error loading conversation messages:', error)
+    res.status(500).json({ 
+      error: 'Failed to load conversation messages',
+      message: error instanceof Error ? error.message : 'Unknown error'
+    })
+  }
+})
+
 // Get conversation analytics
 router.get('/analytics/:roomId', async (req, res) => {
   try {
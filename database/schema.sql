@@ -22,7 +22,9 @@ CREATE TABLE conversations (
     ended_at TIMESTAMP,
     duration_seconds INTEGER,
     total_words INTEGER DEFAULT 0,
-    sentiment_score FLOAT DEFAULT 0.0
+    sentiment_score FLOAT DEFAULT 0.0,
+    state JSONB,                      -- latest agent-side CustomerContext
+    state_version INTEGER DEFAULT 0   -- version of state, for delta sync
 );
 
 -- Conversation messages table
@@ -0,0 +1,309 @@
+"""
+Context Layer Redis Round-Trip Benchmark for VoiceFlow Pro
+
+Drives AdvancedContextManager against an in-process stand-in Redis client:
+- Seeded per-round-trip latency, counting every command and round trip
+- build_comprehensive_context (one MGET) against the original sequential
+  per-layer GETs: same layers returned, round trips and latency per call
+- Concurrent sessions storing context: writes issued together coalesce into
+  one pipeline; the last payload per key wins and every TTL is applied
+- Near cache: the same reads served from decoded layers in memory, and
+  invalidation checks for local writes and for another process's writes
+  (delivered as keyspace notifications by the stand-in)
+- The manager's own round-trip, latency and cache statistics
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agents"))
+
+from context_manager import AdvancedContextManager, ContextType  # noqa: E402
+from service_registry import services  # noqa: E402
+from latency_sketch import LatencyHistogram  # noqa: E402
+
+
+class StandInRedis:
+    """The subset of the aioredis client the context manager uses, over a dict"""
+
+    def __init__(self, latency_ms: float, seed: int):
+        self.latency_ms = latency_ms
+        self.rng = random.Random(seed)
+        self.data: Dict[str, bytes] = {}
+        self.ttls: Dict[str, Optional[int]] = {}
+        self.round_trips = 0
+        self.commands = 0
+        self.subscribers: List[asyncio.Queue] = []
+
+    async def _round_trip(self, commands: int = 1):
+        self.round_trips += 1
+        self.commands += commands
+        if self.latency_ms:
+            await asyncio.sleep(self.rng.uniform(0.5, 1.5) * self.latency_ms / 1000)
+
+    def _set(self, key: str, value: Any, ttl: Optional[int]):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        self.ttls[key] = ttl
+        # notify-keyspace-events K$g
+        for queue in self.subscribers:
+            queue.put_nowait({"type": "pmessage", "pattern": b"__keyspace@*__:ctx:*",
+                              "channel": f"__keyspace@0__:{key}".encode(), "data": b"set"})
+
+    def external_set(self, key: str, value: Any):
+        """A write by another process"""
+        self._set(key, value, self.ttls.get(key))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        await self._round_trip()
+        return self.data.get(key)
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        await self._round_trip()
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key: str, value: Any):
+        await self._round_trip()
+        self._set(key, value, None)
+
+    async def setex(self, key: str, ttl: int, value: Any):
+        await self._round_trip()
+        self._set(key, value, ttl)
+
+    def pipeline(self, transaction: bool = True) -> "StandInPipeline":
+        return StandInPipeline(self)
+
+    def pubsub(self) -> "StandInPubSub":
+        return StandInPubSub(self)
+
+    async def close(self):
+        pass
+
+
+class StandInPipeline:
+    """Buffers set/setex and applies them in one round trip"""
+
+    def __init__(self, redis: StandInRedis):
+        self.redis = redis
+        self.commands: List[Tuple[str, Any, Optional[int]]] = []
+
+    def set(self, key: str, value: Any) -> "StandInPipeline":
+        self.commands.append((key, value, None))
+        return self
+
+    def setex(self, key: str, ttl: int, value: Any) -> "StandInPipeline":
+        self.commands.append((key, value, ttl))
+        return self
+
+    async def execute(self) -> List[bool]:
+        await self.redis._round_trip(len(self.commands))
+        for key, value, ttl in self.commands:
+            self.redis._set(key, value, ttl)
+        return [True] * len(self.commands)
+
+
+class StandInPubSub:
+    """Keyspace notifications for every key (patterns are not matched)"""
+
+    def __init__(self, redis: StandInRedis):
+        self.redis = redis
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def psubscribe(self, pattern: str):
+        self.redis.subscribers.append(self.queue)
+        self.queue.put_nowait({"type": "psubscribe", "pattern": None, "channel": pattern.encode(), "data": 1})
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def close(self):
+        if self.queue in self.redis.subscribers:
+            self.redis.subscribers.remove(self.queue)
+
+
+def layer_data(customer: int, context_type: ContextType, rng: random.Random) -> Dict[str, Any]:
+    return {
+        "layer": context_type.value,
+        "customer": customer,
+        "conversation_turns": [{"user_message": "m" * rng.randint(20, 200), "scenario": "sales"}
+                               for _ in range(rng.randint(1, 10))],
+        "session_summary": "s" * rng.randint(50, 400)
+    }
+
+
+async def sequential_layers(manager: AdvancedContextManager, customer_id: str,
+                            session_id: str) -> Dict[str, Any]:
+    """The original build_comprehensive_context: one GET and JSON decode per layer"""
+    contexts = {}
+    for context_type in ContextType:
+        key = manager.context_keys[context_type].format(customer_id=customer_id, session_id=session_id)
+        data = await manager.redis_client.get(key)
+        if data:
+            contexts[context_type.value] = json.loads(data)
+    return contexts
+
+
+async def wait_for(condition, timeout: float = 1.0) -> bool:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(0.001)
+    return True
+
+
+async def check_invalidation(manager: AdvancedContextManager, redis: StandInRedis,
+                             rng: random.Random) -> List[str]:
+    """Cached layers must change after a local write and after another process's write"""
+    failures = []
+    customer_id, session_id = "customer-0", "session-0"
+    key = manager.context_keys[ContextType.MEDIUM_TERM].format(customer_id=customer_id, session_id=session_id)
+
+    await manager.build_comprehensive_context(customer_id, session_id)
+    data = layer_data(0, ContextType.MEDIUM_TERM, rng)
+    await manager.store_context(customer_id, session_id, ContextType.MEDIUM_TERM, data)
+    layers = (await manager.build_comprehensive_context(customer_id, session_id))["context_layers"]
+    if layers["medium_term"]["session_summary"] != data["session_summary"]:
+        failures.append("a local write did not invalidate the near cache")
+
+    data = layer_data(0, ContextType.MEDIUM_TERM, rng)
+    invalidations = manager.near_cache.cache_stats["invalidations"]
+    redis.external_set(key, json.dumps(data))
+    if not await wait_for(lambda: manager.near_cache.cache_stats["invalidations"] > invalidations):
+        failures.append("no keyspace notification reached the near cache")
+    layers = (await manager.build_comprehensive_context(customer_id, session_id))["context_layers"]
+    if layers["medium_term"]["session_summary"] != data["session_summary"]:
+        failures.append("another process's write did not invalidate the near cache")
+    return failures
+
+
+async def store_all(manager: AdvancedContextManager, customers: int, rng: random.Random,
+                    expected: Dict[str, Tuple[ContextType, Dict[str, Any]]]):
+    """Every customer's session stores all its layers concurrently, twice per layer"""
+    writes = []
+    for customer in range(customers):
+        customer_id, session_id = f"customer-{customer}", f"session-{customer}"
+        for context_type in ContextType:
+            key = manager.context_keys[context_type].format(customer_id=customer_id, session_id=session_id)
+            # The last payload of a key (the global layer is one key for everyone) wins
+            for _ in range(2):
+                data = layer_data(customer, context_type, rng)
+                expected[key] = (context_type, data)
+                writes.append(manager.store_context(customer_id, session_id, context_type, data))
+    await asyncio.gather(*writes)
+
+
+async def run_benchmark(customers: int, reads: int, latency_ms: float, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    # No LLM calls are made here
+    services.provide("openai_client", object())
+    redis = StandInRedis(latency_ms, seed)
+    manager = AdvancedContextManager()
+    manager.near_cache_ttls = dict.fromkeys(ContextType, 0)
+    await manager.initialize(redis)
+    cached = AdvancedContextManager(keyspace_invalidation=True)
+    await cached.initialize(redis)
+
+    failures = []
+    expected: Dict[str, Tuple[ContextType, Dict[str, Any]]] = {}
+    start = time.perf_counter()
+    await store_all(manager, customers, rng, expected)
+    store_seconds = time.perf_counter() - start
+    store_round_trips = redis.round_trips
+    writes = customers * len(ContextType) * 2
+
+    for key, (context_type, data) in expected.items():
+        stored = json.loads(redis.data[key]) if key in redis.data else None
+        if stored is None or stored["session_summary"] != data["session_summary"]:
+            failures.append(f"{key}: stored payload is not the last one written")
+        retention = manager.retention_periods[context_type]
+        if redis.ttls.get(key) != (int(retention.total_seconds()) if retention else None):
+            failures.append(f"{key}: TTL {redis.ttls.get(key)} not applied")
+
+    modes = {
+        "sequential": lambda customer_id, session_id: sequential_layers(manager, customer_id, session_id),
+        "mget": manager.build_comprehensive_context,
+        "near_cache": cached.build_comprehensive_context,
+    }
+    latency = {name: LatencyHistogram() for name in modes}
+    round_trips = dict.fromkeys(modes, 0)
+    for _ in range(reads):
+        customer = rng.randrange(customers)
+        customer_id, session_id = f"customer-{customer}", f"session-{customer}"
+
+        layers = {}
+        for name, read in modes.items():
+            before, start = redis.round_trips, time.perf_counter()
+            result = await read(customer_id, session_id)
+            latency[name].record((time.perf_counter() - start) * 1000)
+            round_trips[name] += redis.round_trips - before
+            layers[name] = result if name == "sequential" else result["context_layers"]
+
+        if len(layers["sequential"]) != len(ContextType):
+            failures.append(f"{customer_id}: stored layers are missing")
+        for name in ("mget", "near_cache"):
+            if layers[name] != layers["sequential"]:
+                failures.append(f"{customer_id}: {name} layers differ from sequential GETs")
+
+    failures.extend(await check_invalidation(cached, redis, rng))
+
+    await manager.close()
+    await cached.close()
+    return {
+        "customers": customers,
+        "reads": reads,
+        "latency_ms": latency_ms,
+        "writes": writes,
+        "store_round_trips": store_round_trips,
+        "store_seconds": store_seconds,
+        "round_trips_per_read": {name: count / reads for name, count in round_trips.items()},
+        "read_latency_ms": {name: histogram.summary() for name, histogram in latency.items()},
+        "manager": manager.get_statistics(),
+        "near_cache": cached.get_statistics()["near_cache"],
+        "failures": failures
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Context layer Redis round-trip benchmark")
+    parser.add_argument("--customers", type=int, default=50, help="Concurrent sessions storing context")
+    parser.add_argument("--reads", type=int, default=200, help="build_comprehensive_context calls")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Stand-in Redis round-trip latency")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run_benchmark(args.customers, args.reads, args.latency_ms, args.seed))
+
+    print(f"{results['writes']} context writes from {results['customers']} sessions in "
+          f"{results['store_round_trips']} round trips ({results['store_seconds'] * 1000:.1f}ms), "
+          f"{results['manager']['coalesced_writes']} superseded")
+    for name, summary in results["read_latency_ms"].items():
+        print(f"{name:>10}: {results['round_trips_per_read'][name]:.2f} round trips per call, "
+              f"p50 {summary['p50']:.3f}ms  p95 {summary['p95']:.3f}ms")
+    cache = results["near_cache"]
+    print(f"near cache: {cache['hit_rate']:.1%} hits, {cache['entries']} entries ({cache['bytes']} bytes), "
+          f"{cache['evictions']} evictions, {cache['expirations']} expired, {cache['invalidations']} invalidations")
+
+    if results["failures"]:
+        print("\nfailures:")
+        for failure in results["failures"][:20]:
+            print(f"  {failure}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    sys.exit(1 if results["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+CustomerContext Serialization Benchmark and Round-Trip Check for VoiceFlow Pro
+
+Compares the slotted CustomerContext encodings with the original dataclass
+(asdict + JSON, loaded back through the constructor):
+- Round-trip checks for the JSON and binary encodings: every field equal,
+  enums and datetimes restored, undecoded history re-encoded byte for byte,
+  unknown schema versions rejected
+- Encode/decode time and payload size at 10, 100 and 1000 turns
+- Lazy history: decode cost with and without touching the history
+- Bounded history: the default in-memory window against the full log
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable
+
+import msgpack
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agents"))
+
+from customer_context import CustomerContext, Scenario, Priority, CONTEXT_SCHEMA_VERSION  # noqa: E402
+from conversation_history import ConversationHistory  # noqa: E402
+
+
+@dataclass
+class ReferenceCustomerContext:
+    """The original dataclass serialization, kept as the baseline"""
+    name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    company: Optional[str] = None
+    title: Optional[str] = None
+    current_scenario: Scenario = Scenario.ONBOARDING
+    previous_scenarios: List[Scenario] = None
+    lead_score: int = 0
+    priority: Priority = Priority.MEDIUM
+    conversation_history: List[Dict] = None
+    extracted_entities: Dict[str, Any] = None
+    business_actions: List[Dict] = None
+    sentiment_scores: List[float] = None
+    room_id: Optional[str] = None
+    participant_id: Optional[str] = None
+    session_start: Optional[datetime] = None
+    last_activity: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        if self.session_start:
+            data['session_start'] = self.session_start.isoformat()
+        if self.last_activity:
+            data['last_activity'] = self.last_activity.isoformat()
+        data['current_scenario'] = self.current_scenario.value
+        data['priority'] = self.priority.value
+        data['previous_scenarios'] = [s.value for s in self.previous_scenarios]
+        return data
+
+
+def build_context(turns: int, seed: int, bounded: bool = True) -> CustomerContext:
+    """Same content for the same seed; unbounded contexts keep the whole history in memory"""
+    rng = random.Random(seed)
+    start = datetime(2025, 3, 14, 9, 26, 53, 589793)
+    context = CustomerContext(
+        name="Dana Reyes", email="dana@example.com", phone="555-0100", company="Acme Logistics",
+        title="Head of Operations", current_scenario=Scenario.SALES,
+        previous_scenarios=[Scenario.ONBOARDING, Scenario.SUPPORT], lead_score=72, priority=Priority.HIGH,
+        extracted_entities={"email": ["dana@example.com"], "company_size": ["250"], "budget": "$40k"},
+        room_id="room-bench", participant_id="caller-bench", session_start=start
+    )
+    context.last_activity = start + timedelta(minutes=turns, microseconds=7)
+    if not bounded:
+        context.conversation_history.configure(max_entries=sys.maxsize, max_bytes=sys.maxsize)
+    for turn in range(turns):
+        scenario = rng.choice(list(Scenario)).value
+        timestamp = (start + timedelta(seconds=turn * 20)).isoformat()
+        context.conversation_history.extend([
+            {"speaker": "customer", "message": f"question {turn} " + "w" * rng.randint(20, 160),
+             "timestamp": timestamp, "scenario": scenario},
+            {"speaker": "agent", "message": f"answer {turn} " + "w" * rng.randint(60, 300),
+             "timestamp": timestamp, "scenario": scenario}
+        ])
+        context.sentiment_scores.append(round(rng.uniform(-1, 1), 3))
+        if turn % 5 == 0:
+            context.business_actions.append({"type": "lead_updated", "score": turn, "timestamp": timestamp})
+    return context
+
+
+def reference_of(context: CustomerContext) -> ReferenceCustomerContext:
+    """Dataclass copy of an unbounded context"""
+    fields = {field: getattr(context, field) for field in CustomerContext.FIELDS}
+    fields["conversation_history"] = context.conversation_history.window
+    return ReferenceCustomerContext(**fields)
+
+
+def check_round_trips(turns: int, seed: int) -> List[str]:
+    failures = []
+    context = build_context(turns, seed)
+    full = build_context(turns, seed, bounded=False)
+
+    restored = CustomerContext.from_dict(json.loads(json.dumps(context.to_dict())))
+    if restored != context:
+        failures.append("JSON round trip changed a field")
+    if not isinstance(restored.current_scenario, Scenario) or not isinstance(restored.priority, Priority):
+        failures.append("JSON round trip did not restore enums")
+    if not all(isinstance(value, datetime) for value in (restored.session_start, restored.last_activity)):
+        failures.append("JSON round trip did not restore datetimes")
+    if CustomerContext.from_dict({**context.to_dict(), "version": 3}) != context:
+        failures.append("from_dict does not ignore the backend's version key")
+
+    # The original dataclass output (whole history) must load into the same bounded window
+    if CustomerContext.from_dict(json.loads(json.dumps(reference_of(full).to_dict()))) != context:
+        failures.append("original to_dict output does not load")
+    if len(context.conversation_history) != len(full.conversation_history):
+        failures.append("bounded history length is not absolute")
+    if context.conversation_history[len(full.conversation_history) - 1:] != full.conversation_history[-1:]:
+        failures.append("bounded history lost its newest entry")
+    if context.conversation_history.offset and not isinstance(
+            CustomerContext.from_bytes(context.to_bytes()).conversation_history, ConversationHistory):
+        failures.append("binary round trip did not restore the bounded history")
+
+    encoded = context.to_bytes()
+    decoded = CustomerContext.from_bytes(encoded)
+    if decoded.history_decoded:
+        failures.append("binary decode eagerly decoded the history")
+    if decoded.to_bytes() != encoded:
+        failures.append("re-encoding an undecoded history changed the bytes")
+    if decoded != context:
+        failures.append("binary round trip changed a field")
+    if decoded.session_start != context.session_start or decoded.last_activity != context.last_activity:
+        failures.append("binary round trip changed a datetime")
+
+    appended = CustomerContext.from_bytes(encoded)
+    appended.conversation_history.append({"speaker": "agent", "message": "appended"})
+    if CustomerContext.from_bytes(appended.to_bytes()).conversation_history[-1]["message"] != "appended":
+        failures.append("history appended after decode was not encoded")
+
+    fields = msgpack.unpackb(encoded, raw=False)
+    try:
+        CustomerContext.from_bytes(msgpack.packb([CONTEXT_SCHEMA_VERSION + 1] + fields[1:], use_bin_type=True))
+        failures.append("unknown schema version was accepted")
+    except ValueError:
+        pass
+    if CustomerContext.from_bytes(msgpack.packb(fields + ["future field"], use_bin_type=True)) != context:
+        failures.append("trailing unknown fields are not ignored")
+    return failures
+
+
+def time_call(fnc: Callable[[], Any], min_seconds: float) -> float:
+    """Median microseconds per call over at least ``min_seconds``"""
+    samples = []
+    deadline = time.perf_counter() + min_seconds
+    while time.perf_counter() < deadline or len(samples) < 5:
+        start = time.perf_counter()
+        fnc()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def benchmark(turns: int, min_seconds: float, seed: int) -> Dict[str, Any]:
+    context = build_context(turns, seed, bounded=False)
+    reference = reference_of(context)
+    bounded = build_context(turns, seed)
+
+    reference_json = json.dumps(reference.to_dict())
+    slotted_json = json.dumps(context.to_dict())
+    encoded = context.to_bytes()
+    undecoded = CustomerContext.from_bytes(encoded)
+
+    def reference_load():
+        data = json.loads(reference_json)
+        return ReferenceCustomerContext(**data)
+
+    return {
+        "turns": turns,
+        "bytes": {"json": len(reference_json.encode()), "binary": len(encoded),
+                  "binary_window": len(bounded.to_bytes())},
+        "encode_us": {
+            "dataclass_json": time_call(lambda: json.dumps(reference.to_dict()), min_seconds),
+            "slotted_json": time_call(lambda: json.dumps(context.to_dict()), min_seconds),
+            "binary": time_call(context.to_bytes, min_seconds),
+            "binary_undecoded_history": time_call(undecoded.to_bytes, min_seconds),
+            "binary_window": time_call(bounded.to_bytes, min_seconds),
+        },
+        "decode_us": {
+            "dataclass_json": time_call(reference_load, min_seconds),
+            "slotted_json": time_call(lambda: CustomerContext.from_dict(json.loads(slotted_json)), min_seconds),
+            "binary_lazy": time_call(lambda: CustomerContext.from_bytes(encoded), min_seconds),
+            "binary_with_history": time_call(
+                lambda: CustomerContext.from_bytes(encoded).conversation_history, min_seconds),
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="CustomerContext serialization benchmark")
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--min-seconds", type=float, default=0.2, help="Timing budget per measurement")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    failures = []
+    for turns in [0] + args.turns:
+        failures.extend(f"{turns} turns: {failure}" for failure in check_round_trips(turns, args.seed + turns))
+    print(f"round trips: {'ok' if not failures else f'{len(failures)} failures'}")
+    for failure in failures:
+        print(f"  {failure}")
+
+    results = [benchmark(turns, args.min_seconds, args.seed + turns) for turns in args.turns]
+    columns = [("encode_us", "dataclass_json", "enc dc+json"), ("encode_us", "slotted_json", "enc json"),
+               ("encode_us", "binary", "enc bin"), ("encode_us", "binary_undecoded_history", "enc bin lazy"),
+               ("encode_us", "binary_window", "enc bin win"),
+               ("decode_us", "dataclass_json", "dec dc+json"), ("decode_us", "slotted_json", "dec json"),
+               ("decode_us", "binary_lazy", "dec bin lazy"), ("decode_us", "binary_with_history", "dec bin+hist")]
+    print(f"\n{'turns':>6}{'json B':>9}{'bin B':>9}{'win B':>9}" + "".join(f"{title:>14}" for _, _, title in columns)
+          + "   (median us)")
+    for result in results:
+        print(f"{result['turns']:>6}{result['bytes']['json']:>9}{result['bytes']['binary']:>9}"
+              f"{result['bytes']['binary_window']:>9}"
+              + "".join(f"{result[group][name]:>14.1f}" for group, name, _ in columns))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results, "failures": failures}, f, indent=2)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Background Context Summarization Benchmark for VoiceFlow Pro
+
+Drives AdvancedContextManager.generate_context_aware_response with a
+stand-in OpenAI client and the stand-in Redis of context_redis_benchmark:
+- Seeded reply and summarization latency, counting every request
+- Reply-path latency per turn against the original inline maintenance
+  (three sequential summarization calls before the reply returns)
+- Concurrent sessions with turns arriving faster than summaries complete:
+  how many turns each structured summarization request covers
+- Every turn stored with a summary (a fallback one when the structured
+  reply is malformed), and the session summary reaching the next prompt
+  from memory
+- Rolling summaries (new turns folded into the previous summary, rebuilt
+  after the drift threshold) against rebuilding the summary every time:
+  tokens per turn and summarization latency early and late in a session
+- The summarizer's batch, failure, staleness, latency and token statistics
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agents"))
+
+from context_manager import AdvancedContextManager, ContextType  # noqa: E402
+from customer_context import CustomerContext, Scenario  # noqa: E402
+from service_registry import services  # noqa: E402
+from latency_sketch import LatencyHistogram  # noqa: E402
+from context_redis_benchmark import StandInRedis  # noqa: E402
+
+
+class StandInOpenAI:
+    """
+    chat.completions.create with seeded latency per model; JSON requests get a
+    structured summary. Usage counts four characters as a token, and
+    summarization latency grows with the prompt by ``ms_per_token``.
+    """
+
+    def __init__(self, reply_ms: float, summary_ms: float, ms_per_token: float, failure_rate: float, seed: int):
+        self.reply_ms = reply_ms
+        self.summary_ms = summary_ms
+        self.ms_per_token = ms_per_token
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.requests = {"reply": 0, "summary": 0}
+        self.malformed = 0
+        # Latest turn of a structured request -> (tokens per turn, latency ms) of each request
+        self.by_turn: Dict[int, List[Tuple[float, float]]] = {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model: str, messages: List[Dict[str, str]], response_format: Optional[Dict] = None,
+                     **kwargs) -> Any:
+        summary = model == "gpt-3.5-turbo"
+        structured = response_format is not None
+        self.requests["summary" if summary else "reply"] += 1
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        latency_ms = self.summary_ms + self.ms_per_token * prompt_tokens if summary else self.reply_ms
+        latency_ms *= self.rng.uniform(0.5, 1.5)
+        await asyncio.sleep(latency_ms / 1000)
+
+        if not structured:
+            content = f"Reply to: {messages[-1]['content']}"
+        elif self.rng.random() < self.failure_rate:
+            self.malformed += 1
+            content = '{"turn_summaries": ['
+        else:
+            turns = messages[-1]["content"].split("New turns:\n", 1)[1].count("\nCustomer: ")
+            content = json.dumps({
+                "turn_summaries": [f"summary {self.requests['summary']}.{i}: " + "s" * 80 for i in range(turns)],
+                "session_summary": f"session summary {self.requests['summary']}: " + "s" * 300,
+                "key_topics": ["pricing", "integration", "onboarding"]
+            })
+
+        completion_tokens = len(content) // 4
+        if structured:
+            turns = re.findall(r"message (\d+)\nAgent:", messages[-1]["content"])
+            self.by_turn.setdefault(max(map(int, turns)), []).append(
+                ((prompt_tokens + completion_tokens) / len(turns), latency_ms))
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    def growth(self, turns: int) -> Dict[str, Dict[str, float]]:
+        """Mean tokens per turn and latency of requests ending in the first and last third of a session"""
+        thirds = {"early": range(0, turns // 3), "late": range(turns - turns // 3, turns)}
+        growth = {}
+        for name, span in thirds.items():
+            samples = [sample for turn in span for sample in self.by_turn.get(turn, [])]
+            growth[name] = {
+                "tokens_per_turn": sum(tokens for tokens, _ in samples) / len(samples) if samples else 0.0,
+                "latency_ms": sum(latency for _, latency in samples) / len(samples) if samples else 0.0
+            }
+        return growth
+
+
+async def inline_maintenance(client: StandInOpenAI, message: str) -> None:
+    """The original reply path: reply, then exchange summary, session summary and topics"""
+    await client.create(model="gpt-4-turbo-preview", messages=[{"role": "user", "content": message}])
+    for _ in range(3):
+        await client.create(model="gpt-3.5-turbo", messages=[{"role": "user", "content": message}])
+
+
+async def run_session(manager: AdvancedContextManager, customer: int, turns: int, turn_gap_ms: float,
+                      rng: random.Random, latency: LatencyHistogram, failures: List[str]):
+    context = CustomerContext(room_id=f"room-{customer}", participant_id=f"customer-{customer}")
+    for turn in range(turns):
+        context.lead_score = turn
+        context.sentiment_scores.append(rng.uniform(-1, 1))
+        start = time.perf_counter()
+        response = await manager.generate_context_aware_response(
+            context, f"customer {customer} message {turn}", Scenario.SALES)
+        latency.record((time.perf_counter() - start) * 1000)
+        if not response.startswith("Reply to:"):
+            failures.append(f"room-{customer} turn {turn}: {response}")
+        await asyncio.sleep(rng.uniform(0, turn_gap_ms) / 1000)
+
+
+async def check_prompt(manager: AdvancedContextManager, redis: StandInRedis, customer: int, turns: int,
+                       max_turns: int) -> List[str]:
+    """The stored layer has every recent turn summarized; the next prompt has the session summary"""
+    failures = []
+    room_id, participant_id = f"room-{customer}", f"customer-{customer}"
+    key = manager.context_keys[ContextType.SHORT_TERM].format(customer_id=room_id, session_id=participant_id)
+    if key not in redis.data:
+        return [f"{room_id}: short-term layer was never stored"]
+
+    stored = json.loads(redis.data[key])
+    expected = [f"customer {customer} message {turn}" for turn in range(turns)][-max_turns:]
+    if [turn["user_message"] for turn in stored["conversation_turns"]] != expected:
+        failures.append(f"{room_id}: stored turns are not the last {max_turns} in order")
+    if not all(turn.get("summary") for turn in stored["conversation_turns"]):
+        failures.append(f"{room_id}: a stored turn has no summary")
+    if stored.get("lead_score_progression") != [turns - 1]:
+        failures.append(f"{room_id}: layer fields are not from the latest turn")
+
+    full_context = await manager.build_comprehensive_context(room_id, participant_id)
+    prompt = manager._build_contextual_prompt(
+        CustomerContext(room_id=room_id, participant_id=participant_id), "next", Scenario.SALES, full_context)
+    if f"Session summary: {stored['session_summary']}" not in prompt:
+        failures.append(f"{room_id}: the next prompt does not have the session summary")
+    return failures
+
+
+async def run_policy(sessions: int, turns: int, reply_ms: float, summary_ms: float, ms_per_token: float,
+                     turn_gap_ms: float, failure_rate: float, drift_turns: int, seed: int) -> Dict[str, Any]:
+    """Every session's turns through one manager summarizing with ``drift_turns``"""
+    rng = random.Random(seed)
+    client = StandInOpenAI(reply_ms, summary_ms, ms_per_token, failure_rate, seed)
+    services.provide("openai_client", client)
+    redis = StandInRedis(1.0, seed)
+    manager = AdvancedContextManager(summary_drift_turns=drift_turns)
+    await manager.initialize(redis)
+
+    failures: List[str] = []
+    latency = LatencyHistogram()
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(manager, customer, turns, turn_gap_ms, rng, latency, failures)
+                           for customer in range(sessions)))
+    await manager.summarizer.drain()
+    elapsed = time.perf_counter() - start
+
+    for customer in range(sessions):
+        failures.extend(await check_prompt(manager, redis, customer, turns, manager.summarizer.max_turns))
+
+    statistics = manager.get_statistics()["summarizer"]
+    if statistics["turns_summarized"] != sessions * turns:
+        failures.append(f"{statistics['turns_summarized']} of {sessions * turns} turns summarized")
+    if statistics["failures"] != client.malformed:
+        failures.append(f"{client.malformed} malformed summaries, {statistics['failures']} failures counted")
+
+    await manager.close()
+    return {
+        "drift_turns": drift_turns,
+        "seconds": elapsed,
+        "requests": client.requests,
+        "malformed": client.malformed,
+        "turn_latency_ms": latency.summary(),
+        "growth": client.growth(turns),
+        "summarizer": statistics,
+        "failures": [f"drift {drift_turns}: {failure}" for failure in failures]
+    }
+
+
+async def run_benchmark(sessions: int, turns: int, reply_ms: float, summary_ms: float, ms_per_token: float,
+                        turn_gap_ms: float, failure_rate: float, drift_turns: int, seed: int) -> Dict[str, Any]:
+    # The original path: reply, then three summarization calls, on its own client
+    inline = LatencyHistogram()
+    baseline = StandInOpenAI(reply_ms, summary_ms, ms_per_token, 0.0, seed)
+    for turn in range(min(turns, 20)):
+        start = time.perf_counter()
+        await inline_maintenance(baseline, f"message {turn}")
+        inline.record((time.perf_counter() - start) * 1000)
+
+    policies = {
+        "rebuild": await run_policy(sessions, turns, reply_ms, summary_ms, ms_per_token, turn_gap_ms,
+                                    failure_rate, 1, seed),
+        "rolling": await run_policy(sessions, turns, reply_ms, summary_ms, ms_per_token, turn_gap_ms,
+                                    failure_rate, drift_turns, seed),
+    }
+
+    failures = [failure for policy in policies.values() for failure in policy["failures"]]
+    rolling, rebuild = policies["rolling"]["growth"], policies["rebuild"]["growth"]
+    if turns >= 6 and rolling["late"]["tokens_per_turn"] >= rebuild["late"]["tokens_per_turn"]:
+        failures.append("rolling summaries cost as many tokens per turn late in a session as rebuilding")
+
+    return {
+        "sessions": sessions,
+        "turns": turns,
+        "reply_ms": reply_ms,
+        "summary_ms": summary_ms,
+        "ms_per_token": ms_per_token,
+        "turn_gap_ms": turn_gap_ms,
+        "inline_turn_latency_ms": inline.summary(),
+        "policies": policies,
+        "failures": failures
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Background context summarization benchmark")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent sessions")
+    parser.add_argument("--turns", type=int, default=15, help="Turns per session")
+    parser.add_argument("--reply-ms", type=float, default=40.0, help="Stand-in reply latency")
+    parser.add_argument("--summary-ms", type=float, default=80.0, help="Stand-in summarization base latency")
+    parser.add_argument("--ms-per-token", type=float, default=0.1, help="Stand-in summarization latency per prompt token")
+    parser.add_argument("--turn-gap-ms", type=float, default=40.0, help="Longest pause between a session's turns")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="Share of malformed summaries")
+    parser.add_argument("--drift-turns", type=int, default=8, help="Turns folded in before a full re-summary")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.CRITICAL)
+    results = asyncio.run(run_benchmark(args.sessions, args.turns, args.reply_ms, args.summary_ms,
+                                        args.ms_per_token, args.turn_gap_ms, args.failure_rate,
+                                        args.drift_turns, args.seed))
+
+    inline = results["inline_turn_latency_ms"]
+    print(f"{'inline':>8}: reply path p50 {inline['p50']:.1f}ms  p95 {inline['p95']:.1f}ms")
+    for name, policy in results["policies"].items():
+        latency, summarizer, growth = policy["turn_latency_ms"], policy["summarizer"], policy["growth"]
+        print(f"{name:>8}: reply path p50 {latency['p50']:.1f}ms  p95 {latency['p95']:.1f}ms; "
+              f"{results['sessions'] * results['turns']} turns in {summarizer['batches']} requests "
+              f"({summarizer['turns_per_batch']:.2f} turns each, {summarizer['full_summaries']} full), "
+              f"{summarizer['failures']} failed ({policy['malformed']} malformed injected)")
+        print(f"{'':>10}tokens per turn early {growth['early']['tokens_per_turn']:.0f}, "
+              f"late {growth['late']['tokens_per_turn']:.0f}; summary latency early "
+              f"{growth['early']['latency_ms']:.1f}ms, late {growth['late']['latency_ms']:.1f}ms; "
+              f"staleness p95 {summarizer['staleness_ms']['p95']:.1f}ms")
+
+    if results["failures"]:
+        print("\nfailures:")
+        for failure in results["failures"][:20]:
+            print(f"  {failure}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    sys.exit(1 if results["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
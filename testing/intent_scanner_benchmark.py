@@ -0,0 +1,162 @@
+"""
+Intent Scanner Benchmark and Regression Check for VoiceFlow Pro
+
+Compares IntentClassifier's compiled single-pass scanner with the original
+per-pattern re.findall implementation:
+- Seeded regression corpus (business vocabulary, entities, punctuation, casing, Unicode)
+- Identical scenario, escalation and entity results required for every utterance
+- Utterances/sec for both implementations on the corpus and on typical turns
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import sys
+import time
+from typing import Dict, Any, List, Optional, Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agents"))
+
+from voice_agent import IntentClassifier, CustomerContext, Scenario  # noqa: E402
+
+
+class ReferenceIntentClassifier:
+    """The original findall-per-pattern classifier, kept as the oracle"""
+
+    def __init__(self, classifier: IntentClassifier):
+        self.intent_patterns = classifier.intent_patterns
+        self.entity_patterns = classifier.entity_patterns
+
+    def classify_intent(self, text: str, context: CustomerContext) -> Scenario:
+        text_lower = text.lower()
+        scenario_scores = {}
+
+        for scenario, patterns in self.intent_patterns.items():
+            score = 0
+            for pattern in patterns:
+                score += len(re.findall(pattern, text_lower, re.IGNORECASE))
+            scenario_scores[scenario] = score
+
+        if context.current_scenario in scenario_scores:
+            scenario_scores[context.current_scenario] *= 1.5
+
+        if any(word in text_lower for word in ['urgent', 'critical', 'emergency', 'manager', 'supervisor']):
+            return Scenario.ESCALATION
+
+        if max(scenario_scores.values()) > 0:
+            return max(scenario_scores, key=scenario_scores.get)
+
+        return context.current_scenario
+
+    def extract_entities(self, text: str) -> Dict[str, List[Any]]:
+        entities = {}
+        for entity_type, pattern in self.entity_patterns.items():
+            matches = re.findall(pattern, text, re.IGNORECASE)
+            if matches:
+                entities[entity_type] = matches
+        return entities
+
+
+# Phrases that exercise word boundaries, wildcards, casing and Unicode folding
+EDGE_PHRASES = [
+    "follow-up", "follow up", "followup", "check-in", "last time", "not working", "Managers",
+    "SUPERVISOR", "uRgEnt", "İstanbul", "straße", "café", "KELVIN", "K", "ſupport",
+    "jo@x.com", "a.b@c-d.org", "(555) 123-4567", "+1 555.123.4567", "555 1234",
+    "$1,000.00", "$12", "50 dollars", "3k", "2 million", "next Tuesday", "this week",
+    "12/05/2024", "3:30 pm", "10am", "Acme Corp", "Big Data Inc.", "Foo LLC", "Bar Co.",
+    "demo's", "rebook", "reviewed", "buyer", "company", "?", "!", ",", "...", "\n",
+]
+
+FILLER = ["a", "we", "need", "to", "it", "is", "the", "and", "hello", "yeah", "so"]
+
+TYPICAL_TURNS = [
+    "Hi, I'm interested in your enterprise plan",
+    "What does the pricing look like for fifty users?",
+    "Can we schedule a demo next Tuesday at 2 pm?",
+    "My email is jordan@example.com, thanks",
+    "Our integration is broken and the API returns an error",
+    "Yeah that sounds good to me",
+    "Could you tell me a little more about how onboarding works for a team our size",
+]
+
+
+def build_corpus(classifier: IntentClassifier, size: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    vocabulary = sorted({
+        word
+        for patterns in classifier.intent_patterns.values()
+        for pattern in patterns
+        for word in re.findall(r"[a-z]+(?:[ .-][a-z]+)?", pattern)
+    }) + EDGE_PHRASES
+
+    corpus = []
+    for _ in range(size):
+        words = [rng.choice(vocabulary) if rng.random() < 0.6 else rng.choice(FILLER)
+                 for _ in range(rng.randint(1, 30))]
+        utterance = " ".join(rng.choice([w, w.upper(), w.capitalize()]) for w in words)
+        if rng.random() < 0.5:
+            # Punctuation noise shifts word boundaries
+            utterance = "".join(c if rng.random() < 0.9 else rng.choice(" -.,@$") for c in utterance)
+        corpus.append(utterance)
+    return corpus + TYPICAL_TURNS
+
+
+async def check_equivalence(classifier: IntentClassifier, reference: ReferenceIntentClassifier,
+                            corpus: List[str]) -> List[Dict[str, Any]]:
+    mismatches = []
+    for text in corpus:
+        for scenario in (Scenario.ONBOARDING, Scenario.SALES, Scenario.FOLLOW_UP):
+            context = CustomerContext(current_scenario=scenario)
+            expected = (reference.extract_entities(text), reference.classify_intent(text, context))
+            actual = (classifier.extract_entities(text), await classifier.classify_intent(text, context))
+            if expected != actual:
+                mismatches.append({"text": text, "context": scenario.value,
+                                   "expected": repr(expected), "actual": repr(actual)})
+    return mismatches
+
+
+def utterances_per_second(process: Callable[[str], Any], corpus: List[str]) -> float:
+    start = time.perf_counter()
+    for text in corpus:
+        process(text)
+    return len(corpus) / (time.perf_counter() - start)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Intent scanner benchmark and regression check")
+    parser.add_argument("--corpus-size", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    classifier = IntentClassifier()
+    reference = ReferenceIntentClassifier(classifier)
+    corpus = build_corpus(classifier, args.corpus_size, args.seed)
+
+    mismatches = asyncio.run(check_equivalence(classifier, reference, corpus))
+    print(f"Regression corpus: {len(corpus)} utterances, {len(mismatches)} mismatches")
+    for mismatch in mismatches[:5]:
+        print(f"  {mismatch}")
+
+    context = CustomerContext()
+
+    def reference_turn(text):
+        reference.extract_entities(text)
+        reference.classify_intent(text, context)
+
+    def scanner_turn(text):
+        # Fresh text each call: no benefit from the per-turn scan cache
+        classifier.scanner.scan(text)
+
+    for name, texts in (("corpus", corpus), ("typical turns", TYPICAL_TURNS * 3000)):
+        baseline = utterances_per_second(reference_turn, texts)
+        scanned = utterances_per_second(scanner_turn, texts)
+        print(f"{name:<14} findall: {baseline:>10,.0f} utt/s   scanner: {scanned:>10,.0f} utt/s   "
+              f"speedup {scanned / baseline:.2f}x")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Worker Start-Up Benchmark for VoiceFlow Pro
+
+Measures what a fresh worker process pays before it can take a job:
+- Import time and RSS of each agents module in a clean interpreter
+- Import-time profile (python -X importtime) of the heaviest dependencies
+- Which deferred heavy dependencies the agents modules (wrongly) import at
+  module level, and which ones third-party packages load anyway
+- Optional prewarm of the worker resources registered in main.py
+- Pass/fail against an import-time and RSS budget
+
+Exits 1 when a measured module is over budget, or 2 when nothing measured
+was over budget but a module could not be imported at all.
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, Any, Iterable, List, Optional
+
+AGENTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agents")
+
+DEFAULT_MODULES = ["main", "voice_agent", "advanced_audio_processor", "performance_optimizer",
+                   "sentiment_analyzer", "context_manager"]
+
+# Deferred through lazy_imports; no agents module should import one at module level
+DEFERRED_MODULES = ["librosa", "soundfile", "scipy.signal", "textblob", "openai", "aioredis", "elevenlabs"]
+
+_CHILD = r"""
+import json, os, sys, time
+sys.path.insert(0, {agents_dir!r})
+sys.stderr.write("STARTUP_BEGIN\n")
+start = time.perf_counter()
+result = {{"module": {module!r}}}
+try:
+    module = __import__({module!r})
+    result["import_ms"] = (time.perf_counter() - start) * 1000
+    result["loaded_deferred"] = [name for name in {deferred!r} if name in sys.modules]
+    if {prewarm!r} and hasattr(module, "worker_resources"):
+        start = time.perf_counter()
+        module.worker_resources.prewarm({{}})
+        result["prewarm_ms"] = (time.perf_counter() - start) * 1000
+except Exception as e:
+    result["error"] = f"{{type(e).__name__}}: {{e}}"
+sys.stderr.write("STARTUP_END\n")
+agents_dir = os.path.realpath({agents_dir!r})
+result["local_modules"] = sorted(
+    name for name, loaded in list(sys.modules.items())
+    if os.path.dirname(os.path.realpath(getattr(loaded, "__file__", None) or "")) == agents_dir
+)
+try:
+    with open("/proc/self/statm") as f:
+        result["rss_mb"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+except OSError:
+    result["rss_mb"] = None
+print("STARTUP_RESULT " + json.dumps(result))
+"""
+
+
+def parse_importtime(stderr: str, top: int, exclude: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """
+    Top top-level packages by cumulative import time from ``-X importtime`` output.
+
+    A package counts only where it is imported outside itself, so its
+    submodules are not added twice. Packages in ``exclude`` (the agents
+    modules) are skipped so the profile ranks dependencies.
+    """
+    exclude = set(exclude)
+    # Only what the measured import (and prewarm) pulled in, not the interpreter or harness
+    lines = stderr.splitlines()
+    if "STARTUP_BEGIN" in lines:
+        lines = lines[lines.index("STARTUP_BEGIN") + 1:]
+    if "STARTUP_END" in lines:
+        lines = lines[:lines.index("STARTUP_END")]
+
+    entries = []
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            cumulative_us = int(cumulative)
+        except ValueError:
+            continue  # Header line
+        # One space after the separator, then two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip().split(".")[0], cumulative_us))
+
+    # Entries are listed after their children; reversed, every entry follows its ancestors
+    packages: Dict[str, int] = {}
+    ancestors: List[tuple] = []
+    for depth, package, cumulative_us in reversed(entries):
+        while ancestors and ancestors[-1][0] >= depth:
+            ancestors.pop()
+        if package not in exclude and all(package != parent for _, parent in ancestors):
+            packages[package] = packages.get(package, 0) + cumulative_us
+        ancestors.append((depth, package))
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"package": package, "cumulative_ms": us / 1000} for package, us in ranked]
+
+
+def module_level_imports(path: str) -> List[str]:
+    """Modules a source file imports when it is itself imported (function bodies excluded)"""
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+
+    imported = []
+    pending = list(tree.body)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            continue
+        if isinstance(node, ast.Import):
+            imported.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imported.append(node.module)
+            imported.extend(f"{node.module}.{alias.name}" for alias in node.names)
+        pending.extend(ast.iter_child_nodes(node))
+    return imported
+
+
+def eager_deferred_imports(local_modules: List[str]) -> Dict[str, List[str]]:
+    """Deferred modules that agents modules import directly, with the modules importing them"""
+    eager: Dict[str, List[str]] = {}
+    for module in local_modules:
+        path = os.path.join(AGENTS_DIR, f"{module}.py")
+        if not os.path.exists(path):
+            continue
+        for name in module_level_imports(path):
+            for deferred in DEFERRED_MODULES:
+                if name == deferred or name.startswith(f"{deferred}."):
+                    eager.setdefault(deferred, [])
+                    if module not in eager[deferred]:
+                        eager[deferred].append(module)
+    return eager
+
+
+def measure_module(module: str, prewarm: bool, top: int) -> Dict[str, Any]:
+    code = _CHILD.format(agents_dir=AGENTS_DIR, module=module, prewarm=prewarm, deferred=DEFERRED_MODULES)
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                             capture_output=True, text=True, cwd=AGENTS_DIR)
+
+    result: Dict[str, Any] = {"module": module, "error": "no result from child process"}
+    for line in process.stdout.splitlines():
+        if line.startswith("STARTUP_RESULT "):
+            result = json.loads(line[len("STARTUP_RESULT "):])
+    local_modules = result.get("local_modules", [])
+    # A module that failed to import is gone from sys.modules; still keep it out of its own profile
+    result["import_profile"] = parse_importtime(process.stderr, top, exclude=local_modules + [module])
+    # Only the repo's own module-level imports can be deferred; a third-party package
+    # loading one (livekit.agents loads openai) is reported but is not a failure
+    result["eager_deferred"] = eager_deferred_imports(local_modules)
+    result["deferred_loaded_by_dependencies"] = [
+        name for name in result.get("loaded_deferred", []) if name not in result["eager_deferred"]
+    ]
+    return result
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Worker start-up benchmark")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--prewarm", action="store_true",
+                        help="Also run main.worker_resources.prewarm (needs API keys in the environment)")
+    # livekit-agents alone takes about 2s to import; this leaves the agents modules about 1s
+    parser.add_argument("--import-budget-ms", type=float, default=3000.0)
+    parser.add_argument("--rss-budget-mb", type=float, default=300.0)
+    parser.add_argument("--top", type=int, default=8, help="Packages to show in the import profile")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    results = [measure_module(module, args.prewarm, args.top) for module in args.modules]
+
+    failures = []
+    import_errors = []
+    print(f"{'module':<28}{'import ms':>12}{'rss MB':>10}{'prewarm ms':>12}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['module']:<28}  not measured")
+            import_errors.append(f"{result['module']}: {result['error']}")
+            continue
+        prewarm_ms = result.get("prewarm_ms")
+        print(f"{result['module']:<28}{result['import_ms']:>12.1f}{result['rss_mb'] or 0:>10.1f}"
+              f"{prewarm_ms if prewarm_ms is not None else float('nan'):>12.1f}")
+        if result["import_ms"] > args.import_budget_ms:
+            failures.append(f"{result['module']}: import {result['import_ms']:.0f}ms > {args.import_budget_ms:.0f}ms")
+        if result["rss_mb"] and result["rss_mb"] > args.rss_budget_mb:
+            failures.append(f"{result['module']}: RSS {result['rss_mb']:.0f}MB > {args.rss_budget_mb:.0f}MB")
+        for deferred, importers in result["eager_deferred"].items():
+            failures.append(f"{result['module']}: eagerly imports {deferred} (in {', '.join(importers)})")
+
+    for result in results:
+        if result["import_profile"]:
+            print(f"\nimport profile for {result['module']}:")
+            for entry in result["import_profile"]:
+                print(f"  {entry['package']:<24}{entry['cumulative_ms']:>10.1f}ms")
+        if result.get("deferred_loaded_by_dependencies"):
+            print(f"  deferred modules loaded by dependencies: {', '.join(result['deferred_loaded_by_dependencies'])}")
+
+    if failures:
+        print("\nover budget:")
+        for failure in failures:
+            print(f"  {failure}")
+    else:
+        print("\nall measured modules within budget")
+
+    if import_errors:
+        print("\ncould not import:")
+        for error in import_errors:
+            print(f"  {error}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results, "failures": failures, "import_errors": import_errors,
+                       "budget": {"import_ms": args.import_budget_ms, "rss_mb": args.rss_budget_mb}}, f, indent=2)
+
+    sys.exit(1 if failures else 2 if import_errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Offline Persistence Throughput Benchmark for VoiceFlow Pro
+
+Drives the embedded SQLite storage backend the way concurrent sessions do:
+- Per-turn message logs and versioned state snapshots/deltas for many rooms
+- Group-commit effect (compare with --max-batch 1, one transaction per write)
+- Optional in-process stand-in upstream with configurable latency, to
+  measure how long the background sync takes to drain the backlog
+- Consistency check: final local state versions and, with an upstream,
+  every message delivered in per-room order
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agents"))
+
+from storage_backend import StorageBackend, SQLiteStorageBackend  # noqa: E402
+from context_sync import UPDATE_SNAPSHOT, UPDATE_DELTA  # noqa: E402
+from latency_sketch import LatencyHistogram  # noqa: E402
+
+
+class StandInUpstream(StorageBackend):
+    """Records what the sync pushes, after a seeded per-request delay"""
+
+    name = "stand-in"
+
+    def __init__(self, latency_ms: float, seed: int):
+        self.latency_ms = latency_ms
+        self.rng = random.Random(seed)
+        self.versions: Dict[str, int] = {}
+        self.messages: Dict[str, List[int]] = {}
+
+    async def _delay(self):
+        if self.latency_ms:
+            await asyncio.sleep(self.rng.uniform(0.5, 1.5) * self.latency_ms / 1000)
+
+    async def save_conversation_update(self, update: Dict[str, Any]) -> bool:
+        await self._delay()
+        self.versions[update["room_id"]] = update["version"]
+        return True
+
+    async def log_conversation_messages(self, room_id: str, messages: List[Dict[str, Any]]) -> bool:
+        await self._delay()
+        self.messages.setdefault(room_id, []).extend(message["metadata"]["sequence"] for message in messages)
+        return True
+
+    async def load_conversation_state(self, room_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+
+def initial_state(room_id: str) -> Dict[str, Any]:
+    return {
+        "room_id": room_id,
+        "participant_id": f"bench-caller-{room_id}",
+        "current_scenario": "onboarding",
+        "conversation_history": [],
+        "extracted_entities": {},
+        "business_actions": [],
+        "sentiment_scores": [],
+        "previous_scenarios": [],
+        "lead_score": 0
+    }
+
+
+async def run_room(backend: SQLiteStorageBackend, room_id: str, turns: int,
+                   latency: LatencyHistogram, rng: random.Random) -> int:
+    """One session: per turn, log caller and agent messages, then save a state update"""
+    version = 1
+    await backend.save_conversation_update(
+        {"type": UPDATE_SNAPSHOT, "room_id": room_id, "version": version, "state": initial_state(room_id)})
+
+    sequence = 0
+    for turn in range(turns):
+        for speaker in ("customer", "agent"):
+            sequence += 1
+            start = time.perf_counter()
+            await backend.log_conversation_message({
+                "room_id": room_id,
+                "speaker": speaker,
+                "message": f"turn {turn} from {speaker} " + "x" * rng.randint(20, 200),
+                "metadata": {"sequence": sequence},
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+            })
+            latency.record((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await backend.save_conversation_update({
+            "type": UPDATE_DELTA,
+            "room_id": room_id,
+            "base_version": version,
+            "version": version + 1,
+            "scalars": {"lead_score": turn},
+            "entities": {},
+            "append": {"conversation_history": [{"turn": turn, "speaker": "agent"}]}
+        })
+        latency.record((time.perf_counter() - start) * 1000)
+        version += 1
+        # Callers do not talk back-to-back
+        await asyncio.sleep(rng.uniform(0, 0.002))
+    return version
+
+
+async def run_benchmark(rooms: int, turns: int, max_batch: int, upstream_latency_ms: Optional[float],
+                        seed: int, path: Optional[str]) -> Dict[str, Any]:
+    path = path or os.path.join(tempfile.mkdtemp(prefix="bench-storage-"), "agent.db")
+    upstream = StandInUpstream(upstream_latency_ms, seed) if upstream_latency_ms is not None else None
+    backend = SQLiteStorageBackend(path, upstream=upstream, max_batch=max_batch, sync_interval=0.05)
+    await backend.warm()
+
+    latency = LatencyHistogram()
+    wall_start = time.perf_counter()
+    versions = await asyncio.gather(*(run_room(backend, f"bench-room-{index}", turns, latency,
+                                               random.Random(seed + index)) for index in range(rooms)))
+    write_seconds = time.perf_counter() - wall_start
+
+    drain_seconds = None
+    if upstream is not None:
+        # Writes are done; time how long the background sync needs to catch up
+        drain_start = time.perf_counter()
+        while sum(len(sequences) for sequences in upstream.messages.values()) < rooms * turns * 2 \
+                or len(upstream.versions) < rooms or any(
+                    upstream.versions.get(f"bench-room-{index}") != version for index, version in enumerate(versions)):
+            await asyncio.sleep(0.01)
+            if time.perf_counter() - drain_start > 60:
+                break
+        drain_seconds = time.perf_counter() - drain_start
+
+    failures = []
+    for index, version in enumerate(versions):
+        room_id = f"bench-room-{index}"
+        state = await backend.load_conversation_state(room_id)
+        if state is None or state["version"] != version or len(state["conversation_history"]) != turns:
+            failures.append(f"{room_id}: local state version {state and state['version']} != {version}")
+        if upstream is not None:
+            if upstream.versions.get(room_id) != version:
+                failures.append(f"{room_id}: upstream version {upstream.versions.get(room_id)} != {version}")
+            if upstream.messages.get(room_id) != list(range(1, turns * 2 + 1)):
+                failures.append(f"{room_id}: upstream messages missing or out of order")
+
+    await backend.close()
+    writes = rooms * (turns * 3 + 1)
+    statistics = backend.get_statistics()
+    return {
+        "rooms": rooms,
+        "turns": turns,
+        "max_batch": max_batch,
+        "writes": writes,
+        "write_seconds": write_seconds,
+        "writes_per_second": writes / write_seconds if write_seconds else 0.0,
+        "write_latency_ms": latency.summary(),
+        "upstream_latency_ms": upstream_latency_ms,
+        "sync_drain_seconds": drain_seconds,
+        "storage": statistics,
+        "failures": failures
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline SQLite storage throughput benchmark")
+    parser.add_argument("--rooms", type=int, default=50, help="Concurrent sessions")
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--max-batch", type=int, default=512,
+                        help="Writes per transaction (1 disables group commit)")
+    parser.add_argument("--upstream-latency-ms", type=float,
+                        help="Sync to an in-process stand-in upstream with this per-request latency")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--path", help="Database file (default: a temporary directory)")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run_benchmark(args.rooms, args.turns, args.max_batch, args.upstream_latency_ms,
+                                        args.seed, args.path))
+
+    storage = results["storage"]
+    summary = results["write_latency_ms"]
+    print(f"{results['writes']} writes from {results['rooms']} rooms in {results['write_seconds']:.2f}s "
+          f"({results['writes_per_second']:.0f} writes/s)")
+    print(f"write latency p50 {summary['p50']:.2f}ms  p95 {summary['p95']:.2f}ms  p99 {summary['p99']:.2f}ms")
+    print(f"{storage['commits']} commits, {storage['writes_per_commit']['average']:.1f} writes per commit, "
+          f"commit p99 {storage['commit_ms']['p99']:.2f}ms")
+    if results["sync_drain_seconds"] is not None:
+        print(f"upstream sync: {storage['states_synced']} states, {storage['messages_synced']} messages, "
+              f"drained {results['sync_drain_seconds']:.2f}s after the last write")
+
+    if results["failures"]:
+        print("\nconsistency failures:")
+        for failure in results["failures"][:20]:
+            print(f"  {failure}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    sys.exit(1 if results["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,473 @@
+"""
+Offline End-to-End Turn Latency Benchmark for VoiceFlow Pro
+
+Drives the real agent pipeline against local stand-in services:
+- Local STT, LLM (token streaming), TTS (PCM streaming) and backend servers
+- Seeded, per-request latency distributions for deterministic runs
+- Scripted conversations replayed at a chosen concurrency
+- Per-stage and end-to-end latency distributions, with no network access
+
+Each turn is measured from the end of the caller's audio to the first
+synthesized audio chunk, broken down into DSP, STT, agent processing
+(VoiceFlowAgent.process_conversation incl. persistence), LLM first token,
+LLM completion and TTS first audio.
+
+With --speculative, word-by-word interim transcripts are fed to the agent
+while the caller is still speaking, and the run reports how much turn time
+speculative preparation saved and how much work it discarded. With
+--audio-cache, fixed responses are pre-synthesized through the stand-in TTS
+and played from the cache; the lookup is part of the agent stage. With
+--storage sqlite, sessions persist to an embedded SQLite database that syncs
+to the stand-in backend in the background instead of calling it every turn.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agents"))
+
+from advanced_audio_processor import AdvancedAudioProcessor  # noqa: E402
+from latency_sketch import LatencyHistogram, StageLatencySketches  # noqa: E402
+from voice_agent import VoiceFlowAgent, DatabaseManager  # noqa: E402
+from storage_backend import HTTPStorageBackend, SQLiteStorageBackend  # noqa: E402
+from http_client import close_shared_http_clients  # noqa: E402
+from persistence_queue import WriteBehindQueue  # noqa: E402
+from audio_cache import SynthesizedAudioCache  # noqa: E402
+from voice_agent import scenario_response_audio_entries  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+BENCH_STAGES = ("dsp", "stt", "agent", "llm_first_token", "llm", "tts_first_audio", "end_to_end")
+
+
+@dataclass
+class LatencyDistribution:
+    """Log-normal latency with a hard floor"""
+    median_ms: float
+    sigma: float = 0.3
+    floor_ms: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        return max(self.floor_ms, rng.lognormvariate(math.log(self.median_ms), self.sigma))
+
+
+# Stand-in service profiles: per-request latency and streaming cadence
+PROFILES = {
+    "zero": {
+        "stt": LatencyDistribution(0), "llm_first_token": LatencyDistribution(0),
+        "llm_token": LatencyDistribution(0), "tts_first_chunk": LatencyDistribution(0),
+        "tts_chunk": LatencyDistribution(0), "backend": LatencyDistribution(0),
+    },
+    "realistic": {
+        "stt": LatencyDistribution(120, 0.3, 40), "llm_first_token": LatencyDistribution(250, 0.35, 80),
+        "llm_token": LatencyDistribution(15, 0.3, 3), "tts_first_chunk": LatencyDistribution(90, 0.3, 30),
+        "tts_chunk": LatencyDistribution(20, 0.2, 5), "backend": LatencyDistribution(8, 0.4, 1),
+    },
+    "degraded": {
+        "stt": LatencyDistribution(250, 0.5, 60), "llm_first_token": LatencyDistribution(700, 0.5, 150),
+        "llm_token": LatencyDistribution(30, 0.4, 5), "tts_first_chunk": LatencyDistribution(200, 0.4, 50),
+        "tts_chunk": LatencyDistribution(35, 0.3, 5), "backend": LatencyDistribution(60, 0.6, 5),
+    },
+}
+
+SCRIPTED_CONVERSATIONS = [
+    [
+        "Hi, I'm interested in your enterprise plan",
+        "What does the pricing look like for fifty users?",
+        "Can we schedule a demo next Tuesday at 2 pm?",
+        "My email is jordan@example.com, thanks",
+    ],
+    [
+        "Our integration is broken and the API returns an error",
+        "It started this morning after the update",
+        "This is critical, production is down",
+        "Can I talk to a supervisor please?",
+    ],
+    [
+        "I'd like to follow up on my previous ticket",
+        "Is there any progress on the renewal contract?",
+        "Can we book a consultation call for tomorrow?",
+        "Great, that works, thank you",
+    ],
+]
+
+BENCH_TTS_VOICE = {"voice_id": "bench-voice", "model": "bench-tts", "settings": {}}
+
+LLM_REPLY = ("Thanks for the details. I can help with that right away and I'll make sure "
+             "the right specialist follows up with everything you need today.")
+
+
+class StandInServices:
+    """Local HTTP stand-ins for STT, LLM, TTS and the VoiceFlow backend"""
+
+    def __init__(self, profile: Dict[str, LatencyDistribution], seed: int, sample_rate: int = 16000):
+        self.profile = profile
+        self.seed = seed
+        self.sample_rate = sample_rate
+        self.runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+    def _rng(self, request: web.Request) -> random.Random:
+        # Seed per request key so results do not depend on request interleaving
+        return random.Random(f"{self.seed}:{request.path}:{request.headers.get('X-Bench-Key', '')}")
+
+    async def _delay(self, distribution: str, rng: random.Random):
+        delay_ms = self.profile[distribution].sample(rng)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+    async def stt(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        await self._delay("stt", self._rng(request))
+        return web.json_response({"text": payload["expected_text"], "confidence": 0.97})
+
+    async def llm(self, request: web.Request) -> web.StreamResponse:
+        await request.json()
+        rng = self._rng(request)
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        await self._delay("llm_first_token", rng)
+        for token in LLM_REPLY.split(" "):
+            chunk = {"choices": [{"delta": {"content": token + " "}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await self._delay("llm_token", rng)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def tts(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        rng = self._rng(request)
+        response = web.StreamResponse(headers={"Content-Type": "audio/pcm"})
+        await response.prepare(request)
+
+        # 20ms PCM16 frames, roughly 60ms of speech per word
+        frame = np.zeros(self.sample_rate // 50, dtype=np.int16).tobytes()
+        frames = max(1, len(payload["text"].split()) * 3)
+
+        await self._delay("tts_first_chunk", rng)
+        for _ in range(frames):
+            await response.write(frame)
+            await self._delay("tts_chunk", rng)
+        await response.write_eof()
+        return response
+
+    async def backend_state_save(self, request: web.Request) -> web.Response:
+        await request.read()
+        await self._delay("backend", self._rng(request))
+        return web.json_response({"success": True})
+
+    async def backend_state_load(self, request: web.Request) -> web.Response:
+        await self._delay("backend", self._rng(request))
+        return web.json_response({"error": "Conversation not found"}, status=404)
+
+    async def backend_message(self, request: web.Request) -> web.Response:
+        await request.read()
+        await self._delay("backend", self._rng(request))
+        return web.json_response({"success": True})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/stt/transcribe", self.stt)
+        app.router.add_post("/llm/chat/completions", self.llm)
+        app.router.add_post("/tts/stream", self.tts)
+        app.router.add_post("/api/conversation/state", self.backend_state_save)
+        app.router.add_post("/api/conversation/state/delta", self.backend_state_save)
+        app.router.add_get("/api/conversation/state/{room_id}", self.backend_state_load)
+        app.router.add_post("/api/conversation/message", self.backend_message)
+        app.router.add_post("/api/conversation/messages/batch", self.backend_message)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+
+class _StandInRoom:
+    """Minimal room object accepted by VoiceFlowAgent"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def on(self, event: str, callback=None):
+        return callback
+
+
+def synthetic_utterance(text: str, sample_rate: int, rng: np.random.Generator) -> np.ndarray:
+    """Deterministic speech-like audio: voiced harmonics plus background noise"""
+    duration = max(0.5, 0.3 * len(text.split()))
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    voiced = sum(np.sin(2 * np.pi * f0 * t) / (i + 1) for i, f0 in enumerate((140, 280, 420, 560)))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    return (0.2 * voiced * envelope + 0.02 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+class TurnLatencyBenchmark:
+    """Replays scripted conversations through the agent pipeline"""
+
+    def __init__(self, services: StandInServices, concurrency: int, seed: int,
+                 sample_rate: int = 16000, persistence_queue: Optional[WriteBehindQueue] = None,
+                 speculative: bool = False, audio_cache: Optional[SynthesizedAudioCache] = None,
+                 storage: Optional[SQLiteStorageBackend] = None):
+        self.services = services
+        self.storage = storage
+        self.audio_cache = audio_cache
+        self.persistence_queue = persistence_queue
+        self.speculative = speculative
+        self.speculation_saved = LatencyHistogram()
+        self.speculation_stats: Dict[str, float] = {}
+        self.concurrency = concurrency
+        self.seed = seed
+        self.sample_rate = sample_rate
+        self.sketches = StageLatencySketches(BENCH_STAGES)
+        self.turns_completed = 0
+
+    async def _post_json(self, http: aiohttp.ClientSession, path: str, payload: Dict[str, Any],
+                         key: str) -> Dict[str, Any]:
+        async with http.post(f"{self.services.base_url}{path}", json=payload,
+                             headers={"X-Bench-Key": key}) as response:
+            return await response.json()
+
+    async def _stream_llm(self, http: aiohttp.ClientSession, prompt: str, key: str) -> Dict[str, float]:
+        start = time.perf_counter()
+        first_token_ms = None
+        async with http.post(f"{self.services.base_url}/llm/chat/completions",
+                             json={"messages": [{"role": "user", "content": prompt}], "stream": True},
+                             headers={"X-Bench-Key": key}) as response:
+            async for line in response.content:
+                if line.startswith(b"data: ") and line.strip() != b"data: [DONE]":
+                    if first_token_ms is None:
+                        first_token_ms = (time.perf_counter() - start) * 1000
+        return {"first_token": first_token_ms or 0.0, "complete": (time.perf_counter() - start) * 1000}
+
+    async def _stream_tts(self, http: aiohttp.ClientSession, text: str, key: str) -> Dict[str, float]:
+        start = time.perf_counter()
+        first_audio_ms = None
+        async with http.post(f"{self.services.base_url}/tts/stream", json={"text": text},
+                             headers={"X-Bench-Key": key}) as response:
+            async for _ in response.content.iter_chunked(640):
+                if first_audio_ms is None:
+                    first_audio_ms = (time.perf_counter() - start) * 1000
+        return {"first_audio": first_audio_ms or 0.0, "complete": (time.perf_counter() - start) * 1000}
+
+    async def synthesize(self, http: aiohttp.ClientSession, text: str):
+        """Whole-response synthesis through the stand-in TTS, for cache pre-population"""
+        async with http.post(f"{self.services.base_url}/tts/stream", json={"text": text},
+                             headers={"X-Bench-Key": "prepopulate"}) as response:
+            return await response.read(), self.sample_rate, 1
+
+    async def run_conversation(self, http: aiohttp.ClientSession, index: int, script: List[str]):
+        room = f"bench-room-{index}"
+        job_context = SimpleNamespace(room=_StandInRoom(room))
+        participant = SimpleNamespace(identity=f"bench-caller-{index}")
+
+        agent = VoiceFlowAgent(job_context, participant, persistence_queue=self.persistence_queue,
+                               audio_cache=self.audio_cache,
+                               tts_voice=BENCH_TTS_VOICE if self.audio_cache else None)
+        agent.db_manager = DatabaseManager(backend_url=self.services.base_url, storage=self.storage)
+        await agent.setup_event_handlers()
+
+        processor = AdvancedAudioProcessor(sample_rate=self.sample_rate)
+        audio_rng = np.random.default_rng(self.seed + index)
+
+        for turn, utterance in enumerate(script):
+            key = f"{room}:{turn}"
+            audio = synthetic_utterance(utterance, self.sample_rate, audio_rng)
+
+            if self.speculative:
+                # Interims grow word by word while the caller speaks; the last one repeats once settled
+                words = utterance.lower().replace(",", "").rstrip("?.!").split()
+                for count in range(1, len(words) + 1):
+                    await agent.on_interim_transcript(" ".join(words[:count]))
+                await agent.on_interim_transcript(" ".join(words))
+
+            # End of caller audio: the clock for end-to-end latency starts here
+            turn_start = time.perf_counter()
+
+            stage_start = time.perf_counter()
+            await processor.process_audio_stream(audio)
+            dsp_ms = (time.perf_counter() - stage_start) * 1000
+
+            stage_start = time.perf_counter()
+            transcript = (await self._post_json(
+                http, "/stt/transcribe", {"samples": len(audio), "expected_text": utterance}, key
+            ))["text"]
+            stt_ms = (time.perf_counter() - stage_start) * 1000
+
+            stage_start = time.perf_counter()
+            response = await agent.process_conversation(transcript)
+            agent_ms = (time.perf_counter() - stage_start) * 1000
+
+            llm = await self._stream_llm(http, f"{transcript}\n{response}", key)
+            if agent.last_turn_results.get("audio") is not None:
+                tts = {"first_audio": 0.0, "complete": 0.0}
+            else:
+                tts = await self._stream_tts(http, response, key)
+            tts_first_audio_ms = tts["first_audio"]
+
+            # The caller hears the reply from its first audio chunk; the rest of the LLM and
+            # TTS streams overlap playback
+            end_to_end_ms = ((time.perf_counter() - turn_start) * 1000 - (llm["complete"] - llm["first_token"])
+                             - (tts["complete"] - tts["first_audio"]))
+
+            for stage, value in (("dsp", dsp_ms), ("stt", stt_ms), ("agent", agent_ms),
+                                 ("llm_first_token", llm["first_token"]), ("llm", llm["complete"]),
+                                 ("tts_first_audio", tts_first_audio_ms), ("end_to_end", end_to_end_ms)):
+                self.sketches.record(stage, value)
+            self.turns_completed += 1
+
+        statistics = agent.speculation.get_statistics()
+        self.speculation_saved.merge(agent.speculation.saved_ms)
+        for name, value in statistics.items():
+            if isinstance(value, (int, float)) and name not in ("commit_rate", "saved_ms_total"):
+                self.speculation_stats[name] = self.speculation_stats.get(name, 0) + value
+
+    async def run(self, conversations: int) -> Dict[str, Any]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency * 4)
+
+        async with aiohttp.ClientSession(connector=connector) as http:
+            if self.audio_cache:
+                await self.audio_cache.prepopulate(scenario_response_audio_entries(BENCH_TTS_VOICE),
+                                                   lambda text: self.synthesize(http, text))
+
+            async def bounded(index: int):
+                async with semaphore:
+                    script = SCRIPTED_CONVERSATIONS[index % len(SCRIPTED_CONVERSATIONS)]
+                    await self.run_conversation(http, index, script)
+
+            wall_start = time.perf_counter()
+            await asyncio.gather(*(bounded(i) for i in range(conversations)))
+            wall_seconds = time.perf_counter() - wall_start
+
+        results = {
+            "conversations": conversations,
+            "concurrency": self.concurrency,
+            "turns": self.turns_completed,
+            "wall_seconds": wall_seconds,
+            "turns_per_second": self.turns_completed / wall_seconds if wall_seconds else 0.0,
+            "latency_ms": self.sketches.summary(),
+            "latency_sketches": self.sketches.to_dict(),
+        }
+        if self.audio_cache:
+            results["audio_cache"] = self.audio_cache.get_statistics()
+        if self.speculative:
+            results["speculation"] = {
+                "saved_ms": self.speculation_saved.summary(),
+                "saved_ms_total": self.speculation_saved.total,
+                **self.speculation_stats
+            }
+        return results
+
+
+async def run_benchmark(profile: str, concurrency: int, conversations: int, seed: int,
+                        write_behind: bool = False, speculative: bool = False,
+                        audio_cache: bool = False, storage: str = "http") -> Dict[str, Any]:
+    random.seed(seed)
+    np.random.seed(seed)
+
+    services = StandInServices(PROFILES[profile], seed)
+    await services.start()
+    try:
+        local_storage = None
+        if storage == "sqlite":
+            local_storage = SQLiteStorageBackend(
+                os.path.join(tempfile.mkdtemp(prefix="bench-storage-"), "agent.db"),
+                upstream=HTTPStorageBackend(services.base_url)
+            )
+        queue = WriteBehindQueue(DatabaseManager(backend_url=services.base_url, storage=local_storage)) \
+            if write_behind else None
+        cache = SynthesizedAudioCache(tempfile.mkdtemp(prefix="bench-tts-cache-")) if audio_cache else None
+        benchmark = TurnLatencyBenchmark(services, concurrency, seed, persistence_queue=queue,
+                                         speculative=speculative, audio_cache=cache, storage=local_storage)
+        results = await benchmark.run(conversations)
+        if queue:
+            await queue.close()
+            results["persistence_queue"] = queue.get_statistics()
+        if local_storage:
+            await local_storage.close()
+            results["storage"] = local_storage.get_statistics()
+        results["backend_http"] = DatabaseManager(backend_url=services.base_url).get_statistics()
+    finally:
+        await close_shared_http_clients()
+        await services.stop()
+
+    results.update({"profile": profile, "seed": seed, "write_behind": write_behind, "speculative": speculative,
+                    "storage_backend": storage})
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end turn latency benchmark")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="realistic",
+                        help="Stand-in service latency profile ('zero' isolates pipeline overhead)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--conversations", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--write-behind", action="store_true",
+                        help="Persist through the write-behind queue instead of awaiting the backend")
+    parser.add_argument("--speculative", action="store_true",
+                        help="Feed interim transcripts so the agent can prepare turns speculatively")
+    parser.add_argument("--audio-cache", action="store_true",
+                        help="Play fixed responses from a pre-synthesized audio cache")
+    parser.add_argument("--storage", choices=["http", "sqlite"], default="http",
+                        help="Persist to the backend over HTTP or to an embedded SQLite database")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run_benchmark(args.profile, args.concurrency, args.conversations, args.seed,
+                                        args.write_behind, args.speculative, args.audio_cache, args.storage))
+
+    print(f"{'stage':<18}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for stage in BENCH_STAGES:
+        summary = results["latency_ms"][stage]
+        print(f"{stage:<18}{summary['p50']:>10.1f}{summary['p95']:>10.1f}"
+              f"{summary['p99']:>10.1f}{summary['maximum']:>10.1f}")
+    print(f"\n{results['turns']} turns in {results['wall_seconds']:.1f}s "
+          f"({results['turns_per_second']:.1f} turns/s, concurrency {args.concurrency})")
+    if args.audio_cache:
+        cache = results["audio_cache"]
+        print(f"audio cache: hit rate {cache['hit_rate']:.0%}, lookup p99 {cache['lookup_ms']['p99']:.2f}ms")
+    if args.storage == "sqlite":
+        storage = results["storage"]
+        print(f"sqlite storage: write p99 {storage['write_ms']['p99']:.2f}ms, "
+              f"{storage['writes_per_commit']['average']:.1f} writes/commit, "
+              f"{storage['messages_synced']} messages synced upstream")
+    if args.speculative:
+        speculation = results["speculation"]
+        print(f"speculation: {speculation['committed']} committed, "
+              f"{speculation['diverged'] + speculation['stale']} discarded, "
+              f"{speculation['saved_ms_total']:.1f}ms saved, {speculation['wasted_ms']:.1f}ms wasted")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()